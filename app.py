@@ -5,28 +5,42 @@ Flask web application for CloudPanel VPS deployment
 Matches desktop GUI functionality with advanced features
 """
 
-from flask import Flask, render_template, request, jsonify, send_file, flash, redirect, url_for
+from flask import Flask, render_template, request, jsonify, send_file, flash, redirect, url_for, g, Response
 from werkzeug.utils import secure_filename
 import os
+import io
 import json
-import tempfile
+import functools
+import hashlib
+import re
 from datetime import datetime
 import logging
-import sys
-from pdf_generator import CambridgePDFGenerator
-from config import CAMBRIDGE_SUBJECTS
+import threading
+import time
+from pdf_generator import REPORT_RENDERER
+from config import BATCH_SETTINGS, CAMBRIDGE_SUBJECTS, MAIL_SETTINGS, PREVIEW_SETTINGS, VERIFY_SETTINGS
+from output_profiles import UnknownProfile, get_profile
+from template_engine import TemplateError, select_template
 from cambridge_calculator import CambridgeCalculator
+from report_data import build_student_data, parse_report_form
+from batch_jobs import BatchJobManager, RosterError, parse_roster, prepare_roster
+from broadsheet import BroadsheetError, generate_broadsheet
+from pdf_cache import ReportCache
+from report_schema import SCHEMA_VERSION, parse_ndjson, validate_student
+from mail_outbox import MailSender, Outbox, mail_enabled, report_email_content
+from email_campaigns import EMAIL_PATTERN, CampaignManager
+import metrics
+from metrics import REPORT_STAGE_SECONDS
+from logging_config import SUBJECT_LOGGER, configure_logging
+from render_limiter import RenderLimiter, RenderOverloaded
+from verification import VerificationError, check_verification_settings, lookup
+from report_preview import PreviewError, PreviewUnavailable, ReportPreviews
+from html_preview import render_html_preview
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('logs/app.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# Configure logging (queued to a listener thread, see LOG_SETTINGS)
+configure_logging()
 logger = logging.getLogger(__name__)
+subject_logger = logging.getLogger(SUBJECT_LOGGER)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'cambridge_exam_system_2025_secure_key')
@@ -49,6 +63,200 @@ except Exception as e:
     calculator = None
     logger.error(f"Failed to initialize calculator: {e}")
 
+# Verification QR codes must point at a public address, never a default one
+check_verification_settings()
+
+# Background batch report jobs
+batch_manager = BatchJobManager()
+
+# Rendered PDFs shared by repeat downloads and the email route
+report_cache = ReportCache()
+
+# Bounded render concurrency; preforked workers each take their share (share_render_limits)
+render_limiter = RenderLimiter()
+
+# First-page PNG previews for the web UI, keyed by the hash of the form data
+report_previews = ReportPreviews()
+
+# Preview keys are hex SHA-256 digests
+PREVIEW_KEY = re.compile(r'^[0-9a-f]{64}$')
+
+# Real email delivery through the persistent outbox when SMTP is configured
+outbox = None
+mail_sender = None
+campaign_manager = None
+
+def start_mail_sender(rate_share=1):
+    """
+    Start the background mail sender for this process
+
+    Threads do not survive a fork, so preforked servers call this again in
+    every worker (see gunicorn_config.py).
+
+    Args:
+        rate_share (int): Number of processes sending concurrently; the
+            messages_per_minute limit is split between them
+    """
+    global mail_sender
+    if outbox is None:
+        return None
+    settings = dict(MAIL_SETTINGS)
+    if settings['messages_per_minute'] and rate_share > 1:
+        settings['messages_per_minute'] = max(1, settings['messages_per_minute'] // rate_share)
+    mail_sender = MailSender(outbox, settings=settings)
+    mail_sender.start()
+    campaign_manager.sender = mail_sender
+    return mail_sender
+
+def share_render_limits(workers):
+    """
+    Give this worker its share of RENDER_LIMITS
+
+    Preforked servers call this in every worker (see gunicorn_config.py), so
+    the limits hold across workers without any slot living in shared memory.
+
+    Args:
+        workers (int): Number of worker processes serving requests
+    """
+    global render_limiter
+    render_limiter = RenderLimiter(share=workers)
+    return render_limiter
+
+def stop_mail_sender():
+    """Stop this process's mail sender, e.g. in the gunicorn master before forking workers"""
+    global mail_sender
+    if mail_sender is not None:
+        mail_sender.stop()
+        mail_sender = None
+
+if mail_enabled():
+    outbox = Outbox()
+    campaign_manager = CampaignManager(outbox, None, batch_manager)
+    start_mail_sender()
+else:
+    logger.info("SMTP_HOST not set - report emails will not be delivered")
+
+# Set once a sample report has been rendered, see warm_up()
+warmup_complete = threading.Event()
+
+WARMUP_STUDENT = {
+    'student_name': 'Warmup Student',
+    'candidate_number': '0000',
+    'school_name': 'Warmup Centre',
+    'session': 'June',
+    'year': '2025',
+}
+
+def warm_up():
+    """
+    Render a throwaway sample report before serving traffic
+
+    Loads the ReportLab modules, font metrics and stylesheets that would
+    otherwise be loaded lazily by the first real request. When gunicorn
+    preloads the app, this runs once in the master and forked workers share
+    the loaded state copy-on-write.
+
+    Returns:
+        float: Warmup time in seconds
+    """
+    started = time.perf_counter()
+    subjects = [{'name': subject['name'], 'score': 60 + 4 * index, 'coefficient': subject['coefficient'],
+                 'comment': 'Warmup'} for index, subject in enumerate(list(CAMBRIDGE_SUBJECTS.values())[:8])]
+    try:
+        student_data = build_student_data(WARMUP_STUDENT, subjects)
+        # A draft: the sample student must never become a verifiable report
+        REPORT_RENDERER.generate_enhanced_report_bytes(student_data, draft=True)
+    except Exception as e:
+        # Stay available: real requests report their own errors
+        logger.error(f"Warmup render failed: {e}")
+    elapsed = time.perf_counter() - started
+    warmup_complete.set()
+    logger.info(f"Warmup finished in {elapsed:.2f}s")
+    return elapsed
+
+# Queue depths and cache state, read when /metrics is scraped
+metrics.REGISTRY.gauge('cambridge_batch_pending_reports', 'Batch reports queued or rendering in this worker',
+                       callback=batch_manager.pending)
+metrics.REGISTRY.gauge('cambridge_report_cache_bytes', 'Bytes held by the in-memory report cache',
+                       callback=lambda: report_cache.stats()['bytes'])
+metrics.REGISTRY.gauge('cambridge_render_slots', 'Configured render concurrency limit',
+                       callback=lambda: render_limiter.max_concurrent)
+metrics.REGISTRY.gauge('cambridge_render_active', 'Reports rendering now (across preforked workers)',
+                       callback=lambda: render_limiter.active)
+metrics.REGISTRY.gauge('cambridge_render_waiting', 'Requests waiting for a render slot',
+                       callback=lambda: render_limiter.waiting)
+metrics.REGISTRY.counter('cambridge_report_cache_requests_total', 'Report cache lookups by result', ('result',),
+                         callback=lambda: {(result,): report_cache.stats()[result]
+                                           for result in ('hits', 'misses', 'coalesced')})
+if outbox is not None:
+    metrics.REGISTRY.gauge('cambridge_outbox_messages', 'Outbox messages by delivery status', ('status',),
+                           callback=lambda: {(status,): n for status, n in outbox.counts().items()})
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count every request and observe its latency"""
+    endpoint = request.endpoint or 'unmatched'
+    metrics.HTTP_REQUESTS.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    if 'request_start' in g:
+        metrics.HTTP_LATENCY.observe(time.perf_counter() - g.request_start, endpoint=endpoint)
+    return response
+
+class SentPDFBuffer(io.BytesIO):
+    """In-memory PDF that records the 'send' stage when the server closes it after streaming"""
+
+    def __init__(self, pdf_bytes):
+        super().__init__(pdf_bytes)
+        self.created = time.perf_counter()
+
+    def close(self):
+        if not self.closed:
+            REPORT_STAGE_SECONDS.observe(time.perf_counter() - self.created, stage='send')
+        super().close()
+
+def render_report(student_data, profile, template=None):
+    """
+    Render a report through the PDF cache and the render limiter
+    
+    Args:
+        student_data (dict): Enhanced student data
+        profile (OutputProfile): Output profile; each profile is cached separately
+        template (str): Requested report template id, if any
+        
+    Returns:
+        bytes: The PDF document
+    
+    Raises:
+        TemplateError: If the requested template is missing or invalid
+    """
+    # Edited templates get a new version, so earlier renders are not reused
+    layout = select_template(student_data, template)
+    variant = f"{profile.name}/{layout.version}" if layout else profile.name
+    render = functools.partial(REPORT_RENDERER.generate_enhanced_report_bytes, profile=profile.name,
+                               template=layout.id if layout else None)
+    return report_cache.get_or_render(student_data, render_limiter.limit(render), variant=variant)
+
+def send_report_pdf(pdf_bytes, filename, profile):
+    """
+    Send a rendered PDF as a download, reporting its profile and size in headers
+
+    The ETag is the SHA-256 of the document; in deterministic mode identical
+    reports get identical ETags, so clients can skip storing unchanged ones.
+    """
+    response = send_file(
+        SentPDFBuffer(pdf_bytes),
+        as_attachment=True,
+        download_name=filename,
+        mimetype='application/pdf'
+    )
+    response.headers['X-Report-Profile'] = profile.name
+    response.headers['X-Report-Size'] = str(len(pdf_bytes))
+    response.set_etag(hashlib.sha256(pdf_bytes).hexdigest())
+    return response
+
 @app.route('/')
 def index():
     """Main page with enhanced report form matching desktop GUI"""
@@ -73,169 +281,63 @@ def generate_report():
     try:
         logger.info("Enhanced report generation requested")
         
-        # Get form data
-        student_data = {
-            'name': request.form.get('student_name', ''),
-            'candidate_number': request.form.get('candidate_number', ''),
-            'school_name': request.form.get('center_number', ''),  # Correctly map school name field
-            'session': request.form.get('session', ''),
-            'year': request.form.get('year', ''),
-            'subjects': []
-        }
-        
-        logger.info(f"Processing enhanced report for student: {student_data['name']}")
-        
-        # Parse subject data with coefficients
-        subject_count = int(request.form.get('subject_count', 0))
-        logger.info(f"Processing {subject_count} subjects with advanced features")
+        # Get form data and calculate grades, GPA and final grade
+        with REPORT_STAGE_SECONDS.time(stage='parse'):
+            student_info, subjects = parse_report_form(request.form)
+        logger.info(f"Processing enhanced report for student: {student_info['student_name']}")
+        logger.info(f"Processing {len(subjects)} subjects with advanced features")
         
-        total_weighted_score = 0
-        total_coefficients = 0
-        
-        for i in range(subject_count):
-            subject_name = request.form.get(f'subject_{i}')
-            raw_score = request.form.get(f'score_{i}')
-            coefficient = request.form.get(f'coefficient_{i}', '1.0')
-            comment = request.form.get(f'comment_{i}', '')
-            
-            if subject_name and raw_score:
-                try:
-                    score = float(raw_score)
-                    coeff = float(coefficient)
-                    
-                    if 0 <= score <= 100 and 0.1 <= coeff <= 3.0:
-                        # Calculate letter grade
-                        letter_grade = calculate_letter_grade(score)
-                        
-                        # Calculate weighted score for GPA
-                        grade_points = get_grade_points(score)
-                        weighted_score = grade_points * coeff
-                        
-                        total_weighted_score += weighted_score
-                        total_coefficients += coeff
-                        
-                        subject_info = {
-                            'name': subject_name,
-                            'score': score,
-                            'coefficient': coeff,
-                            'letter_grade': letter_grade,
-                            'grade_points': grade_points,
-                            'weighted_score': weighted_score,
-                            'comment': comment
-                        }
-                        
-                        student_data['subjects'].append(subject_info)
-                        logger.info(f"Added subject: {subject_name} - Score: {score}, Grade: {letter_grade}, Coeff: {coeff}")
-                        
-                except ValueError as e:
-                    error_msg = f'Invalid data for {subject_name}: {str(e)}'
-                    logger.error(error_msg)
-                    flash(error_msg, 'error')
-                    return redirect(url_for('index'))
-        
-        if not student_data['subjects']:
-            error_msg = 'Please add at least one subject with valid score and coefficient'
+        try:
+            with REPORT_STAGE_SECONDS.time(stage='calculate'):
+                student_data = build_student_data(student_info, subjects)
+        except ValueError as e:
+            error_msg = str(e)
             logger.error(error_msg)
             flash(error_msg, 'error')
             return redirect(url_for('index'))
         
-        # Calculate overall GPA
-        if total_coefficients > 0:
-            overall_gpa = total_weighted_score / total_coefficients
-            student_data['gpa'] = round(overall_gpa, 2)
-            student_data['total_subjects'] = len(student_data['subjects'])
-            logger.info(f"Calculated GPA: {student_data['gpa']} from {student_data['total_subjects']} subjects")
-            
-            # Calculate weighted average and final grade for PDF summary
-            weighted_average = (total_weighted_score / total_coefficients) * (100/4)  # Convert GPA scale to percentage
-            final_grade = calculate_letter_grade(weighted_average)
-            
-            student_data['final_grade'] = {
-                'total_weighted_score': round(total_weighted_score, 1),
-                'total_coefficient': round(total_coefficients, 1),
-                'weighted_average': round(weighted_average, 1),
-                'final_grade': final_grade
-            }
-            logger.info(f"Calculated final grade data: Average={weighted_average:.1f}%, Grade={final_grade}")
+        if subject_logger.isEnabledFor(logging.DEBUG):
+            for subject in student_data['subjects']:
+                subject_logger.debug(f"Added subject: {subject['name']} - Score: {subject['score']}, "
+                                     f"Grade: {subject['letter_grade']}, Coeff: {subject['coefficient']}",
+                                     extra={'subject': subject['name'], 'score': subject['score'],
+                                            'grade': subject['letter_grade']})
+        
+        final_data = student_data['final_grade']
+        logger.info(f"Calculated GPA: {student_data['gpa']} from {student_data['total_subjects']} subjects")
+        logger.info(f"Calculated final grade data: Average={final_data['weighted_average']:.1f}%, "
+                    f"Grade={final_data['final_grade']}")
         
         # Generate enhanced PDF with all features
         try:
-            pdf_generator = CambridgePDFGenerator()
-            
-            # Create temporary file for PDF
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf', dir=REPORTS_FOLDER) as tmp_file:
-                temp_path = tmp_file.name
-            
-            # Generate enhanced PDF
-            pdf_generator.generate_enhanced_report(student_data, temp_path)
-            logger.info(f"Enhanced PDF generated successfully: {temp_path}")
+            # Render straight into memory (or reuse an identical earlier render)
+            profile = get_profile(request.form.get('profile'))
+            pdf_bytes = render_report(student_data, profile, request.form.get('template'))
+            logger.info(f"Enhanced PDF generated successfully: {len(pdf_bytes)} bytes ({profile.name} profile)")
             
             # Determine filename
             safe_name = secure_filename(student_data['name'].replace(' ', '_'))
             filename = f"Cambridge_Report_{safe_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
             
             logger.info(f"Sending enhanced PDF: {filename}")
-            return send_file(
-                temp_path,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/pdf'
-            )
+            return send_report_pdf(pdf_bytes, filename, profile)
             
+        except RenderOverloaded:
+            raise
         except Exception as e:
             error_msg = f'Error generating enhanced PDF: {str(e)}'
             logger.error(error_msg)
             flash(error_msg, 'error')
             return redirect(url_for('index'))
             
+    except RenderOverloaded:
+        raise
     except Exception as e:
         error_msg = f'Error processing enhanced report: {str(e)}'
         logger.error(error_msg)
         flash(error_msg, 'error')
         return redirect(url_for('index'))
 
-def calculate_letter_grade(score):
-    """Calculate letter grade from numerical score - range A* to U"""
-    if score >= 90:
-        return 'A*'
-    elif score >= 80:
-        return 'A'
-    elif score >= 70:
-        return 'B'
-    elif score >= 60:
-        return 'C'
-    elif score >= 50:
-        return 'D'
-    elif score >= 40:
-        return 'E'
-    elif score >= 30:
-        return 'F'
-    elif score >= 20:
-        return 'G'
-    else:
-        return 'U'  # Ungraded for scores below 20
-
-def get_grade_points(score):
-    """Convert score to grade points for GPA calculation"""
-    if score >= 90:
-        return 4.0
-    elif score >= 80:
-        return 3.7
-    elif score >= 70:
-        return 3.0
-    elif score >= 60:
-        return 2.3
-    elif score >= 50:
-        return 2.0
-    elif score >= 40:
-        return 1.7
-    elif score >= 30:
-        return 1.3
-    elif score >= 20:
-        return 1.0
-    else:
-        return 0.0
-
 @app.route('/send_email', methods=['POST'])
 def send_email():
     """Send report via email"""
@@ -246,135 +348,360 @@ def send_email():
         recipient_email = request.form.get('recipient_email', '')
         if not recipient_email:
             return jsonify({'success': False, 'error': 'No recipient email provided'})
+        if not EMAIL_PATTERN.fullmatch(recipient_email):
+            return jsonify({'success': False, 'error': f'Invalid recipient email: {recipient_email!r}'}), 400
         
         # Get form data (same as generate_report)
-        student_data = {
-            'name': request.form.get('student_name', ''),
-            'candidate_number': request.form.get('candidate_number', ''),
-            'school': request.form.get('center_number', ''),
-            'session': request.form.get('session', ''),
-            'year': request.form.get('year', ''),
-            'subjects': []
-        }
-        
-        # Parse subject data with comments
-        subject_count = int(request.form.get('subject_count', 0))
-        total_weighted_score = 0
-        total_coefficients = 0
-        
-        for i in range(subject_count):
-            subject_name = request.form.get(f'subject_{i}')
-            raw_score = request.form.get(f'score_{i}')
-            coefficient = request.form.get(f'coefficient_{i}', '1.0')
-            comment = request.form.get(f'comment_{i}', '')
-            
-            if subject_name and raw_score:
-                try:
-                    score = float(raw_score)
-                    coeff = float(coefficient)
-                    
-                    if 0 <= score <= 100 and 0.1 <= coeff <= 3.0:
-                        letter_grade = calculate_letter_grade(score)
-                        grade_points = get_grade_points(score)
-                        weighted_score = grade_points * coeff
-                        
-                        total_weighted_score += weighted_score
-                        total_coefficients += coeff
-                        
-                        subject_info = {
-                            'name': subject_name,
-                            'score': score,
-                            'coefficient': coeff,
-                            'letter_grade': letter_grade,
-                            'grade_points': grade_points,
-                            'weighted_score': weighted_score,
-                            'comment': comment
-                        }
-                        
-                        student_data['subjects'].append(subject_info)
-                        
-                except ValueError:
-                    continue
-        
-        if not student_data['subjects']:
-            return jsonify({'success': False, 'error': 'No valid subjects with scores provided'})
-        
-        # Calculate GPA
-        if total_coefficients > 0:
-            overall_gpa = total_weighted_score / total_coefficients
-            student_data['gpa'] = round(overall_gpa, 2)
-            student_data['total_subjects'] = len(student_data['subjects'])
-            
-            # Calculate weighted average and final grade for PDF summary
-            weighted_average = (total_weighted_score / total_coefficients) * (100/4)  # Convert GPA scale to percentage
-            final_grade = calculate_letter_grade(weighted_average)
-            
-            student_data['final_grade'] = {
-                'total_weighted_score': round(total_weighted_score, 1),
-                'total_coefficient': round(total_coefficients, 1),
-                'weighted_average': round(weighted_average, 1),
-                'final_grade': final_grade
-            }
+        student_info, subjects = parse_report_form(request.form)
+        try:
+            student_data = build_student_data(student_info, subjects)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)})
         
         # Generate PDF first
         try:
-            pdf_generator = CambridgePDFGenerator()
-            
-            # Create temporary file for PDF
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf', dir=REPORTS_FOLDER) as tmp_file:
-                temp_path = tmp_file.name
-            
-            # Generate enhanced PDF
-            pdf_generator.generate_enhanced_report(student_data, temp_path)
+            # Generate enhanced PDF in memory, reusing an earlier render when cached
+            profile = get_profile(MAIL_SETTINGS['output_profile'])
+            pdf_bytes = render_report(student_data, profile)
             
             # Create email content
-            subject = f"Cambridge International Examination Report - {student_data['name']}"
+            subject, body = report_email_content(student_data)
             
-            # Simple email body (since we don't have SMTP configured, we'll return success for now)
-            body = f"""
-Dear Recipient,
-
-Please find attached the Cambridge International Examination Report for:
-
-Student: {student_data['name']}
-Candidate Number: {student_data['candidate_number']}
-School: {student_data['school']}
-Session: {student_data['session']} {student_data['year']}
-Overall GPA: {student_data.get('gpa', 'N/A')}/4.0
-
-Total Subjects: {student_data.get('total_subjects', 0)}
-
-Best regards,
-Cambridge Exam System
-"""
+            safe_name = secure_filename(student_data['name'].replace(' ', '_'))
+            
+            if outbox is not None:
+                # Queue for the background sender - the request never waits on SMTP
+                message_id = outbox.enqueue(recipient_email, subject, body,
+                                            f"Cambridge_Report_{safe_name}.pdf", pdf_bytes)
+                mail_sender.notify()
+                logger.info(f"Email {message_id} queued for {recipient_email} ({len(pdf_bytes)} byte PDF)")
+                return jsonify({
+                    'success': True,
+                    'message': f'Report queued for delivery to {recipient_email}.',
+                    'message_id': message_id,
+                    'status_url': url_for('email_status', message_id=message_id),
+                    'profile': profile.name,
+                    'pdf_size': len(pdf_bytes)
+                })
             
-            # In a real implementation, you would send the email here
-            # For now, we'll just log the action and return success
             logger.info(f"Email would be sent to {recipient_email}")
             logger.info(f"Subject: {subject}")
-            logger.info(f"PDF path: {temp_path}")
-            
-            # Clean up temp file
-            os.unlink(temp_path)
+            logger.info(f"PDF size: {len(pdf_bytes)} bytes")
             
             return jsonify({
                 'success': True, 
-                'message': f'Report email prepared for {recipient_email}. Note: Email sending requires SMTP configuration.'
+                'message': f'Report email prepared for {recipient_email}. Note: Email sending requires SMTP configuration.',
+                'profile': profile.name,
+                'pdf_size': len(pdf_bytes)
             })
             
+        except RenderOverloaded:
+            raise
         except Exception as e:
             logger.error(f"Error generating PDF for email: {str(e)}")
             return jsonify({'success': False, 'error': f'Failed to generate PDF: {str(e)}'})
             
+    except RenderOverloaded:
+        raise
     except Exception as e:
         logger.error(f"Error processing email request: {str(e)}")
         return jsonify({'success': False, 'error': f'Failed to process email request: {str(e)}'})
 
+def read_roster_upload():
+    """Parse a roster sent as a 'roster' file upload or as the raw request body"""
+    if 'roster' in request.files:
+        roster_file = request.files['roster']
+        content_type = 'json' if roster_file.filename.lower().endswith('.json') else 'csv'
+        return parse_roster(roster_file.read(), content_type)
+    return parse_roster(request.get_data(), request.mimetype or '')
+
+@app.route('/api/v1/batches', methods=['POST'])
+def create_batch():
+    """
+    Queue a class roster (CSV or JSON) for background report generation
+
+    ?format=booklet merges the reports into one print-ready PDF instead of a
+    ZIP; add duplex=1 to start every report on a new sheet. charts=1 adds
+    histograms of the roster's scores to every report.
+    """
+    output_format = request.values.get('format', 'zip')
+    duplex = request.values.get('duplex', '').lower() in ('1', 'true', 'yes')
+    cohort_charts = request.values.get('charts', '').lower() in ('1', 'true', 'yes')
+    try:
+        students = read_roster_upload()
+        job_id = batch_manager.submit(students, output_format, duplex, cohort_charts)
+    except RosterError as e:
+        logger.warning(f"Rejected batch roster: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    logger.info(f"Batch {job_id} accepted with {len(students)} students")
+    return batch_accepted_response(job_id, len(students))
+
+def batch_accepted_response(job_id, total):
+    """Build the 202 response pointing a client at a queued batch"""
+    status_url = url_for('batch_status', job_id=job_id)
+    response = jsonify({
+        'success': True,
+        'job_id': job_id,
+        'total': total,
+        'status_url': status_url,
+        'download_url': url_for('download_batch', job_id=job_id)
+    })
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+@app.route('/api/v1/reports', methods=['POST'])
+def create_reports():
+    """
+    Generate reports from the versioned JSON API
+    
+    application/json carries one student and returns the PDF directly;
+    application/x-ndjson carries one student per line and queues a batch.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        students, errors = parse_ndjson(request.get_data())
+        if errors:
+            logger.warning(f"Rejected NDJSON report payload with {len(errors)} errors")
+            return jsonify({'success': False, 'version': SCHEMA_VERSION, 'errors': errors}), 422
+        
+        try:
+            job_id = batch_manager.submit_prepared(
+                [build_student_data(student, student['subjects']) for student in students]
+            )
+        except RosterError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        except ValueError as e:
+            logger.warning(f"Rejected NDJSON report payload: {e}")
+            return jsonify({'success': False, 'error': str(e)}), 422
+        
+        logger.info(f"Batch {job_id} accepted from NDJSON with {len(students)} students")
+        return batch_accepted_response(job_id, len(students))
+    
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({'success': False, 'error': 'Request body must be JSON or NDJSON'}), 415
+    
+    with REPORT_STAGE_SECONDS.time(stage='parse'):
+        errors = validate_student(payload)
+    if errors:
+        logger.warning(f"Rejected JSON report payload with {len(errors)} errors")
+        return jsonify({'success': False, 'version': SCHEMA_VERSION, 'errors': errors}), 422
+    
+    try:
+        profile = get_profile(request.args.get('profile'))
+    except UnknownProfile as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    try:
+        with REPORT_STAGE_SECONDS.time(stage='calculate'):
+            student_data = build_student_data(payload, payload['subjects'])
+    except ValueError as e:
+        logger.warning(f"Rejected JSON report payload: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 422
+    try:
+        pdf_bytes = render_report(student_data, profile, request.args.get('template'))
+    except TemplateError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    safe_name = secure_filename(student_data['name'].replace(' ', '_'))
+    logger.info(f"JSON report generated for {student_data['name']}: {len(pdf_bytes)} bytes ({profile.name} profile)")
+    return send_report_pdf(pdf_bytes, f"Cambridge_Report_{safe_name}.pdf", profile)
+
+@app.route('/api/v1/batches/<job_id>')
+def batch_status(job_id):
+    """Report progress of a batch job"""
+    status = batch_manager.get_status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Batch not found'}), 404
+
+    done = status['completed'] + status['failed']
+    status['progress'] = round(100.0 * done / status['total'], 1) if status['total'] else 100.0
+    if batch_manager.archive_path(job_id):
+        status['download_url'] = url_for('download_batch', job_id=job_id)
+    return jsonify(status)
+
+@app.route('/api/v1/batches/<job_id>/download')
+def download_batch(job_id):
+    """Download the ZIP archive or booklet PDF of a finished batch"""
+    status = batch_manager.get_status(job_id)
+    if status is None:
+        return jsonify({'success': False, 'error': 'Batch not found'}), 404
+
+    archive_path = batch_manager.archive_path(job_id)
+    if archive_path is None:
+        return jsonify({'success': False, 'error': 'Batch is not finished', 'state': status['state']}), 409
+
+    logger.info(f"Sending batch archive {job_id}")
+    if archive_path.endswith('.pdf'):
+        download_name, mimetype = f"Cambridge_Booklet_{job_id[:8]}.pdf", 'application/pdf'
+    else:
+        download_name, mimetype = f"Cambridge_Reports_{job_id[:8]}.zip", 'application/zip'
+    return send_file(
+        os.path.abspath(archive_path),
+        as_attachment=True,
+        download_name=download_name,
+        mimetype=mimetype
+    )
+
+@app.route('/api/v1/broadsheets', methods=['POST'])
+def create_broadsheet():
+    """
+    Render one landscape mark sheet for a whole roster (CSV or JSON)
+
+    ?columns= and ?subject_cells= take comma-separated keys (see
+    broadsheet.COLUMNS and SUBJECT_CELLS); ?profile= picks the output profile.
+    """
+    def keys(name):
+        value = request.values.get(name, '')
+        return [key.strip() for key in value.split(',') if key.strip()] or None
+
+    try:
+        students = read_roster_upload()
+        if len(students) > BATCH_SETTINGS['max_students']:
+            raise RosterError(f"Roster has {len(students)} students; the limit is {BATCH_SETTINGS['max_students']}")
+        prepared = prepare_roster(students)
+        profile = get_profile(request.values.get('profile'))
+        with render_limiter.slot():
+            pdf_bytes = generate_broadsheet(prepared, columns=keys('columns'),
+                                            subject_cells=keys('subject_cells'), profile=profile.name)
+    except (RosterError, BroadsheetError, UnknownProfile) as e:
+        logger.warning(f"Rejected broadsheet request: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    logger.info(f"Broadsheet generated for {len(prepared)} students: {len(pdf_bytes)} bytes")
+    return send_report_pdf(pdf_bytes, 'Cambridge_Broadsheet.pdf', profile)
+
+@app.route('/api/v1/campaigns', methods=['POST'])
+def create_campaign():
+    """Email every student's report to their guardians from one roster upload"""
+    if campaign_manager is None:
+        return jsonify({'success': False, 'error': 'Email delivery requires SMTP configuration'}), 503
+    
+    try:
+        students = read_roster_upload()
+        campaign_id = campaign_manager.submit(students)
+    except RosterError as e:
+        logger.warning(f"Rejected campaign roster: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    status_url = url_for('campaign_status', campaign_id=campaign_id)
+    response = jsonify({'success': True, 'campaign_id': campaign_id, 'students': len(students),
+                        'status_url': status_url})
+    response.status_code = 202
+    response.headers['Location'] = status_url
+    return response
+
+@app.route('/api/v1/campaigns/<campaign_id>')
+def campaign_status(campaign_id):
+    """Report a campaign's render progress and per-recipient delivery status"""
+    progress = campaign_manager.progress(campaign_id) if campaign_manager is not None else None
+    if progress is None:
+        return jsonify({'success': False, 'error': 'Campaign not found'}), 404
+    return jsonify(progress)
+
+@app.route('/api/v1/outbox/<int:message_id>')
+def email_status(message_id):
+    """Report the delivery status of a queued email"""
+    message = outbox.get(message_id) if outbox is not None else None
+    if message is None:
+        return jsonify({'success': False, 'error': 'Message not found'}), 404
+    return jsonify(message)
+
+@app.route('/verify/<token>')
+def verify_report(token):
+    """Confirm a Statement of Results from the code printed on it, without rendering anything"""
+    if not VERIFY_SETTINGS['enabled']:
+        return jsonify({'valid': False, 'error': 'Report verification is not enabled'}), 404
+    try:
+        issued = lookup(token)
+    except VerificationError as e:
+        return jsonify({'valid': False, 'error': str(e)}), 400
+    if issued is None:
+        return jsonify({'valid': False, 'error': 'No report was issued with this code'}), 404
+    return jsonify({
+        'valid': True,
+        'report': issued['record'],
+        'issued_at': datetime.fromtimestamp(issued['issued_at']).isoformat()
+    })
+
+@app.route('/api/v1/previews', methods=['POST'])
+def create_preview():
+    """
+    Rasterize the first page of a report from the web form fields
+
+    Returns the preview's URL rather than the image, so an unchanged report
+    keeps its URL and the browser shows it from its own cache.
+    """
+    try:
+        student_info, subjects = parse_report_form(request.form)
+        student_data = build_student_data(student_info, subjects)
+        profile = get_profile(request.form.get('profile') or PREVIEW_SETTINGS['output_profile'])
+        layout = select_template(student_data, request.form.get('template'))
+    except (ValueError, UnknownProfile, TemplateError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        key = report_previews.render(student_data, profile, layout, limit=render_limiter.limit)
+    except PreviewUnavailable as e:
+        logger.warning(str(e))
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except PreviewError as e:
+        logger.error(f"Preview failed for {student_data['name']}: {e}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+    return jsonify({'success': True, 'key': key, 'url': url_for('report_preview', key=key)})
+
+@app.route('/api/v1/previews/html', methods=['POST'])
+def create_html_preview():
+    """
+    Render a report as HTML for on-screen previews, cheap enough to call on every edit
+
+    Takes the web form fields, or a JSON student record as accepted by
+    /api/v1/reports. Nothing is rendered to PDF.
+    """
+    start = time.perf_counter()
+    payload = request.get_json(silent=True) if request.is_json else None
+    if payload is not None:
+        errors = validate_student(payload)
+        if errors:
+            return jsonify({'success': False, 'version': SCHEMA_VERSION, 'errors': errors}), 422
+        student_info, subjects = payload, payload['subjects']
+
+    try:
+        if payload is None:
+            student_info, subjects = parse_report_form(request.form)
+        student_data = build_student_data(student_info, subjects)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    html = render_html_preview(student_data)
+    return jsonify({
+        'success': True,
+        'html': html,
+        'gpa': student_data['gpa'],
+        'final_grade': student_data['final_grade'],
+        'render_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+@app.route('/api/v1/previews/<key>.png')
+def report_preview(key):
+    """Serve a cached preview; its URL is a content hash, so it may be cached forever"""
+    png = report_previews.get(key) if PREVIEW_KEY.match(key) else None
+    if png is None:
+        return jsonify({'success': False, 'error': 'Preview not found; request it again'}), 404
+
+    response = Response(png, mimetype='image/png')
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = PREVIEW_SETTINGS['max_age']
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
 @app.route('/preview')
 def preview():
-    """Preview page to show how the report will look"""
-    logger.info("Preview page accessed")
-    return render_template('preview.html', subjects=CAMBRIDGE_SUBJECTS)
+    """Previews are shown from the report form, which posts to /api/v1/previews"""
+    return redirect(url_for('index'))
 
 @app.route('/health')
 def health_check():
@@ -384,14 +711,35 @@ def health_check():
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
         'version': '1.0.0',
-        'subjects_count': len(CAMBRIDGE_SUBJECTS)
+        'subjects_count': len(CAMBRIDGE_SUBJECTS),
+        'report_cache': report_cache.stats()
     })
 
+@app.route('/ready')
+def readiness_check():
+    """Readiness probe: 503 until the warmup render has finished"""
+    if not warmup_complete.is_set():
+        return jsonify({'status': 'warming_up'}), 503
+    return jsonify({'status': 'ready', 'pid': os.getpid()})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus metrics for this worker process"""
+    return Response(metrics.REGISTRY.render(), mimetype=metrics.CONTENT_TYPE)
+
 @app.errorhandler(404)
 def not_found(error):
     logger.warning(f"404 error: {request.url}")
     return jsonify({'error': 'Page not found'}), 404
 
+@app.errorhandler(RenderOverloaded)
+def render_overloaded(error):
+    logger.warning(f"Render refused ({error.reason}): {request.path}")
+    response = jsonify({'success': False, 'error': 'Server is busy generating reports, please retry shortly',
+                        'retry_after': error.retry_after})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
 @app.errorhandler(500)
 def internal_error(error):
     logger.error(f"500 error: {str(error)}", exc_info=True)
@@ -406,6 +754,7 @@ if __name__ == '__main__':
     logger.info(f"Starting Cambridge Exam System on {host}:{port}")
     logger.info(f"Debug mode: {debug}")
     logger.info(f"Working directory: {os.getcwd()}")
+    warm_up()
     
     # For development and production
     app.run(host=host, port=port, debug=debug)
\ No newline at end of file
@@ -0,0 +1,470 @@
+"""
+Batch Report Jobs
+Renders a whole class roster of Cambridge reports in a background worker pool
+and packages the PDFs into a single ZIP download, or merges them into one
+print-ready booklet PDF
+"""
+
+import csv
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+
+from werkzeug.utils import secure_filename
+
+from cohort_charts import attach_cohort
+from config import BATCH_SETTINGS
+from pdf_booklet import build_booklet
+from report_data import build_student_data
+
+logger = logging.getLogger(__name__)
+
+# Job states written to each job's status file
+STATE_QUEUED = 'queued'
+STATE_RUNNING = 'running'
+STATE_COMPLETED = 'completed'
+STATE_COMPLETED_WITH_ERRORS = 'completed_with_errors'
+STATE_FAILED = 'failed'
+
+FINISHED_STATES = (STATE_COMPLETED, STATE_COMPLETED_WITH_ERRORS, STATE_FAILED)
+
+STATUS_FILENAME = 'status.json'
+ARCHIVE_FILENAME = 'reports.zip'
+BOOKLET_FILENAME = 'booklet.pdf'
+PARTS_DIRNAME = 'parts'
+
+# Batch output formats
+FORMAT_ZIP = 'zip'
+FORMAT_BOOKLET = 'booklet'
+
+# Student detail columns recognised in a CSV roster
+STUDENT_FIELDS = ('student_name', 'candidate_number', 'school_name', 'center_number', 'session', 'year',
+                  'guardian_email')
+
+
+class RosterError(ValueError):
+    """Raised when an uploaded roster cannot be parsed"""
+
+
+def parse_roster(content, content_type=''):
+    """
+    Parse a CSV or JSON roster into a list of students
+
+    CSV rosters have one row per student and subject with the columns
+    student_name, candidate_number, school_name, session, year, subject,
+    score, coefficient and comment (plus guardian_email for campaigns). Rows are grouped into students by
+    candidate number (or name when the candidate number is blank).
+
+    JSON rosters are either a list of students or {"students": [...]},
+    each student holding its details and a "subjects" list.
+
+    Args:
+        content (str or bytes): Raw roster content
+        content_type (str): MIME type or filename hint ('csv' or 'json')
+
+    Returns:
+        list: Student dicts with their details and a 'subjects' list
+
+    Raises:
+        RosterError: If the roster is empty or malformed
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    content = content.strip()
+    if not content:
+        raise RosterError('Roster is empty')
+
+    if 'json' in content_type or (not content_type and content[0] in '[{'):
+        return _parse_json_roster(content)
+    return _parse_csv_roster(content)
+
+
+def _parse_json_roster(content):
+    """Parse a JSON roster"""
+    try:
+        data = json.loads(content)
+    except ValueError as e:
+        raise RosterError(f'Invalid JSON roster: {str(e)}')
+
+    students = data.get('students') if isinstance(data, dict) else data
+    if not isinstance(students, list) or not students:
+        raise RosterError('JSON roster must contain a non-empty list of students')
+
+    for index, student in enumerate(students):
+        if not isinstance(student, dict) or not isinstance(student.get('subjects'), list):
+            raise RosterError(f'Student {index} must be an object with a "subjects" list')
+    return students
+
+
+def _parse_csv_roster(content):
+    """Parse a CSV roster with one row per student and subject"""
+    reader = csv.DictReader(io.StringIO(content))
+    if not reader.fieldnames or 'subject' not in reader.fieldnames or 'score' not in reader.fieldnames:
+        raise RosterError('CSV roster must have at least "subject" and "score" columns')
+
+    students = {}
+    for row in reader:
+        key = (row.get('candidate_number') or '').strip() or (row.get('student_name') or '').strip()
+        if not key:
+            raise RosterError(f'CSV row {reader.line_num} has no student_name or candidate_number')
+
+        student = students.get(key)
+        if student is None:
+            student = {field: (row.get(field) or '').strip() for field in STUDENT_FIELDS}
+            student['subjects'] = []
+            students[key] = student
+
+        student['subjects'].append({
+            'name': (row.get('subject') or '').strip(),
+            'score': (row.get('score') or '').strip(),
+            'coefficient': (row.get('coefficient') or '').strip() or 1.0,
+            'comment': (row.get('comment') or '').strip()
+        })
+
+    if not students:
+        raise RosterError('CSV roster has no student rows')
+    return list(students.values())
+
+
+def check_roster_size(count):
+    """
+    Check a batch's student count against BATCH_SETTINGS['max_students']
+
+    Raises:
+        RosterError: If the batch is empty or too large
+    """
+    if count == 0:
+        raise RosterError('Batch has no students')
+    if count > BATCH_SETTINGS['max_students']:
+        raise RosterError(f"Roster has {count} students; the limit is {BATCH_SETTINGS['max_students']}")
+
+
+def prepare_roster(students):
+    """
+    Build the report data of every student on a parsed roster
+
+    Args:
+        students (list): Parsed roster from parse_roster()
+
+    Returns:
+        list: student_data dicts from report_data.build_student_data()
+
+    Raises:
+        RosterError: If a student has invalid marks
+    """
+    prepared = []
+    for index, student in enumerate(students):
+        try:
+            prepared.append(build_student_data(student, student.get('subjects', [])))
+        except ValueError as e:
+            name = student.get('student_name') or student.get('name') or f'#{index + 1}'
+            raise RosterError(f'Student {name}: {str(e)}')
+    return prepared
+
+
+def report_filename(student_data, index):
+    """Build a unique, filesystem-safe PDF name for a student in a batch"""
+    safe_name = secure_filename(student_data.get('name', 'Student').replace(' ', '_')) or 'Student'
+    candidate = secure_filename(student_data.get('candidate_number', '')) or str(index + 1)
+    return f"{index + 1:04d}_Cambridge_Report_{safe_name}_{candidate}.pdf"
+
+
+def render_student_report(student_data, profile=None):
+    """
+    Render one student's enhanced report in memory and return the PDF bytes
+
+    Runs inside the worker pool, so it must stay a module-level function
+    that can be pickled for process workers.
+    """
+    from pdf_generator import REPORT_RENDERER
+
+    return REPORT_RENDERER.generate_enhanced_report_bytes(student_data, profile)
+
+
+class BatchJobManager:
+    """Queue roster batches, track their progress on disk and build ZIP archives"""
+
+    def __init__(self, jobs_dir=None, max_workers=None, use_processes=None):
+        # Absolute, so archive paths can be handed straight to send_file
+        self.jobs_dir = os.path.abspath(jobs_dir or BATCH_SETTINGS['jobs_folder'])
+        self.max_workers = max_workers or BATCH_SETTINGS['max_workers'] or os.cpu_count() or 1
+        self.use_processes = BATCH_SETTINGS['use_processes'] if use_processes is None else use_processes
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = {}
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    @property
+    def executor(self):
+        """Create the worker pool on first use"""
+        with self._lock:
+            if self._executor is None:
+                pool_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                self._executor = pool_class(max_workers=self.max_workers)
+                logger.info(f"Started batch worker pool: {pool_class.__name__} x {self.max_workers}")
+            return self._executor
+
+    def submit(self, students, output_format=FORMAT_ZIP, duplex=False, cohort_charts=False):
+        """
+        Validate a roster and queue every student's report for rendering
+
+        Args:
+            students (list): Parsed roster from parse_roster()
+            output_format (str): FORMAT_ZIP or FORMAT_BOOKLET
+            duplex (bool): Pad booklet reports to an even page count
+            cohort_charts (bool): Add the roster's score histograms to every report
+
+        Returns:
+            str: Job id
+
+        Raises:
+            RosterError: If the roster is too large or a student has invalid marks
+        """
+        check_roster_size(len(students))
+        return self.submit_prepared(prepare_roster(students), output_format, duplex, cohort_charts)
+
+    def submit_prepared(self, prepared, output_format=FORMAT_ZIP, duplex=False, cohort_charts=False):
+        """
+        Queue reports for students whose data is already built and validated
+
+        Reports render in parallel in the worker pool either way. A ZIP batch
+        streams each PDF into the archive as it arrives; a booklet batch keeps
+        each PDF as a part file and merges them in roster order once the last
+        one is done.
+
+        Args:
+            prepared (list): student_data dicts from report_data.build_student_data()
+            output_format (str): FORMAT_ZIP or FORMAT_BOOKLET
+            duplex (bool): Pad booklet reports to an even page count so each
+                one starts on a new sheet when printed double-sided
+            cohort_charts (bool): Add the batch's score histograms to every
+                report; they are counted once here, not per report
+
+        Returns:
+            str: Job id
+
+        Raises:
+            RosterError: If the batch is empty or too large, or the format is unknown
+        """
+        if output_format not in (FORMAT_ZIP, FORMAT_BOOKLET):
+            raise RosterError(f"Unknown batch format '{output_format}'")
+        check_roster_size(len(prepared))
+        self.purge_expired()
+
+        job_id = uuid.uuid4().hex
+        job_dir = self._job_dir(job_id)
+        os.makedirs(job_dir)
+
+        status = {
+            'job_id': job_id,
+            'state': STATE_QUEUED,
+            'total': len(prepared),
+            'completed': 0,
+            'failed': 0,
+            'errors': [],
+            'created_at': datetime.now().isoformat(),
+            'finished_at': None,
+            'format': output_format,
+            'cohort_charts': bool(cohort_charts)
+        }
+        if cohort_charts:
+            attach_cohort(prepared)
+        if output_format == FORMAT_BOOKLET:
+            status['duplex'] = bool(duplex)
+            os.makedirs(os.path.join(job_dir, PARTS_DIRNAME))
+            archive = None
+            profile = BATCH_SETTINGS['booklet_profile']
+        else:
+            # Rendered PDFs go straight into the archive as they arrive - no per-report files
+            archive = zipfile.ZipFile(os.path.join(job_dir, ARCHIVE_FILENAME + '.tmp'), 'w', zipfile.ZIP_DEFLATED)
+            profile = BATCH_SETTINGS['output_profile']
+        job = {'status': status, 'archive': archive, 'dir': job_dir}
+        with self._lock:
+            self._jobs[job_id] = job
+        self._write_status(job)
+
+        for index, student_data in enumerate(prepared):
+            filename = report_filename(student_data, index)
+            future = self.executor.submit(render_student_report, student_data, profile)
+            future.add_done_callback(
+                lambda f, i=index, d=student_data, n=filename: self._on_report_done(job_id, i, d, n, f)
+            )
+
+        logger.info(f"Queued batch {job_id} with {len(prepared)} reports")
+        return job_id
+
+    def _on_report_done(self, job_id, index, student_data, filename, future):
+        """Add one finished report to the archive and close it after the last one"""
+        with self._lock:
+            job = self._jobs[job_id]
+            status = job['status']
+            status['state'] = STATE_RUNNING
+
+            error = future.exception()
+            if error is None:
+                try:
+                    if job['archive'] is None:
+                        with open(os.path.join(job['dir'], PARTS_DIRNAME, f'{index:05d}.pdf'), 'wb') as f:
+                            f.write(future.result())
+                    else:
+                        job['archive'].writestr(filename, future.result())
+                except Exception as e:
+                    error = e
+
+            if error is None:
+                status['completed'] += 1
+            else:
+                status['failed'] += 1
+                status['errors'].append({
+                    'index': index,
+                    'student': student_data.get('name', ''),
+                    'error': str(error)
+                })
+                logger.error(f"Batch {job_id}: report {index} failed: {error}")
+
+            finished = status['completed'] + status['failed'] == status['total']
+            self._write_status(job)
+
+        if finished:
+            self._finish(job_id)
+
+    def _finish(self, job_id):
+        """Close the job's ZIP archive (or merge its booklet) and publish it for download"""
+        job = self._jobs[job_id]
+        status = job['status']
+        try:
+            if job['archive'] is None:
+                self._merge_booklet(job)
+            else:
+                job['archive'].close()
+                archive_path = os.path.join(job['dir'], ARCHIVE_FILENAME)
+                if status['completed']:
+                    os.replace(archive_path + '.tmp', archive_path)
+                else:
+                    os.remove(archive_path + '.tmp')
+
+            if status['failed'] == 0:
+                status['state'] = STATE_COMPLETED
+            elif status['completed']:
+                status['state'] = STATE_COMPLETED_WITH_ERRORS
+            else:
+                status['state'] = STATE_FAILED
+        except Exception as e:
+            status['state'] = STATE_FAILED
+            status['errors'].append({'index': None, 'student': '', 'error': f'Archive failed: {str(e)}'})
+            logger.error(f"Batch {job_id}: archive failed: {e}")
+
+        status['finished_at'] = datetime.now().isoformat()
+        with self._lock:
+            self._write_status(job)
+            self._jobs.pop(job_id, None)
+        logger.info(f"Batch {job_id} finished: {status['completed']} rendered, {status['failed']} failed")
+
+    def _merge_booklet(self, job):
+        """Merge the job's rendered parts, in roster order, into one booklet PDF"""
+        status = job['status']
+        parts_dir = os.path.join(job['dir'], PARTS_DIRNAME)
+        try:
+            if not status['completed']:
+                return
+
+            def documents():
+                for name in sorted(os.listdir(parts_dir)):
+                    with open(os.path.join(parts_dir, name), 'rb') as f:
+                        yield f.read()
+
+            booklet_path = os.path.join(job['dir'], BOOKLET_FILENAME)
+            with open(booklet_path + '.tmp', 'wb') as f:
+                merged = build_booklet(documents(), f, duplex=status['duplex'],
+                                       title=f"Cambridge Reports ({status['completed']} students)")
+            os.replace(booklet_path + '.tmp', booklet_path)
+            status['pages'] = merged['pages']
+            status['blank_pages'] = merged['blank_pages']
+        finally:
+            shutil.rmtree(parts_dir, ignore_errors=True)
+
+    def get_status(self, job_id):
+        """
+        Get a job's progress
+
+        Status is read from disk so that any web worker process can answer,
+        not only the one that accepted the batch.
+
+        Returns:
+            dict: Job status, or None if the job does not exist
+        """
+        if not self._valid_job_id(job_id):
+            return None
+
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                return dict(job['status'], errors=list(job['status']['errors']))
+
+        try:
+            with open(os.path.join(self._job_dir(job_id), STATUS_FILENAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def archive_path(self, job_id):
+        """Get the path of a finished job's ZIP archive or booklet PDF, or None if it is not ready"""
+        if not self._valid_job_id(job_id):
+            return None
+        for filename in (ARCHIVE_FILENAME, BOOKLET_FILENAME):
+            path = os.path.join(self._job_dir(job_id), filename)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def pending(self):
+        """Number of reports queued or rendering across all active jobs in this process"""
+        with self._lock:
+            return sum(job['status']['total'] - job['status']['completed'] - job['status']['failed']
+                       for job in self._jobs.values())
+
+    def purge_expired(self):
+        """Delete finished jobs older than the configured retention period"""
+        cutoff = time.time() - BATCH_SETTINGS['retention_hours'] * 3600
+        for job_id in os.listdir(self.jobs_dir):
+            job_dir = self._job_dir(job_id)
+            status_path = os.path.join(job_dir, STATUS_FILENAME)
+            try:
+                if os.path.getmtime(status_path) >= cutoff:
+                    continue
+                with open(status_path, 'r', encoding='utf-8') as f:
+                    if json.load(f).get('state') not in FINISHED_STATES:
+                        continue
+            except (OSError, ValueError):
+                continue
+            shutil.rmtree(job_dir, ignore_errors=True)
+            logger.info(f"Purged expired batch {job_id}")
+
+    def shutdown(self, wait=True):
+        """Stop the worker pool"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=wait)
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.jobs_dir, job_id)
+
+    def _valid_job_id(self, job_id):
+        return len(job_id) == 32 and all(c in '0123456789abcdef' for c in job_id)
+
+    def _write_status(self, job):
+        """Atomically write a job's status file"""
+        status_path = os.path.join(job['dir'], STATUS_FILENAME)
+        tmp_path = status_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job['status'], f)
+        os.replace(tmp_path, status_path)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Platypus layout against the direct-canvas fast path
+Usage: python benchmark_renderers.py [renders] [subjects]
+"""
+
+import sys
+import time
+
+from config import PDF_STYLE
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+
+SUBJECT_NAMES = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English Language',
+                 'History', 'Geography', 'French']
+
+
+def make_student(subject_count):
+    subjects = [{'name': SUBJECT_NAMES[i % len(SUBJECT_NAMES)], 'score': 55 + i * 5,
+                 'coefficient': 1.2, 'comment': 'Steady progress'} for i in range(subject_count)]
+    return build_student_data({'student_name': 'Benchmark Student', 'candidate_number': '0001',
+                               'school_name': 'Dobeda International School'}, subjects)
+
+
+def time_renders(student_data, renders, fast):
+    """Render the report repeatedly; returns (seconds per render, PDF size)"""
+    original = PDF_STYLE.get('fast_renderer')
+    PDF_STYLE['fast_renderer'] = fast
+    try:
+        pdf = REPORT_RENDERER.generate_enhanced_report_bytes(student_data)  # warm up
+        started = time.perf_counter()
+        for _ in range(renders):
+            REPORT_RENDERER.generate_enhanced_report_bytes(student_data)
+        return (time.perf_counter() - started) / renders, len(pdf)
+    finally:
+        PDF_STYLE['fast_renderer'] = original
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    subject_count = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    student_data = make_student(subject_count)
+
+    print(f"📊 {renders} renders, {subject_count} subjects, page furniture {'on' if PDF_STYLE.get('page_furniture') else 'off'}")
+    platypus, platypus_size = time_renders(student_data, renders, fast=False)
+    fast, fast_size = time_renders(student_data, renders, fast=True)
+    print(f"   Platypus: {platypus * 1000:.2f} ms/report, {platypus_size} bytes")
+    print(f"   Canvas:   {fast * 1000:.2f} ms/report, {fast_size} bytes")
+    print(f"   Speed-up: {platypus / fast:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
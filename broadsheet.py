@@ -0,0 +1,344 @@
+"""
+Cohort Broadsheet
+One landscape mark sheet for a whole session: a row per student with every
+subject's score and grade plus the weighted average and overall grade
+
+Rows come from the same report_data.report_fields the individual reports
+print, so a broadsheet never recalculates a result.
+
+Splitting one big Table re-scans every remaining row at each page break,
+which is quadratic in the cohort size. Every row here has a fixed height and
+every page the same frame, so the rows are cut into page-sized LongTables up
+front (each with the header rows) and no table ever needs splitting.
+
+Subjects that do not fit across one page are split into page-wide blocks,
+each repeating the leading student columns; the rows are printed block by
+block, so every student's results continue on the following pages.
+"""
+
+import io
+import math
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import LongTable, PageBreak, SimpleDocTemplate, TableStyle
+
+from config import BROADSHEET_SETTINGS, PDF_STYLE
+from fonts import needs_fallback, table_cell
+from output_profiles import get_profile
+from report_data import report_fields
+from text_layout import wrap_lines
+
+# Student columns: key -> (header, width in inches, cell text from report fields)
+COLUMNS = {
+    'candidate_number': ('Cand. No.', 0.7, lambda fields: fields['candidate_number']),
+    'student_name': ('Student', 1.8, lambda fields: fields['student_name']),
+    'school_name': ('School', 1.6, lambda fields: fields['school_name']),
+    'total_subjects': ('Subjects', 0.6, lambda fields: str(fields['total_subjects'])),
+    'gpa': ('GPA', 0.5, lambda fields: f"{fields['gpa']:.2f}"),
+    'weighted_average': ('W. Avg', 0.6, lambda fields: f"{fields['weighted_average']:.1f}%"),
+    'final_grade': ('Overall', 0.6, lambda fields: fields['final_grade']),
+    'classification': ('Class.', 1.0, lambda fields: fields['classification']),
+}
+
+# Cells under each subject heading: key -> (header, cell text from subject fields)
+SUBJECT_CELLS = {
+    'score': ('Score', lambda subject: f"{subject['score']:.0f}"),
+    'grade': ('Grade', lambda subject: subject['grade']),
+    'coefficient': ('Coeff', lambda subject: f"{subject['coefficient']:.1f}"),
+    'weighted_score': ('W.S.', lambda subject: f"{subject['weighted_score']:.1f}"),
+}
+
+# Student columns drawn before the subject block; the rest follow it
+LEADING_COLUMNS = ('candidate_number', 'student_name', 'school_name')
+
+# Cell padding (points) and the frame's own padding above and below its contents
+CELL_PADDING = 2
+FRAME_PADDING = 12
+# Room above the frame for the running heading
+HEADING_HEIGHT = 24
+
+
+class BroadsheetError(ValueError):
+    """Raised for an unknown broadsheet column, an empty cohort or columns too wide for the page"""
+
+
+def _check_keys(keys, known, kind):
+    unknown = [key for key in keys if key not in known]
+    if unknown:
+        raise BroadsheetError(f"Unknown broadsheet {kind}: {', '.join(unknown)}")
+
+
+def subject_order(cohort):
+    """Subject names across a cohort of report fields, in first-seen order"""
+    names = {}
+    for fields in cohort:
+        for subject in fields['subjects']:
+            names.setdefault(subject['name'], None)
+    return list(names)
+
+
+def broadsheet_rows(students, columns=None, subject_cells=None):
+    """
+    Lay out the broadsheet as header rows and body rows of plain strings
+
+    Args:
+        students (list): student_data dicts from report_data.build_student_data
+        columns (list): Student column keys of COLUMNS, BROADSHEET_SETTINGS by default
+        subject_cells (list): Per-subject cell keys of SUBJECT_CELLS,
+            BROADSHEET_SETTINGS by default
+
+    Returns:
+        tuple: (header rows, body rows, subject names, leading column keys,
+            trailing column keys)
+
+    Raises:
+        BroadsheetError: If a column key is unknown
+    """
+    columns = list(columns or BROADSHEET_SETTINGS['columns'])
+    subject_cells = list(subject_cells or BROADSHEET_SETTINGS['subject_cells'])
+    _check_keys(columns, COLUMNS, 'column')
+    _check_keys(subject_cells, SUBJECT_CELLS, 'subject cell')
+
+    cohort = [report_fields(student_data) for student_data in students]
+    subjects = subject_order(cohort)
+    leading = [key for key in columns if key in LEADING_COLUMNS]
+    trailing = [key for key in columns if key not in LEADING_COLUMNS]
+
+    # Two header rows: subject names spanning their cells, then the cell names
+    top = [COLUMNS[key][0] for key in leading]
+    second = [''] * len(leading)
+    for name in subjects:
+        top.extend([name] + [''] * (len(subject_cells) - 1))
+        second.extend(SUBJECT_CELLS[key][0] for key in subject_cells)
+    top.extend(COLUMNS[key][0] for key in trailing)
+    second.extend([''] * len(trailing))
+
+    blank = [''] * len(subject_cells)
+    body = []
+    for fields in cohort:
+        by_name = {subject['name']: subject for subject in fields['subjects']}
+        row = [COLUMNS[key][2](fields) for key in leading]
+        for name in subjects:
+            subject = by_name.get(name)
+            row.extend([SUBJECT_CELLS[key][1](subject) for key in subject_cells] if subject else blank)
+        row.extend(COLUMNS[key][2](fields) for key in trailing)
+        body.append(row)
+
+    return [top, second], body, subjects, leading, trailing
+
+
+def _fit(text, font_name, font_size, width):
+    """Shorten text with an ellipsis so it stays on one line of a fixed-height row"""
+    if stringWidth(text, font_name, font_size) <= width:
+        return text
+    while text and stringWidth(text + '...', font_name, font_size) > width:
+        text = text[:-1]
+    return text + '...'
+
+
+def _wrap_header(header, widths, font_size):
+    """Wrap the subject names (top header row) to their spans; returns the row height"""
+    top = header[0]
+    spans = {}
+    column = 0
+    while column < len(top):
+        span = column + 1
+        while span < len(top) and top[span] == '' and header[1][span] != '':
+            span += 1
+        spans[column] = sum(widths[column:span])
+        column = span
+
+    lines = 1
+    for column, width in spans.items():
+        wrapped = wrap_lines(top[column], 'Helvetica-Bold', font_size, width - 2 * CELL_PADDING)
+        top[column] = '\n'.join(wrapped)
+        lines = max(lines, len(wrapped))
+    return lines * (font_size + 2) + 2 * CELL_PADDING
+
+
+def _table_style(leading, trailing, subjects, cells_per_subject):
+    """Style commands for the whole table; their number does not grow with the rows"""
+    first_subject = len(leading)
+    first_trailing = first_subject + len(subjects) * cells_per_subject
+    font_size = BROADSHEET_SETTINGS['font_size']
+    commands = [
+        ('FONTNAME', (0, 0), (-1, 1), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 2), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), font_size),
+        ('LEADING', (0, 0), (-1, -1), font_size + 2),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('TOPPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('LEFTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('RIGHTPADDING', (0, 0), (-1, -1), CELL_PADDING),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.gray),
+        ('LINEBELOW', (0, 1), (-1, 1), 1, colors.black),
+        ('BOX', (0, 0), (-1, -1), 1, colors.black),
+        ('ROWBACKGROUNDS', (0, 2), (-1, -1), [colors.white, colors.HexColor('#F2F2F2')]),
+    ]
+    if first_subject:
+        commands.append(('ALIGN', (0, 2), (first_subject - 1, -1), 'LEFT'))
+    # Student columns span both header rows; subject names span their cells
+    for column in list(range(first_subject)) + list(range(first_trailing, first_trailing + len(trailing))):
+        commands.append(('SPAN', (column, 0), (column, 1)))
+    for index in range(len(subjects)):
+        start = first_subject + index * cells_per_subject
+        commands.append(('SPAN', (start, 0), (start + cells_per_subject - 1, 0)))
+        commands.append(('LINEBEFORE', (start, 0), (start, -1), 1, colors.black))
+    if trailing:
+        commands.append(('LINEBEFORE', (first_trailing, 0), (first_trailing, -1), 1, colors.black))
+    return TableStyle(commands)
+
+
+def _column_widths(width, leading, trailing, subjects, cells_per_subject):
+    """Fixed widths for student columns; subject cells share the rest of the page"""
+    fixed = [COLUMNS[key][1] * inch for key in leading + trailing]
+    cell_count = len(subjects) * cells_per_subject
+    cell_width = (width - sum(fixed)) / cell_count if cell_count else 0
+    cell_width = max(cell_width, BROADSHEET_SETTINGS['min_cell_width'])
+    return (fixed[:len(leading)] + [cell_width] * cell_count + fixed[len(leading):])
+
+
+def subject_blocks(width, leading, trailing, subjects, cells_per_subject):
+    """
+    Split the subjects into blocks that each fit across the page
+
+    Every block repeats the leading student columns; the trailing columns
+    follow the last block's subjects.
+
+    Args:
+        width (float): Frame width in points
+        leading (list): Leading column keys
+        trailing (list): Trailing column keys
+        subjects (list): Subject names in column order
+        cells_per_subject (int): Cells under each subject heading
+
+    Returns:
+        list: (subject names, trailing column keys) per block
+
+    Raises:
+        BroadsheetError: If the student columns leave no room for a subject
+    """
+    leading_width = sum(COLUMNS[key][1] * inch for key in leading)
+    trailing_width = sum(COLUMNS[key][1] * inch for key in trailing)
+    subject_width = cells_per_subject * BROADSHEET_SETTINGS['min_cell_width']
+    per_block = int((width - leading_width) // subject_width)
+    if per_block < 1 or leading_width + trailing_width > width:
+        raise BroadsheetError('The student columns are too wide for the page')
+
+    blocks = [subjects[start:start + per_block] for start in range(0, len(subjects), per_block)] or [[]]
+    # The trailing columns must fit beside the last block's subjects
+    room = int((width - leading_width - trailing_width) // subject_width)
+    if len(blocks[-1]) > room:
+        last = blocks.pop()
+        blocks.extend([last[:len(last) - room], last[len(last) - room:]] if room else [last, []])
+    return [(block, []) for block in blocks[:-1]] + [(blocks[-1], trailing)]
+
+
+def generate_broadsheet(students, target=None, columns=None, subject_cells=None, title=None, profile=None):
+    """
+    Render a cohort broadsheet PDF
+
+    Args:
+        students (list): student_data dicts from report_data.build_student_data,
+            the same data the individual reports are rendered from
+        target (file-like): Writable binary file object; rendered in memory when omitted
+        columns (list): Student column keys of COLUMNS, BROADSHEET_SETTINGS by default
+        subject_cells (list): Per-subject cell keys of SUBJECT_CELLS,
+            BROADSHEET_SETTINGS by default
+        title (str): Heading, e.g. 'June 2025 Results'; built from the first
+            student's school and session by default
+        profile (str): Output profile name, PDF_STYLE['output_profile'] by default
+
+    Returns:
+        bytes or file-like: The PDF bytes, or target when one was given
+
+    Raises:
+        BroadsheetError: If the cohort is empty, a column key is unknown or the
+            student columns leave no room for subjects
+        UnknownProfile: If the output profile is not configured
+    """
+    if not students:
+        raise BroadsheetError('A broadsheet needs at least one student')
+    output_profile = get_profile(profile)
+    header, body, subjects, leading, trailing = broadsheet_rows(students, columns, subject_cells)
+    cells_per_subject = len(subject_cells or BROADSHEET_SETTINGS['subject_cells'])
+
+    if title is None:
+        first = students[0]
+        title = f"{first.get('school_name', '')} - {first.get('session', '')} {first.get('year', '')}".strip(' -')
+
+    buffer = target if target is not None else io.BytesIO()
+    margin = PDF_STYLE['margin']
+    pagesize = landscape(A4)
+    options = output_profile.document_options(students[0])
+    if output_profile.metadata:
+        options['title'] = f"Broadsheet - {title}"
+        options['keywords'] = ''
+    doc = SimpleDocTemplate(buffer, pagesize=pagesize, leftMargin=margin, rightMargin=margin,
+                            topMargin=margin + HEADING_HEIGHT, bottomMargin=margin, **options)
+
+    # Fixed row heights make the rows per page exact (long names are shortened;
+    # names Helvetica cannot draw become one-line Paragraphs with fallback fonts)
+    font_size = BROADSHEET_SETTINGS['font_size']
+    blocks = subject_blocks(doc.width, leading, trailing, subjects, cells_per_subject)
+    widths = [COLUMNS[key][1] * inch for key in leading]
+    row_height = font_size + 2 + 2 * CELL_PADDING
+    for row in body:
+        for column in range(len(leading)):
+            if needs_fallback(row[column]):
+                row[column] = table_cell(row[column], 'Helvetica', font_size)
+            else:
+                row[column] = _fit(row[column], 'Helvetica', font_size, widths[column] - 2 * CELL_PADDING)
+
+    # Each block's table: its columns of the full rows, widths and wrapped header
+    tables = []
+    for block_subjects, block_trailing in blocks:
+        indices = list(range(len(leading)))
+        for name in block_subjects:
+            start = len(leading) + subjects.index(name) * cells_per_subject
+            indices.extend(range(start, start + cells_per_subject))
+        indices.extend(range(len(header[0]) - len(block_trailing), len(header[0])))
+        block_widths = _column_widths(doc.width, leading, block_trailing, block_subjects, cells_per_subject)
+        block_header = [[row[index] for index in indices] for row in header]
+        header_height = _wrap_header(block_header, block_widths, font_size)
+        style = _table_style(leading, block_trailing, block_subjects, cells_per_subject)
+        tables.append((indices, block_widths, block_header, header_height, style))
+
+    header_height = max(table[3] for table in tables)
+    rows_per_page = int((doc.height - FRAME_PADDING - header_height - row_height) // row_height)
+    if rows_per_page < 1:
+        raise BroadsheetError('Too many subjects for the header to fit on a page')
+
+    story = []
+    for start in range(0, len(body), rows_per_page):
+        rows = body[start:start + rows_per_page]
+        for indices, block_widths, block_header, block_header_height, style in tables:
+            if story:
+                story.append(PageBreak())
+            table = LongTable(block_header + [[row[index] for index in indices] for row in rows],
+                              colWidths=block_widths, repeatRows=len(block_header),
+                              rowHeights=[block_header_height, row_height] + [row_height] * len(rows))
+            table.setStyle(style)
+            story.append(table)
+    pages = math.ceil(len(body) / rows_per_page) * len(tables)
+
+    def decorate_page(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica-Bold', 12)
+        canvas.drawString(margin, pagesize[1] - margin - 14, f"BROADSHEET - {title}".upper())
+        canvas.setFont('Helvetica', 8)
+        canvas.drawRightString(pagesize[0] - margin, margin / 2,
+                               f"{len(body)} students - page {doc.page} of {pages}")
+        canvas.restoreState()
+
+    with output_profile.stream_encoding():
+        doc.build(story, onFirstPage=decorate_page, onLaterPages=decorate_page)
+
+    if target is not None:
+        return target
+    return buffer.getvalue()
@@ -0,0 +1,289 @@
+"""
+Canvas Report Renderer
+Fast path for the one-page Statement of Results: draws the fixed layout
+straight onto a reportlab canvas with precomputed coordinates instead of
+going through Platypus flowables, tables and paragraph parsing
+
+The geometry mirrors what SimpleDocTemplate produces for the enhanced
+report, so both paths give visually equivalent pages. Anything that would
+not fit on one page raises LayoutOverflow and is rendered by Platypus.
+"""
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+
+from config import APP_SETTINGS, IMAGE_SETTINGS, PDF_STYLE
+from fonts import needs_fallback
+from pdf_styles import COLUMN_WIDTHS, STYLES
+from report_data import report_fields
+from report_images import printed_size
+from verification import draw_qr
+
+# SimpleDocTemplate frames pad their content by 6pt on every side
+FRAME_PADDING = 6
+
+# Leading of table cells (ReportLab's default cell style)
+CELL_LEADING = 12
+
+# Characters that Platypus paragraphs would treat as markup
+_MARKUP = ('<', '>', '&')
+
+
+class LayoutOverflow(Exception):
+    """The report does not fit the fixed one-page layout"""
+
+
+class _CellStyle:
+    """Font, alignment and padding of one table cell"""
+
+    __slots__ = ('font', 'size', 'align', 'valign', 'top', 'bottom', 'left', 'right')
+
+    def __init__(self, font, size, align='LEFT', valign='BOTTOM', top=3, bottom=3, left=6, right=6):
+        self.font = font
+        self.size = size
+        self.align = align
+        self.valign = valign
+        self.top = top
+        self.bottom = bottom
+        self.left = left
+        self.right = right
+
+
+class CanvasReportRenderer:
+    """Draw the enhanced report directly on a canvas"""
+
+    def __init__(self, generator):
+        """
+        Args:
+            generator (CambridgePDFGenerator): Source of the table rows and fixed text,
+                so both renderers print exactly the same content
+        """
+        self.generator = generator
+        self.pagesize = A4
+        self.margin = PDF_STYLE['margin']
+        self.left = self.margin + FRAME_PADDING
+        self.width = self.pagesize[0] - 2 * self.left
+
+    def render(self, student_data, target, profile, logo=None, photo=None, qr=None):
+        """
+        Render the report into target
+
+        Nothing is written unless the whole report fits, so the caller can
+        fall back to Platypus on LayoutOverflow with the same target.
+
+        Args:
+            student_data (dict): Enhanced student and grade data with coefficients
+            target (str or file-like): Output path or writable binary file-like object
+            profile (OutputProfile): Compression and metadata options
+            logo (ImageReader): School crest drawn above the school name, if any
+            photo (ImageReader): Student photo; reports with one are laid out by Platypus
+            qr (VerificationQR): Verification QR code for the top right corner, if any
+
+        Raises:
+            LayoutOverflow: If the content needs more than one page
+        """
+        if len(student_data.get('subjects', [])) > APP_SETTINGS['max_subjects']:
+            raise LayoutOverflow('Too many subjects for the one-page layout')
+
+        school_name = student_data.get('school_name', 'DOBEDA INTERNATIONAL SCHOOL')
+        if any(char in school_name for char in _MARKUP):
+            raise LayoutOverflow('School name needs paragraph markup parsing')
+        if self._needs_fallback_fonts(student_data):
+            raise LayoutOverflow('Text needs fallback fonts')
+        if photo is not None:
+            raise LayoutOverflow('Student photos are laid out by Platypus')
+        if student_data.get('cohort'):
+            raise LayoutOverflow('Cohort charts are laid out by Platypus')
+
+        c = canvas.Canvas(target, pagesize=self.pagesize, **profile.canvas_options())
+        profile.apply(c, student_data)
+        top = self.pagesize[1] - self.margin - FRAME_PADDING
+        bottom = self.margin + FRAME_PADDING
+
+        footer_height = self._footer_height()
+        furniture = PDF_STYLE.get('page_furniture')
+
+        if qr is not None:
+            draw_qr(c, qr, self.pagesize, self.margin)
+
+        # Header
+        y = top
+        if logo is not None:
+            width, height = printed_size(logo, IMAGE_SETTINGS['logo_size'])
+            c.drawImage(logo, self.left + (self.width - width) / 2, y - height, width, height, mask='auto')
+            y -= height + self.generator.LOGO_SPACING
+        y = self._paragraph(c, school_name.upper(), STYLES['CambridgeTitle'], y)
+        y = self._paragraph(c, "CAMBRIDGE INTERNATIONAL EXAMINATIONS", STYLES['CambridgeSubtitle'], y)
+        y = self._paragraph(c, "STATEMENT OF RESULTS", STYLES['CambridgeDocType'], y)
+        y -= 15
+
+        # Student information
+        y = self._student_info(c, student_data, y) - 20
+
+        # Subject results
+        y = self._paragraph(c, "Subject Results", STYLES['ResultsHeader'], y)
+        y = self._grades(c, student_data, y) - 25
+
+        # Performance summary
+        y = self._paragraph(c, "PERFORMANCE SUMMARY", STYLES['SummaryHeader'], y)
+        y = self._summary(c, student_data, y) - 20
+
+        # Footer: flows after the content, or sits at the page bottom like the page furniture
+        if furniture:
+            if y < bottom + footer_height:
+                raise LayoutOverflow('Content reaches the page footer')
+            y = bottom + footer_height
+        elif y - footer_height < bottom:
+            raise LayoutOverflow('Footer does not fit on the page')
+        self._footer(c, y)
+
+        c.showPage()
+        c.save()
+
+    def _needs_fallback_fonts(self, student_data):
+        """Whether any printed text needs fonts other than Helvetica; Platypus handles those runs"""
+        fields = report_fields(student_data)
+        texts = [fields[name] for name in ('school_name', 'centre_number', 'session', 'student_name',
+                                            'candidate_number')]
+        for subject in fields['subjects']:
+            texts.extend((subject['name'], subject['comment']))
+        return any(needs_fallback(text) for text in texts)
+
+    def _paragraph(self, c, text, style, top):
+        """Draw a single-style paragraph wrapped by font metrics; returns the y below its spaceAfter"""
+        lines = simpleSplit(text, style.fontName, style.fontSize, self.width) or ['']
+        c.setFillColor(style.textColor)
+        c.setFont(style.fontName, style.fontSize)
+        baseline = top - style.fontSize
+        for line in lines:
+            if style.alignment == TA_CENTER:
+                c.drawCentredString(self.left + self.width / 2, baseline, line)
+            else:
+                c.drawString(self.left, baseline, line)
+            baseline -= style.leading
+        return top - len(lines) * style.leading - style.spaceAfter
+
+    def _table(self, c, top, col_widths, rows, cell_style):
+        """
+        Draw string cells the way platypus.Table does
+
+        Returns:
+            tuple: (x, column edges, row boundaries from top to bottom)
+        """
+        x = self.left + (self.width - sum(col_widths)) / 2
+        edges = [x]
+        for width in col_widths:
+            edges.append(edges[-1] + width)
+
+        styles = [[cell_style(r, col) for col in range(len(col_widths))] for r in range(len(rows))]
+        heights = []
+        for row, row_styles in zip(rows, styles):
+            heights.append(max(len(str(value).split('\n')) * CELL_LEADING + style.top + style.bottom
+                               for value, style in zip(row, row_styles)))
+
+        bounds = [top]
+        current = None
+        for row, row_styles, height in zip(rows, styles, heights):
+            row_bottom = bounds[-1] - height
+            bounds.append(row_bottom)
+            for col, (value, style) in enumerate(zip(row, row_styles)):
+                if (style.font, style.size) != current:
+                    c.setFont(style.font, style.size, CELL_LEADING)
+                    current = (style.font, style.size)
+                lines = str(value).split('\n')
+                if style.valign == 'MIDDLE':
+                    y = row_bottom + (style.bottom + height - style.top + len(lines) * CELL_LEADING) / 2 - style.size
+                else:
+                    y = row_bottom + style.bottom + len(lines) * CELL_LEADING - style.size
+                for line in lines:
+                    if style.align == 'CENTER':
+                        c.drawCentredString(edges[col] + (col_widths[col] + style.left - style.right) / 2, y, line)
+                    else:
+                        c.drawString(edges[col] + style.left, y, line)
+                    y -= CELL_LEADING
+        return x, edges, bounds
+
+    def _student_info(self, c, student_data, top):
+        rows = self.generator._student_info_rows(student_data)
+
+        def cell_style(row, col):
+            font = 'Helvetica-Bold' if col in (0, 2) else 'Helvetica'
+            return _CellStyle(font, 11, valign='MIDDLE', top=4, bottom=4, left=0, right=3)
+
+        c.setFillColor(colors.black)
+        _, _, bounds = self._table(c, top, COLUMN_WIDTHS['student_info'], rows, cell_style)
+        return bounds[-1]
+
+    def _grades(self, c, student_data, top):
+        rows = self.generator._grades_rows(student_data)
+
+        def cell_style(row, col):
+            align = 'LEFT' if col in (0, 5) else 'CENTER'
+            if row == 0:
+                return _CellStyle('Helvetica-Bold', 10, align, 'MIDDLE', 8, 8, 6, 6)
+            return _CellStyle('Helvetica', 9, align, 'MIDDLE', 8, 8, 6, 6)
+
+        c.setFillColor(colors.black)
+        left, edges, bounds = self._table(c, top, COLUMN_WIDTHS['grades'], rows, cell_style)
+        right, bottom = edges[-1], bounds[-1]
+
+        c.saveState()
+        c.setLineCap(1)
+        c.setLineJoin(1)
+        c.setStrokeColor(colors.black)
+        c.setLineWidth(2)
+        c.line(left, bounds[0], right, bounds[0])
+        c.line(left, bounds[1], right, bounds[1])
+        c.setStrokeColor(colors.gray)
+        c.setLineWidth(0.5)
+        for y in bounds[2:]:
+            c.line(left, y, right, y)
+        c.setStrokeColor(colors.black)
+        c.setLineWidth(1)
+        c.line(left, bottom, left, top)
+        c.line(right, bottom, right, top)
+        c.setStrokeColor(colors.gray)
+        c.setLineWidth(0.5)
+        for x in edges[1:-1]:
+            c.line(x, bottom, x, top)
+        c.restoreState()
+        return bottom
+
+    def _summary(self, c, student_data, top):
+        rows = self.generator._summary_rows(student_data)
+
+        def cell_style(row, col):
+            font = 'Helvetica-Bold' if row == 2 else 'Helvetica'
+            return _CellStyle(font, 11, 'LEFT', 'MIDDLE', 6, 6, 8, 8)
+
+        c.setFillColor(colors.black)
+        left, edges, bounds = self._table(c, top, COLUMN_WIDTHS['gpa_summary'], rows, cell_style)
+        right, bottom = edges[-1], bounds[-1]
+
+        c.saveState()
+        c.setLineCap(1)
+        c.setLineJoin(1)
+        c.setStrokeColor(colors.black)
+        c.setLineWidth(0.5)
+        for y in bounds:
+            c.line(left, y, right, y)
+        for x in edges:
+            c.line(x, bottom, x, top)
+        c.restoreState()
+        return bottom
+
+    def _footer_height(self):
+        # Spacer, three signature rows (first with 10pt bottom padding), spacer, copyright line
+        return 40 + (CELL_LEADING + 13) + 2 * (CELL_LEADING + 6) + 30 + STYLES['JoeFooter'].leading
+
+    def _footer(self, c, top):
+        def cell_style(row, col):
+            return _CellStyle('Helvetica', 10, 'CENTER', bottom=10 if row == 0 else 3)
+
+        c.setFillColor(colors.black)
+        _, _, bounds = self._table(c, top - 40, COLUMN_WIDTHS['signatures'],
+                                   self.generator.SIGNATURE_ROWS, cell_style)
+        self._paragraph(c, self.generator.COPYRIGHT_TEXT, STYLES['JoeFooter'], bounds[-1] - 30)
@@ -0,0 +1,180 @@
+"""
+Cohort Charts
+Per-subject histograms of a cohort's scores in each student's report, with
+the student's own mark highlighted
+
+The distributions are counted once per batch in a single pass over the
+cohort and travel with every student's data as a few integers per subject.
+Each subject's base chart (bars and baseline) is laid out once per process
+and kept as ready-made PDF operators; a report only adds its student's bar
+and marker, so its cost does not depend on the cohort size.
+"""
+
+import functools
+
+from reportlab.lib import colors
+from reportlab.lib.rl_accel import fp_str
+from reportlab.platypus import Flowable
+
+from config import COHORT_SETTINGS
+from fonts import needs_fallback, table_cell
+
+LABEL_FONT = 'Helvetica'
+LABEL_SIZE = 7
+LABEL_HEIGHT = 10  # Subject name above each chart
+AXIS_HEIGHT = 9  # Score scale below each chart
+CHART_GAP = 12  # Horizontal and vertical space between charts
+
+HIGHLIGHT = colors.HexColor('#1f4e79')
+MARKER = colors.HexColor('#c00000')
+
+
+def _bin_count():
+    width = COHORT_SETTINGS['bin_width']
+    return -(-100 // width)
+
+
+def score_bin(score, bins):
+    """Histogram bar for a score; 100 falls in the top bar"""
+    return min(max(int(score // COHORT_SETTINGS['bin_width']), 0), bins - 1)
+
+
+def cohort_distributions(students):
+    """
+    Score histograms per subject for a cohort, counted in one pass
+
+    Subjects taken by fewer than COHORT_SETTINGS['min_students'] students get
+    no histogram, so no one's mark can be worked out from a chart.
+
+    Args:
+        students (list): student_data dicts from build_student_data
+
+    Returns:
+        dict: Subject name -> list of student counts per score bar
+    """
+    bins = _bin_count()
+    counts = {}
+    for student_data in students:
+        for subject in student_data.get('subjects', []):
+            row = counts.get(subject['name'])
+            if row is None:
+                row = counts[subject['name']] = [0] * bins
+            row[score_bin(subject['score'], bins)] += 1
+    return {name: row for name, row in counts.items() if sum(row) >= COHORT_SETTINGS['min_students']}
+
+
+def attach_cohort(students, distributions=None):
+    """
+    Give every student's data the cohort distributions, for charts in their reports
+
+    Args:
+        students (list): student_data dicts, updated in place
+        distributions (dict): From cohort_distributions; counted from students by default
+
+    Returns:
+        dict: The distributions
+    """
+    if distributions is None:
+        distributions = cohort_distributions(students)
+    for student_data in students:
+        student_data['cohort'] = distributions
+    return distributions
+
+
+@functools.lru_cache(maxsize=COHORT_SETTINGS.get('chart_cache', 256))
+def _base_chart(counts, width, height):
+    """
+    PDF operators for a subject's bars and baseline, once per distribution
+
+    Returns:
+        tuple: (operators, tallest bar count)
+    """
+    tallest = max(counts)
+    bar_width = width / len(counts)
+    bars = ' '.join(f"{fp_str(index * bar_width, 0, bar_width * 0.9, height * count / tallest)} re"
+                    for index, count in enumerate(counts) if count)
+    operators = f"q 0.8 g {bars} f 0 G 0.5 w 0 0 m {fp_str(width)} 0 l S Q"
+    return operators, tallest
+
+
+class CohortCharts(Flowable):
+    """A grid of one histogram per subject the student took, with their mark highlighted"""
+
+    def __init__(self, student_data):
+        """
+        Args:
+            student_data (dict): Enhanced student data with 'cohort' distributions
+        """
+        super().__init__()
+        cohort = student_data.get('cohort') or {}
+        self.charts = [(subject['name'], subject['score'], tuple(cohort[subject['name']]))
+                       for subject in student_data.get('subjects', []) if subject['name'] in cohort]
+        self.chart_width, self.chart_height = COHORT_SETTINGS['chart_size']
+        self.per_row = COHORT_SETTINGS['per_row']
+
+    @property
+    def cell_height(self):
+        return LABEL_HEIGHT + self.chart_height + AXIS_HEIGHT + CHART_GAP
+
+    def wrap(self, availWidth, availHeight):
+        rows = -(-len(self.charts) // self.per_row)
+        self.width = availWidth
+        self.height = rows * self.cell_height
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        # Whole rows of charts may continue on the next page
+        rows = int(availHeight // self.cell_height)
+        if rows < 1 or rows * self.per_row >= len(self.charts):
+            return []
+        first, rest = CohortCharts({}), CohortCharts({})
+        first.charts = self.charts[:rows * self.per_row]
+        rest.charts = self.charts[rows * self.per_row:]
+        return [first, rest]
+
+    def draw(self):
+        canvas = self.canv
+        spacing = (self.width - self.per_row * self.chart_width) / max(self.per_row - 1, 1)
+        for index, chart in enumerate(self.charts):
+            row, column = divmod(index, self.per_row)
+            x = column * (self.chart_width + spacing)
+            y = self.height - (row + 1) * self.cell_height + CHART_GAP + AXIS_HEIGHT
+            self._draw_chart(canvas, x, y, *chart)
+
+    def _draw_chart(self, canvas, x, y, name, score, counts):
+        width, height = self.chart_width, self.chart_height
+        operators, tallest = _base_chart(counts, width, height)
+        bins = len(counts)
+        bar_width = width / bins
+
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.addLiteral(operators)
+
+        # The student's own bar and exact mark
+        index = score_bin(score, bins)
+        canvas.setFillColor(HIGHLIGHT)
+        canvas.rect(index * bar_width, 0, bar_width * 0.9, height * counts[index] / tallest, stroke=0, fill=1)
+        marker = width * min(max(score, 0), 100) / 100
+        canvas.setStrokeColor(MARKER)
+        canvas.setLineWidth(1)
+        canvas.line(marker, 0, marker, height)
+
+        canvas.setFillColor(colors.black)
+        canvas.setFont(LABEL_FONT, LABEL_SIZE)
+        self._draw_label(canvas, height + 3, f"{name} ({sum(counts)} students)")
+        canvas.drawString(0, -AXIS_HEIGHT + 1, '0')
+        canvas.drawRightString(width, -AXIS_HEIGHT + 1, '100')
+        canvas.setFillColor(MARKER)
+        canvas.drawCentredString(min(max(marker, 12), width - 12), -AXIS_HEIGHT + 1, f"{score:.0f}")
+        canvas.restoreState()
+
+    def _draw_label(self, canvas, baseline, text):
+        """Subject label; names the label font cannot draw get fallback font runs"""
+        if not needs_fallback(text):
+            canvas.drawString(0, baseline, text)
+            return
+        label = table_cell(text, LABEL_FONT, LABEL_SIZE)
+        label.wrapOn(canvas, self.width, LABEL_HEIGHT)
+        # Paragraphs are placed by their bottom edge; keep the baseline of the plain labels
+        label.drawOn(canvas, 0, baseline - (label.height - LABEL_SIZE))
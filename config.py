@@ -3,6 +3,8 @@ Cambridge Exam Report Card System Configuration
 Contains subjects, coefficients, and grade thresholds following Cambridge International standards
 """
 
+import os
+
 # Cambridge subjects with their official coefficients and codes
 CAMBRIDGE_SUBJECTS = {
     # Mathematics
@@ -124,7 +126,176 @@ PDF_STYLE = {
     "header_font_size": 14,  # Reduced from 16 to 14
     "body_font_size": 10,  # Reduced from 12 to 10
     "small_font_size": 9,  # Reduced from 10 to 9
-    "line_height": 12  # Reduced from 14 to 12
+    "line_height": 12,  # Reduced from 14 to 12
+    "page_furniture": True,  # Draw the school header, signatures and footer as a per-school form XObject
+    "fast_renderer": True,  # Draw one-page reports directly on the canvas, falling back to Platypus
+    "output_profile": "print",  # Profile used when a caller does not name one (see OUTPUT_PROFILES)
+    "text_layout_cache": 4096,  # Wrapped table-cell texts kept per process
+    "deterministic": False,  # Fixed PDF IDs and timestamps: identical inputs give byte-identical files
+    "report_date": None  # Date printed on reports (YYYY-MM-DD) when student data has none; None for today
+}
+
+# Named PDF output profiles: stream encoding, images and document metadata.
+# Page streams are always compressed; "ascii85" also wraps them in ASCII85
+# (7-bit clean, about a quarter larger), which MIME attachments never need
+OUTPUT_PROFILES = {
+    "email": {
+        "ascii85": False,
+        "metadata": False,  # Strip title, author, creator and keywords
+        "image_dpi": 110,  # Logos and photos are downsampled to this resolution at printed size
+        "image_quality": 60  # JPEG quality for photos
+    },
+    "print": {
+        "ascii85": False,
+        "metadata": True,
+        "image_dpi": 300,
+        "image_quality": 90
+    },
+    "archive": {
+        "ascii85": False,
+        "metadata": True,  # Keep searchable document info in the archive
+        "image_dpi": 150,
+        "image_quality": 80
+    }
+}
+
+# Fonts for text the standard Helvetica cannot draw (Arabic, Chinese, Hindi names and comments)
+FONT_SETTINGS = {
+    "folder": "fonts",
+    # Tried in order per character. TrueType files go in the folder and are
+    # skipped if absent; CID fonts ship with ReportLab and need no file.
+    "fallbacks": [
+        {"name": "NotoNaskhArabic", "file": "NotoNaskhArabic-Regular.ttf"},
+        {"name": "NotoSansDevanagari", "file": "NotoSansDevanagari-Regular.ttf"},
+        {"name": "STSong-Light", "cid": True}
+    ],
+    "coverage_cache": 8192  # Characters and text runs whose font lookup is kept per process
+}
+
+# School crests and student photos
+IMAGE_SETTINGS = {
+    "logos": {},  # School name -> crest image path, e.g. {"DOBEDA INTERNATIONAL SCHOOL": "uploads/logos/dobeda.png"}
+    "logo_size": [54, 54],  # Printed box in points; the crest keeps its aspect ratio inside it
+    "photo_size": [60, 75],
+    "thumbnail_folder": "uploads/photos",  # Imported photos, <candidate number>.jpg
+    "cache_entries": 512  # Fitted logos and photos kept decoded per process
+}
+
+# Verification QR codes on Statements of Results (checked at /verify/<token>)
+VERIFY_SETTINGS = {
+    # Only with a public address for the QR code to point at; the app refuses
+    # to start with verification enabled and no base_url
+    "enabled": bool(os.environ.get('VERIFY_BASE_URL')),
+    "signing_key": os.environ.get('REPORT_SIGNING_KEY', ''),  # Empty: a random key created in key_file
+    "key_file": "reports/verification.key",
+    "store_db": "reports/verification.db",  # Key results of every issued report, by token
+    "base_url": os.environ.get('VERIFY_BASE_URL', ''),  # Public address printed in the QR code
+    "qr_size": 56,  # Points, quiet zone included; drawn in the top right corner of the first page
+    "qr_cache": 1024  # Encoded QR drawings kept per process
+}
+
+# Cohort histograms in student reports (batches with cohort charts turned on)
+COHORT_SETTINGS = {
+    "bin_width": 10,  # Score range per histogram bar; 100 falls in the top bar
+    "min_students": 5,  # Subjects with fewer students get no chart, so no one's mark can be worked out
+    "chart_size": [160, 40],  # Points per subject chart, labels not included
+    "per_row": 3,
+    "chart_cache": 256  # Base charts (one per subject distribution) kept per process
+}
+
+# Declarative report templates (JSON files in the folder, named <template id>.json)
+TEMPLATE_SETTINGS = {
+    "folder": "report_templates",
+    "default": "",  # Template id for schools without their own; "" = built-in layout
+    "schools": {}  # School name -> template id, e.g. {"DOBEDA INTERNATIONAL SCHOOL": "enhanced"}
+}
+
+# Cohort broadsheet (one landscape mark sheet per session)
+BROADSHEET_SETTINGS = {
+    # Student columns, see broadsheet.COLUMNS; subject columns sit after the
+    # candidate number, student and school columns and before the rest
+    "columns": ["candidate_number", "student_name", "weighted_average", "final_grade"],
+    "subject_cells": ["score", "grade"],  # Cells under each subject, see broadsheet.SUBJECT_CELLS
+    "font_size": 7,
+    "min_cell_width": 22  # Points; subjects that do not fit are continued on further pages rather than squashed
+}
+
+# Batch report generation settings
+BATCH_SETTINGS = {
+    "jobs_folder": "reports/batches",
+    "max_workers": 0,  # 0 = one worker per CPU core
+    "use_processes": True,  # Render in worker processes rather than threads
+    "max_students": 2000,
+    "retention_hours": 24,  # Finished batches are purged after this long
+    "output_profile": "archive",  # Batch archives are kept for the session records
+    "booklet_profile": "print"  # Class booklets are merged into one PDF for printing
+}
+
+# Rendered report PDF cache settings
+CACHE_SETTINGS = {
+    "memory_max_bytes": 64 * 1024 * 1024,  # In-process LRU size cap
+    "disk_folder": None,  # e.g. "reports/cache" to enable the on-disk tier
+    "disk_max_bytes": 512 * 1024 * 1024,
+    "disk_prune_interval": 100  # Check the disk tier size every N writes
+}
+
+# On-screen report previews: PNGs of the real first page, and quick HTML previews
+PREVIEW_SETTINGS = {
+    "rasterizer": "pdftoppm",  # Poppler's pdftoppm (poppler-utils package); previews are off without it
+    "dpi": 96,  # Screen resolution
+    "timeout": 20,  # Seconds allowed for one rasterization
+    "output_profile": "email",  # Screen-resolution images are plenty for a preview
+    "memory_max_bytes": 32 * 1024 * 1024,
+    "disk_folder": "reports/previews",  # Shared by all workers: any of them may be asked for a preview
+    "disk_max_bytes": 256 * 1024 * 1024,
+    "max_age": 365 * 24 * 3600,  # Cache-Control max-age; preview URLs are content hashes and never change
+    "html_folder": "templates",  # Jinja templates for HTML previews, compiled once per process
+    "html_template": "report_preview.html"
+}
+
+# Outgoing mail settings - SMTP credentials come from the environment
+MAIL_SETTINGS = {
+    "smtp_host": os.environ.get('SMTP_HOST', ''),  # Empty disables real delivery
+    "smtp_port": int(os.environ.get('SMTP_PORT', 587)),
+    "username": os.environ.get('SMTP_USERNAME', ''),
+    "password": os.environ.get('SMTP_PASSWORD', ''),
+    "use_tls": os.environ.get('SMTP_USE_TLS', '1') == '1',  # STARTTLS
+    "use_ssl": os.environ.get('SMTP_USE_SSL', '0') == '1',  # Implicit TLS (port 465)
+    "sender": os.environ.get('SMTP_SENDER', 'reports@dobeda.school'),
+    "timeout": 30,
+    "outbox_db": "reports/outbox.db",
+    "batch_size": 50,  # Messages claimed from the outbox per pass
+    "messages_per_minute": int(os.environ.get('SMTP_MESSAGES_PER_MINUTE', 0)),  # 0 = no limit
+    "poll_interval": 5,  # Seconds between outbox checks when idle
+    "idle_timeout": 60,  # Close the pooled SMTP connection after this many idle seconds
+    "claim_timeout": 300,  # Reclaim messages stuck in 'sending' after this long
+    "max_attempts": 5,
+    "retry_base_delay": 30,  # Seconds; doubled after each failed attempt
+    "retry_max_delay": 3600,
+    "output_profile": "email"  # Smallest PDFs for attachments read on mobile connections
+}
+
+RENDER_LIMITS = {
+    "max_concurrent": 0,  # Reports rendering at once across all workers; 0 = one per CPU core
+    "max_waiting": 4,  # Requests allowed to wait for a slot before new ones get a 503
+    "wait_timeout": 2.0,  # Seconds a waiting request may wait for a slot
+    "retry_after": 5  # Retry-After header (seconds) sent with the 503
+}
+
+LOG_SETTINGS = {
+    "file": "logs/app.log",
+    "level": os.environ.get('LOG_LEVEL', 'INFO'),
+    "format": "json",  # "json" lines or the classic "text" format
+    "async": True,  # Write log files from a listener thread instead of the request thread
+    "console": True,
+    # "size", "time", "external" (logrotate moves the file; it is reopened) or None.
+    # Forked workers never rotate; gunicorn_config.py selects "external"
+    "rotate": os.environ.get('LOG_ROTATE', 'size'),
+    "max_bytes": 10 * 1024 * 1024,  # Size rotation threshold
+    "when": "midnight",  # Time rotation interval
+    "backup_count": 14,
+    "compress": True,  # Gzip rotated files in the background
+    "subject_sample_rate": 0.0  # Fraction of per-subject debug lines kept (0 = none, 1 = all)
 }
 
 def get_subject_coefficient(subject_name):
@@ -58,7 +58,7 @@ User=cambridgeexam
 Group=cambridgeexam
 WorkingDirectory=$APP_DIR
 Environment=PATH=$APP_DIR/venv/bin
-ExecStart=$APP_DIR/venv/bin/gunicorn --bind 0.0.0.0:5000 --workers 3 wsgi:application
+ExecStart=$APP_DIR/venv/bin/gunicorn -c gunicorn_config.py wsgi:application
 ExecReload=/bin/kill -s HUP \$MAINPID
 Restart=on-failure
 RestartSec=5
@@ -0,0 +1,126 @@
+"""
+Email Campaigns
+Mails every student's report to their guardians in one operation, rendering
+PDFs in the batch worker pool while earlier messages are already being sent
+"""
+
+import logging
+import re
+import uuid
+
+from batch_jobs import RosterError, check_roster_size, render_student_report, report_filename
+from config import MAIL_SETTINGS
+from mail_outbox import report_email_content
+from report_data import build_student_data
+
+logger = logging.getLogger(__name__)
+
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+
+def guardian_emails(student):
+    """
+    Collect a student's guardian addresses from a roster entry
+
+    Accepts a 'guardian_emails' list or a 'guardian_email' string with
+    several addresses separated by ';' or ','.
+
+    Returns:
+        list: Unique addresses in roster order
+    """
+    raw = student.get('guardian_emails') or student.get('guardian_email') or []
+    if isinstance(raw, str):
+        raw = re.split(r'[;,]', raw)
+
+    emails = []
+    for email in raw:
+        email = str(email).strip()
+        if email and email not in emails:
+            emails.append(email)
+    return emails
+
+
+class CampaignManager:
+    """Render a cohort's reports and queue them for delivery to guardians"""
+
+    def __init__(self, outbox, sender, pool):
+        """
+        Args:
+            outbox (Outbox): Persistent outbox the messages are queued in
+            sender (MailSender): Background sender to wake as reports are queued
+            pool (BatchJobManager): Owner of the shared render worker pool
+        """
+        self.outbox = outbox
+        self.sender = sender
+        self.pool = pool
+
+    def submit(self, students):
+        """
+        Validate a roster and start a campaign
+
+        Every student must have at least one valid guardian address. Each
+        report is queued for its guardians as soon as it has rendered.
+
+        Args:
+            students (list): Parsed roster from batch_jobs.parse_roster()
+
+        Returns:
+            str: Campaign id
+
+        Raises:
+            RosterError: If the roster is empty or too large, or a student has
+                invalid marks or guardian addresses
+        """
+        # Same limit as batches: every report goes through the shared render pool
+        check_roster_size(len(students))
+        prepared = []
+        for index, student in enumerate(students):
+            name = student.get('student_name') or student.get('name') or f'#{index + 1}'
+            recipients = guardian_emails(student)
+            if not recipients:
+                raise RosterError(f'Student {name}: no guardian email address')
+            invalid = [email for email in recipients if not EMAIL_PATTERN.match(email)]
+            if invalid:
+                raise RosterError(f"Student {name}: invalid guardian email {', '.join(invalid)}")
+            try:
+                student_data = build_student_data(student, student.get('subjects', []))
+            except ValueError as e:
+                raise RosterError(f'Student {name}: {str(e)}')
+            prepared.append((student_data, recipients))
+
+        campaign_id = uuid.uuid4().hex
+        self.outbox.create_campaign(campaign_id, len(prepared))
+
+        for index, (student_data, recipients) in enumerate(prepared):
+            future = self.pool.executor.submit(render_student_report, student_data, MAIL_SETTINGS['output_profile'])
+            future.add_done_callback(
+                lambda f, i=index, d=student_data, r=recipients: self._on_rendered(campaign_id, i, d, r, f)
+            )
+
+        logger.info(f"Campaign {campaign_id} started for {len(prepared)} students")
+        return campaign_id
+
+    def _on_rendered(self, campaign_id, index, student_data, recipients, future):
+        """Queue a rendered report for each guardian and wake the sender"""
+        subject, body = report_email_content(student_data)
+        error = future.exception()
+        try:
+            if error is None:
+                filename = report_filename(student_data, index)
+                pdf_bytes = future.result()
+                for recipient in recipients:
+                    self.outbox.enqueue(recipient, subject, body, filename, pdf_bytes, campaign_id=campaign_id)
+                self.outbox.record_render(campaign_id, True)
+                self.sender.notify()
+            else:
+                for recipient in recipients:
+                    self.outbox.record_failure(recipient, subject, f'Report could not be rendered: {error}',
+                                               campaign_id=campaign_id)
+                self.outbox.record_render(campaign_id, False)
+                logger.error(f"Campaign {campaign_id}: report for {student_data['name']} failed: {error}")
+        except Exception as e:
+            logger.error(f"Campaign {campaign_id}: could not queue report for {student_data['name']}: {e}")
+
+    def progress(self, campaign_id):
+        """Get a campaign's progress and per-recipient status, or None"""
+        return self.outbox.campaign_progress(campaign_id)
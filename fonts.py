@@ -0,0 +1,172 @@
+"""
+Report Fonts
+Unicode text for the non-Latin scripts in the subject catalogue (Arabic,
+Chinese, Hindi): fallback fonts registered once per process, glyph coverage
+looked up once per character, and text split into runs that each use the
+first font able to draw them
+
+The report styles keep the standard Helvetica faces; only runs Helvetica
+cannot encode switch to a fallback. TrueType fallbacks are parsed once when
+registered and ReportLab embeds just the glyphs each document uses.
+"""
+
+import functools
+import logging
+import os
+import threading
+from xml.sax.saxutils import escape
+
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.platypus import Paragraph
+
+from config import FONT_SETTINGS
+from pdf_styles import FrozenParagraphStyle
+from text_layout import wrap_text
+
+logger = logging.getLogger(__name__)
+
+# Encoding of the standard Type 1 fonts (ReportLab's WinAnsiEncoding)
+BASE_ENCODING = 'cp1252'
+
+# CID fonts ship with ReportLab (the viewer supplies the glyphs), so their
+# coverage is known by Unicode block rather than read from a font file
+CID_COVERAGE = {
+    'STSong-Light': ((0x2E80, 0x303F), (0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF), (0xFF00, 0xFFEF)),
+    'MSung-Light': ((0x2E80, 0x303F), (0x3400, 0x4DBF), (0x4E00, 0x9FFF), (0xF900, 0xFAFF), (0xFF00, 0xFFEF)),
+}
+
+_fallbacks = None
+_register_lock = threading.Lock()
+
+
+def register_fonts():
+    """
+    Register the configured fallback fonts, once per process
+
+    Font files that are missing or unreadable are logged and skipped, so a
+    deployment without them still renders Latin reports.
+
+    Returns:
+        tuple: (font name, covers(codepoint) function) for each usable
+            fallback, in FONT_SETTINGS order
+    """
+    global _fallbacks
+    if _fallbacks is not None:
+        return _fallbacks
+
+    with _register_lock:
+        if _fallbacks is None:
+            fallbacks = []
+            for entry in FONT_SETTINGS['fallbacks']:
+                name = entry['name']
+                try:
+                    if entry.get('cid'):
+                        if name not in CID_COVERAGE:
+                            raise ValueError('unknown CID font')
+                        pdfmetrics.registerFont(UnicodeCIDFont(name))
+                        covers = functools.partial(_in_ranges, CID_COVERAGE[name])
+                    else:
+                        font = TTFont(name, os.path.join(FONT_SETTINGS['folder'], entry['file']))
+                        pdfmetrics.registerFont(font)
+                        covers = font.face.charToGlyph.__contains__
+                except (OSError, TTFError, ValueError) as e:
+                    logger.warning(f"Fallback font {name} not available: {e}")
+                    continue
+                fallbacks.append((name, covers))
+            _fallbacks = tuple(fallbacks)
+            logger.info(f"Registered fallback fonts: {', '.join(name for name, _ in _fallbacks) or 'none'}")
+    return _fallbacks
+
+
+def _in_ranges(ranges, codepoint):
+    return any(start <= codepoint <= end for start, end in ranges)
+
+
+@functools.lru_cache(maxsize=FONT_SETTINGS.get('coverage_cache', 8192))
+def font_for(char):
+    """
+    Font to draw one character with
+
+    Returns:
+        str or None: Fallback font name, or None when the base font can draw it
+            (or no fallback can, in which case the base font draws its blank glyph)
+    """
+    try:
+        char.encode(BASE_ENCODING)
+        return None
+    except UnicodeEncodeError:
+        pass
+    codepoint = ord(char)
+    for name, covers in register_fonts():
+        if covers(codepoint):
+            return name
+    return None
+
+
+@functools.lru_cache(maxsize=FONT_SETTINGS.get('coverage_cache', 8192))
+def text_runs(text):
+    """
+    Split text into runs of one font each
+
+    Spaces after fallback characters stay in the fallback run, so a name
+    written in one script is a single run.
+
+    Returns:
+        tuple: (font name or None for the base font, text) pairs
+    """
+    runs = []
+    for char in text:
+        font = font_for(char)
+        if runs:
+            current, chars = runs[-1]
+            if font == current or (font is None and current is not None and char.isspace()):
+                chars.append(char)
+                continue
+        runs.append((font, [char]))
+    return tuple((font, ''.join(chars)) for font, chars in runs)
+
+
+def needs_fallback(text):
+    """Whether any character of text needs a fallback font"""
+    text = str(text)
+    return not text.isascii() and any(font is not None for font, _ in text_runs(text))
+
+
+def font_markup(text):
+    """
+    Escape text for a Paragraph, wrapping runs the base font cannot draw in <font> tags
+    """
+    if not needs_fallback(text):
+        return escape(text)
+    return ''.join(escape(chunk) if font is None else f'<font name="{font}">{escape(chunk)}</font>'
+                   for font, chunk in text_runs(text))
+
+
+@functools.lru_cache(maxsize=None)
+def _cell_style(font_name, font_size):
+    return FrozenParagraphStyle(f'FallbackCell-{font_name}-{font_size}', fontName=font_name,
+                                fontSize=font_size, leading=font_size * 1.2)
+
+
+def table_cell(text, font_name, font_size, width=None):
+    """
+    Table cell for text: plain text, or a Paragraph with fallback font runs
+    when the base font cannot draw all of it
+
+    Args:
+        text (str): Cell text
+        font_name (str): Cell font from the table style
+        font_size (float): Cell font size
+        width (float): Available width in points (cell width minus padding)
+            to wrap plain text to by font metrics; None leaves it unwrapped
+
+    Returns:
+        str or Paragraph: Cell value for platypus.Table
+    """
+    if needs_fallback(text):
+        return Paragraph(font_markup(text), _cell_style(font_name, font_size))
+    if width is None:
+        return text
+    return wrap_text(text, font_name, font_size, width)
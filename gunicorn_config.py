@@ -0,0 +1,48 @@
+"""
+Gunicorn configuration for production deployments
+
+    gunicorn -c gunicorn_config.py wsgi:application
+
+The app is preloaded in the master, where wsgi.py renders a warmup report
+before any worker is forked, so every worker starts with ReportLab, font
+metrics and stylesheets already loaded (shared copy-on-write).
+"""
+
+import os
+
+# Every worker appends to the same log file, so none of them may rotate it;
+# rotate logs/app.log with logrotate instead (the file is reopened once moved)
+os.environ.setdefault('LOG_ROTATE', 'external')
+
+
+def available_cores():
+    """CPU cores this process may run on (respects container and taskset limits)"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+
+# Report rendering is CPU-bound, so one worker per core (plus one to cover
+# requests blocked on I/O) rather than gunicorn's usual 2 x cores + 1
+workers = int(os.environ.get('GUNICORN_WORKERS', 0)) or available_cores() + 1
+
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+
+
+def when_ready(server):
+    # Background threads started during preload would only run in the
+    # master; workers start their own after the fork
+    import app
+    app.stop_mail_sender()
+
+
+def post_fork(server, worker):
+    import app
+    app.start_mail_sender(rate_share=server.num_workers)
+    app.share_render_limits(server.num_workers)
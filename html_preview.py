@@ -0,0 +1,44 @@
+"""
+HTML Report Previews
+A Statement of Results as an HTML fragment for on-screen previews, filled
+from the same report_fields the PDF layouts print
+
+The Jinja template is compiled on first use and kept by the environment,
+which never re-reads it from disk (auto_reload is off), so a preview costs
+one template call. PDFs are only built for the final export.
+"""
+
+import jinja2
+
+from config import PREVIEW_SETTINGS
+from pdf_generator import CambridgePDFGenerator
+from report_data import report_fields
+
+_environment = jinja2.Environment(
+    loader=jinja2.FileSystemLoader(PREVIEW_SETTINGS['html_folder']),
+    autoescape=True,
+    auto_reload=False,
+    trim_blocks=True,
+    lstrip_blocks=True,
+)
+
+
+def render_html_preview(student_data, template=None):
+    """
+    Render a report as an HTML fragment
+
+    Args:
+        student_data (dict): Enhanced student data from build_student_data
+        template (str): Template file in PREVIEW_SETTINGS['html_folder'],
+            PREVIEW_SETTINGS['html_template'] by default
+
+    Returns:
+        str: HTML with every value escaped
+
+    Raises:
+        jinja2.TemplateNotFound: If the template file does not exist
+    """
+    compiled = _environment.get_template(template or PREVIEW_SETTINGS['html_template'])
+    return compiled.render(report=report_fields(student_data),
+                           signature_rows=CambridgePDFGenerator.SIGNATURE_ROWS,
+                           copyright=CambridgePDFGenerator.COPYRIGHT_TEXT)
@@ -0,0 +1,251 @@
+"""
+Logging Configuration
+Queue-based logging for the web application: request threads only enqueue
+records, and a listener thread writes them as JSON lines to rotating log
+files that are gzip-compressed in the background
+
+Only the process that configured logging rotates its file. Forked children
+(gunicorn workers, batch render processes) get their own listener writing
+through a WatchedFileHandler, which never rotates and reopens the file once
+it has been moved; preforked servers use rotate "external" (logrotate) so
+that no process rotates the file under the others.
+"""
+
+import atexit
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import shutil
+import sys
+import threading
+from datetime import datetime, timezone
+
+from config import LOG_SETTINGS
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Per-subject detail lines are logged here at DEBUG and sampled
+SUBJECT_LOGGER = 'cambridge.subjects'
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+_installed = []
+
+
+class JsonFormatter(logging.Formatter):
+    """Format each record as a single-line JSON object, including extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+            'thread': record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SampleFilter(logging.Filter):
+    """Keep a random fraction of the records passing through"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return self.rate >= 1 or random.random() < self.rate
+
+
+def _gzip_file(source, target):
+    with open(source, 'rb') as src, gzip.open(target, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(source)
+
+
+class _GzipRollover:
+    """
+    Mixin for rotating handlers that gzips each rotated file on a background
+    thread, so the listener keeps writing while the old file is compressed
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._compressing = None
+        self.namer = lambda name: name + '.gz'
+        self.rotator = self._rotate
+
+    def _rotate(self, source, dest):
+        staging = dest[:-len('.gz')]
+        os.replace(source, staging)
+        self._compressing = threading.Thread(target=_gzip_file, args=(staging, dest),
+                                             name='log-compressor', daemon=True)
+        self._compressing.start()
+
+    def wait_for_compression(self):
+        if self._compressing is not None:
+            self._compressing.join()
+
+    def doRollover(self):
+        # Backups are renamed before the new one is rotated in, so the last
+        # compression has to finish first to keep the numbering intact
+        self.wait_for_compression()
+        super().doRollover()
+
+    def close(self):
+        self.wait_for_compression()
+        super().close()
+
+
+class GzipRotatingFileHandler(_GzipRollover, logging.handlers.RotatingFileHandler):
+    """Size-rotated log file with background compression"""
+
+
+class GzipTimedRotatingFileHandler(_GzipRollover, logging.handlers.TimedRotatingFileHandler):
+    """Time-rotated log file with background compression"""
+
+
+def _file_handler(settings):
+    """Create the log file handler selected by the rotation settings"""
+    path = settings['file']
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    rotate = settings.get('rotate')
+    compress = settings.get('compress', True)
+    if rotate == 'size':
+        handler_class = GzipRotatingFileHandler if compress else logging.handlers.RotatingFileHandler
+        return handler_class(path, maxBytes=settings['max_bytes'],
+                             backupCount=settings['backup_count'], encoding='utf-8')
+    if rotate == 'time':
+        handler_class = GzipTimedRotatingFileHandler if compress else logging.handlers.TimedRotatingFileHandler
+        return handler_class(path, when=settings['when'],
+                             backupCount=settings['backup_count'], encoding='utf-8')
+    if rotate == 'external':
+        return logging.handlers.WatchedFileHandler(path, encoding='utf-8')
+    return logging.FileHandler(path, encoding='utf-8')
+
+
+def configure_logging(settings=None):
+    """
+    Configure the root logger for the web application
+
+    In async mode the root logger only gets a QueueHandler; formatting and
+    file I/O (including rotation) happen on a QueueListener thread.
+
+    Args:
+        settings (dict): Overrides for LOG_SETTINGS
+
+    Returns:
+        logging.handlers.QueueListener: The running listener, or None in synchronous mode
+    """
+    global _listener
+    settings = dict(LOG_SETTINGS, **(settings or {}))
+    stop_logging()
+
+    handlers = []
+    if settings.get('file'):
+        handlers.append(_file_handler(settings))
+    if settings.get('console'):
+        handlers.append(logging.StreamHandler(sys.stdout))
+
+    formatter = JsonFormatter() if settings.get('format') == 'json' else logging.Formatter(TEXT_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel(settings.get('level', 'INFO'))
+    if settings.get('async', True):
+        # SimpleQueue takes no lock on put, so forking mid-log cannot deadlock it
+        log_queue = queue.SimpleQueue()
+        _installed.append(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+    else:
+        _installed.extend(handlers)
+    for handler in _installed:
+        root.addHandler(handler)
+
+    subject_logger = logging.getLogger(SUBJECT_LOGGER)
+    for old_filter in [f for f in subject_logger.filters if isinstance(f, SampleFilter)]:
+        subject_logger.removeFilter(old_filter)
+    rate = settings.get('subject_sample_rate', 0)
+    if rate > 0:
+        subject_logger.setLevel(logging.DEBUG)
+        subject_logger.addFilter(SampleFilter(rate))
+    else:
+        subject_logger.setLevel(logging.INFO)
+
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and close the handlers installed by configure_logging()"""
+    global _listener
+    root = logging.getLogger()
+    for handler in _installed:
+        root.removeHandler(handler)
+
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    for handler in _installed:
+        handler.close()
+    _installed.clear()
+
+
+def _child_handler(handler):
+    """A forked child's replacement for an inherited handler: rotating files are watched instead"""
+    if not isinstance(handler, logging.handlers.BaseRotatingHandler):
+        return handler
+    watched = logging.handlers.WatchedFileHandler(handler.baseFilename, encoding='utf-8')
+    watched.setLevel(handler.level)
+    watched.setFormatter(handler.formatter)
+    # The inherited rotation state (and compression thread) belongs to the parent
+    logging.FileHandler.close(handler)
+    return watched
+
+
+def _restart_logging_after_fork():
+    # Only the forking thread survives in the child, so worker processes
+    # (gunicorn workers, batch render processes) get a new queue and listener
+    # of their own, writing without rotating the parent's file
+    global _listener
+    root = logging.getLogger()
+    if _listener is None:
+        for index, handler in enumerate(_installed):
+            replacement = _child_handler(handler)
+            if replacement is not handler:
+                root.removeHandler(handler)
+                root.addHandler(replacement)
+                _installed[index] = replacement
+        return
+
+    handlers = [_child_handler(handler) for handler in _listener.handlers]
+    for handler in _installed:
+        root.removeHandler(handler)
+    _installed.clear()
+    log_queue = queue.SimpleQueue()
+    _installed.append(logging.handlers.QueueHandler(log_queue))
+    root.addHandler(_installed[0])
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(stop_logging)
+os.register_at_fork(after_in_child=_restart_logging_after_fork)
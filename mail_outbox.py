@@ -0,0 +1,399 @@
+"""
+Mail Outbox
+Persistent SQLite outbox for report emails, drained by a background sender
+thread that reuses one authenticated SMTP connection across many messages
+"""
+
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+from config import MAIL_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recipient TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attachment_name TEXT,
+    attachment BLOB,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    sent_at REAL,
+    campaign_id TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+CREATE TABLE IF NOT EXISTS campaigns (
+    id TEXT PRIMARY KEY,
+    students INTEGER NOT NULL,
+    rendered INTEGER NOT NULL DEFAULT 0,
+    render_failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+"""
+
+# Columns added after the first release, applied to existing outbox databases
+MIGRATIONS = [
+    ('campaign_id', "ALTER TABLE outbox ADD COLUMN campaign_id TEXT"),
+]
+
+
+def mail_enabled():
+    """True when an SMTP server has been configured"""
+    return bool(MAIL_SETTINGS['smtp_host'])
+
+
+def report_email_content(student_data):
+    """
+    Build the subject and plain-text body for a student's report email
+
+    Returns:
+        tuple: (subject, body)
+    """
+    subject = f"Cambridge International Examination Report - {student_data['name']}"
+    body = f"""
+Dear Recipient,
+
+Please find attached the Cambridge International Examination Report for:
+
+Student: {student_data['name']}
+Candidate Number: {student_data['candidate_number']}
+School: {student_data['school_name']}
+Session: {student_data['session']} {student_data['year']}
+Overall GPA: {student_data.get('gpa', 'N/A')}/4.0
+
+Total Subjects: {student_data.get('total_subjects', 0)}
+
+Best regards,
+Cambridge Exam System
+"""
+    return subject, body
+
+
+def build_message(sender, recipient, subject, body, attachment_name=None, attachment=None):
+    """
+    Build a MIME message with an optional in-memory PDF attachment
+
+    Args:
+        sender (str): From address
+        recipient (str): To address
+        subject (str): Subject line
+        body (str): Plain-text body
+        attachment_name (str): Attachment filename
+        attachment (bytes): PDF bytes
+
+    Returns:
+        EmailMessage: Message ready for SMTP.send_message
+    """
+    message = EmailMessage()
+    message['From'] = sender
+    message['To'] = recipient
+    message['Subject'] = subject
+    message.set_content(body)
+    if attachment:
+        message.add_attachment(bytes(attachment), maintype='application', subtype='pdf',
+                               filename=attachment_name or 'report.pdf')
+    return message
+
+
+class Outbox:
+    """SQLite-backed queue of outgoing messages, safe to share between processes"""
+
+    def __init__(self, db_path=None, settings=None):
+        self.settings = dict(MAIL_SETTINGS, **(settings or {}))
+        self.db_path = db_path or self.settings['outbox_db']
+        folder = os.path.dirname(self.db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(outbox)")}
+            for column, statement in MIGRATIONS:
+                if column not in columns:
+                    conn.execute(statement)
+            conn.execute("CREATE INDEX IF NOT EXISTS outbox_campaign ON outbox (campaign_id)")
+
+    @contextmanager
+    def _connect(self):
+        """Open an autocommit connection that is closed on exit"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, recipient, subject, body, attachment_name=None, attachment=None, campaign_id=None):
+        """
+        Add a message to the outbox
+
+        Returns:
+            int: Outbox message id
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO outbox (recipient, subject, body, attachment_name, attachment, "
+                "next_attempt_at, created_at, campaign_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (recipient, subject, body, attachment_name,
+                 sqlite3.Binary(attachment) if attachment else None, now, now, campaign_id)
+            )
+            return cursor.lastrowid
+
+    def record_failure(self, recipient, subject, error, campaign_id=None):
+        """Record a message that failed before it could be queued (e.g. its PDF did not render)"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO outbox (recipient, subject, body, status, next_attempt_at, last_error, "
+                "created_at, campaign_id) VALUES (?, ?, '', ?, ?, ?, ?, ?)",
+                (recipient, subject, STATUS_FAILED, now, str(error)[:500], now, campaign_id)
+            )
+
+    def claim_due(self, limit):
+        """
+        Atomically claim up to limit pending messages that are due for sending
+
+        Messages left in 'sending' by a crashed sender are reclaimed after
+        the configured claim timeout.
+        """
+        now = time.time()
+        stale = now - self.settings['claim_timeout']
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    "SELECT * FROM outbox WHERE (status = ? AND next_attempt_at <= ?) "
+                    "OR (status = ? AND claimed_at < ?) ORDER BY next_attempt_at, id LIMIT ?",
+                    (STATUS_PENDING, now, STATUS_SENDING, stale, limit)
+                ).fetchall()
+                if rows:
+                    conn.executemany("UPDATE outbox SET status = ?, claimed_at = ? WHERE id = ?",
+                                     [(STATUS_SENDING, now, row['id']) for row in rows])
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return [dict(row) for row in rows]
+
+    def mark_sent(self, message_id):
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET status = ?, sent_at = ?, attempts = attempts + 1, "
+                         "attachment = NULL, last_error = NULL WHERE id = ?",
+                         (STATUS_SENT, time.time(), message_id))
+
+    def mark_failed(self, message_id, attempts, error, permanent=False):
+        """Schedule a retry with exponential backoff, or fail after the last attempt"""
+        attempts += 1
+        if permanent or attempts >= self.settings['max_attempts']:
+            status, next_attempt = STATUS_FAILED, time.time()
+        else:
+            delay = min(self.settings['retry_base_delay'] * (2 ** (attempts - 1)), self.settings['retry_max_delay'])
+            status, next_attempt = STATUS_PENDING, time.time() + delay
+        with self._connect() as conn:
+            conn.execute("UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, "
+                         "last_error = ? WHERE id = ?",
+                         (status, attempts, next_attempt, str(error)[:500], message_id))
+        return status
+
+    def get(self, message_id):
+        """Get a message's delivery status (without the attachment), or None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id, recipient, subject, status, attempts, last_error, created_at, sent_at "
+                "FROM outbox WHERE id = ?", (message_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def counts(self):
+        """Number of messages in each status"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM outbox GROUP BY status").fetchall()
+        return {row['status']: row['n'] for row in rows}
+
+    def create_campaign(self, campaign_id, students):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO campaigns (id, students, created_at) VALUES (?, ?, ?)",
+                         (campaign_id, students, time.time()))
+
+    def record_render(self, campaign_id, success):
+        """Count one student's report as rendered (or failed) for a campaign"""
+        column = 'rendered' if success else 'render_failed'
+        with self._connect() as conn:
+            conn.execute(f"UPDATE campaigns SET {column} = {column} + 1 WHERE id = ?", (campaign_id,))
+
+    def campaign_progress(self, campaign_id):
+        """
+        Get a campaign's render progress and per-recipient delivery status
+
+        Returns:
+            dict: Campaign progress, or None if the campaign does not exist
+        """
+        with self._connect() as conn:
+            campaign = conn.execute("SELECT * FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
+            if campaign is None:
+                return None
+            recipients = conn.execute(
+                "SELECT id, recipient, subject, status, attempts, last_error, sent_at "
+                "FROM outbox WHERE campaign_id = ? ORDER BY id", (campaign_id,)
+            ).fetchall()
+
+        counts = {STATUS_PENDING: 0, STATUS_SENDING: 0, STATUS_SENT: 0, STATUS_FAILED: 0}
+        for row in recipients:
+            counts[row['status']] += 1
+
+        rendering = campaign['rendered'] + campaign['render_failed'] < campaign['students']
+        if rendering:
+            state = 'rendering'
+        elif counts[STATUS_PENDING] or counts[STATUS_SENDING]:
+            state = 'sending'
+        else:
+            state = 'completed'
+
+        return {
+            'campaign_id': campaign_id,
+            'state': state,
+            'students': campaign['students'],
+            'rendered': campaign['rendered'],
+            'render_failed': campaign['render_failed'],
+            'messages': counts,
+            'recipients': [dict(row) for row in recipients]
+        }
+
+
+class MailSender(threading.Thread):
+    """Background thread that drains the outbox over a pooled SMTP connection"""
+
+    def __init__(self, outbox, smtp_factory=None, settings=None):
+        super().__init__(name='mail-sender', daemon=True)
+        self.outbox = outbox
+        self.settings = dict(MAIL_SETTINGS, **(settings or {}))
+        self.smtp_factory = smtp_factory or (smtplib.SMTP_SSL if self.settings['use_ssl'] else smtplib.SMTP)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._smtp = None
+        self._last_used = 0.0
+        self._next_send_at = 0.0
+
+    def notify(self):
+        """Wake the sender after new messages are queued"""
+        self._wakeup.set()
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._wakeup.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def run(self):
+        logger.info("Mail sender started")
+        while not self._stopping.is_set():
+            try:
+                sent_any = self.send_due()
+            except Exception as e:
+                logger.error(f"Mail sender error: {e}")
+                self._disconnect()
+                sent_any = False
+
+            if not sent_any:
+                if self._smtp is not None and time.time() - self._last_used > self.settings['idle_timeout']:
+                    self._disconnect()
+                self._wakeup.wait(self.settings['poll_interval'])
+                self._wakeup.clear()
+        self._disconnect()
+        logger.info("Mail sender stopped")
+
+    def send_due(self):
+        """
+        Send every message that is currently due
+
+        Returns:
+            bool: True if any message was claimed
+        """
+        rate = self.settings['messages_per_minute']
+        # Claim at most a minute's worth when rate limited, so claims never go stale while waiting
+        limit = min(self.settings['batch_size'], rate) if rate else self.settings['batch_size']
+        messages = self.outbox.claim_due(max(1, limit))
+        for message in messages:
+            if rate:
+                self._throttle(60.0 / rate)
+            if self._stopping.is_set():
+                break
+            self._deliver(message)
+        return bool(messages)
+
+    def _throttle(self, interval):
+        """Wait until the next send slot allowed by the messages-per-minute limit"""
+        now = time.time()
+        if self._next_send_at > now:
+            self._stopping.wait(self._next_send_at - now)
+        self._next_send_at = max(now, self._next_send_at) + interval
+
+    def _deliver(self, message):
+        try:
+            mime = build_message(self.settings['sender'], message['recipient'], message['subject'],
+                                 message['body'], message['attachment_name'], message['attachment'])
+        except ValueError as e:
+            # e.g. a header with a line break; retrying cannot fix the message
+            self.outbox.mark_failed(message['id'], message['attempts'], e, permanent=True)
+            logger.error(f"Mail {message['id']} to {message['recipient']!r} is malformed: {e}")
+            return
+
+        try:
+            try:
+                self._connection().send_message(mime)
+            except smtplib.SMTPServerDisconnected:
+                # The pooled connection went stale - reconnect once and retry
+                self._disconnect()
+                self._connection().send_message(mime)
+        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused) as e:
+            self.outbox.mark_failed(message['id'], message['attempts'], e, permanent=True)
+            logger.error(f"Mail {message['id']} to {message['recipient']} rejected: {e}")
+            return
+        except (smtplib.SMTPException, OSError) as e:
+            self._disconnect()
+            status = self.outbox.mark_failed(message['id'], message['attempts'], e)
+            logger.warning(f"Mail {message['id']} to {message['recipient']} failed ({status}): {e}")
+            return
+
+        self._last_used = time.time()
+        self.outbox.mark_sent(message['id'])
+        logger.info(f"Mail {message['id']} sent to {message['recipient']}")
+
+    def _connection(self):
+        """Return the pooled SMTP connection, opening and authenticating it if needed"""
+        if self._smtp is None:
+            smtp = self.smtp_factory(self.settings['smtp_host'], self.settings['smtp_port'],
+                                     timeout=self.settings['timeout'])
+            if self.settings['use_tls'] and not self.settings['use_ssl']:
+                smtp.starttls()
+            if self.settings['username']:
+                smtp.login(self.settings['username'], self.settings['password'])
+            self._smtp = smtp
+            logger.info(f"Opened SMTP connection to {self.settings['smtp_host']}:{self.settings['smtp_port']}")
+        return self._smtp
+
+    def _disconnect(self):
+        smtp, self._smtp = self._smtp, None
+        if smtp is not None:
+            try:
+                smtp.quit()
+            except Exception:
+                pass
@@ -25,6 +25,7 @@ try:
     from config import CAMBRIDGE_SUBJECTS, GRADE_THRESHOLDS, APP_SETTINGS
     from cambridge_calculator import CambridgeCalculator
     from pdf_generator import CambridgePDFGenerator as PDFGenerator
+    from mail_outbox import MailSender, Outbox, mail_enabled
 except ImportError as e:
     print(f"Import error: {e}")
     # Will work with what we have
@@ -990,7 +991,7 @@ Cambridge Report System
         send_btn.grid(row=0, column=1, padx=(10, 0), sticky="ew")
     
     def send_email(self, recipient, subject, body, dialog):
-        """Send email using the system's default email client"""
+        """Send email over SMTP when configured, otherwise via the system's default email client"""
         try:
             if not recipient:
                 messagebox.showerror("Error", "Please enter a recipient email address.")
@@ -1001,6 +1002,10 @@ Cambridge Report System
                 messagebox.showerror("Error", "Please enter a valid email address.")
                 return
             
+            if mail_enabled():
+                self.queue_email(recipient, subject, body, dialog)
+                return
+            
             # Prepare email parameters
             subject_encoded = urllib.parse.quote(subject)
             body_encoded = urllib.parse.quote(body)
@@ -1040,6 +1045,26 @@ Cambridge Report System
         except Exception as e:
             messagebox.showerror("Error", f"Could not open email client: {str(e)}\n\nPlease manually email the PDF file located at:\n{self.last_generated_pdf}")
     
+    def queue_email(self, recipient, subject, body, dialog):
+        """Queue the report with the PDF attached for the background SMTP sender"""
+        if not hasattr(self, 'mail_sender'):
+            self.outbox = Outbox()
+            self.mail_sender = MailSender(self.outbox)
+            self.mail_sender.start()
+        
+        with open(self.last_generated_pdf, 'rb') as pdf_file:
+            pdf_bytes = pdf_file.read()
+        
+        self.outbox.enqueue(recipient, subject, body, os.path.basename(self.last_generated_pdf), pdf_bytes)
+        self.mail_sender.notify()
+        
+        dialog.destroy()
+        messagebox.showinfo(
+            "Email Queued",
+            f"The report has been queued for delivery to {recipient}.\n\n"
+            f"It will be sent in the background with the PDF attached."
+        )
+    
     def run(self):
         """Start the application"""
         self.root.mainloop()
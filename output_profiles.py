@@ -0,0 +1,185 @@
+"""
+Output Profiles
+Named PDF output settings (email, print, archive) controlling stream
+encoding, image downsampling and document metadata
+"""
+
+import io
+import threading
+from contextlib import contextmanager
+
+from PIL import Image
+from reportlab import rl_config
+from reportlab.lib.utils import ImageReader
+
+from config import APP_SETTINGS, OUTPUT_PROFILES, PDF_STYLE
+
+POINTS_PER_INCH = 72
+
+
+class _StreamEncoding:
+    """
+    Hold ReportLab's ASCII85 flag at one value while documents needing it are built
+
+    ReportLab has no per-canvas ASCII85 option; it reads rl_config.useA85
+    while a document is built. Documents wanting the same encoding build
+    concurrently, one wanting the other waits until they are done, and the
+    flag is back at ReportLab's default whenever no profile render runs, so
+    other canvases in the process are unaffected.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._active = 0
+        self._default = rl_config.useA85
+
+    @contextmanager
+    def hold(self, ascii85):
+        value = 1 if ascii85 else 0
+        with self._condition:
+            while self._active and rl_config.useA85 != value:
+                self._condition.wait()
+            rl_config.useA85 = value
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                if not self._active:
+                    rl_config.useA85 = self._default
+                    self._condition.notify_all()
+
+
+_stream_encoding = _StreamEncoding()
+
+
+class UnknownProfile(ValueError):
+    """Raised for an output profile name that is not configured"""
+
+
+class OutputProfile:
+    """One named set of PDF output options"""
+
+    def __init__(self, name, settings):
+        """
+        Args:
+            name (str): Profile name, e.g. 'email'
+            settings (dict): Entry from config.OUTPUT_PROFILES
+        """
+        self.name = name
+        self.ascii85 = settings.get('ascii85', False)
+        self.metadata = settings.get('metadata', True)
+        self.image_dpi = settings.get('image_dpi', 150)
+        self.image_quality = settings.get('image_quality', 80)
+
+    def document_options(self, student_data):
+        """
+        Keyword arguments for SimpleDocTemplate (and, via apply, a bare canvas)
+
+        Args:
+            student_data (dict): Enhanced student data the report is rendered from
+
+        Returns:
+            dict: pageCompression (always on) plus the document info fields, and invariant
+                in deterministic mode (fixed creation date and a document ID
+                derived from the content instead of the clock)
+        """
+        if self.metadata:
+            info = {
+                'title': f"Statement of Results - {student_data.get('name', 'Student')}",
+                'author': student_data.get('school_name', 'DOBEDA INTERNATIONAL SCHOOL'),
+                'subject': 'Cambridge International Examinations',
+                'creator': f"{APP_SETTINGS['title']} {APP_SETTINGS['version']}",
+                'keywords': student_data.get('candidate_number', ''),
+            }
+        else:
+            info = {'title': '', 'author': '', 'subject': '', 'creator': '', 'producer': '', 'keywords': ''}
+        info['pageCompression'] = 1
+        if PDF_STYLE.get('deterministic'):
+            info['invariant'] = 1
+        return info
+
+    def canvas_options(self):
+        """Keyword arguments for creating a bare canvas that apply cannot set afterwards"""
+        return {'invariant': 1} if PDF_STYLE.get('deterministic') else {}
+
+    def stream_encoding(self):
+        """
+        Context manager holding the profile's stream encoding while a document is built
+
+        Every PDF rendered with this profile must be built inside it.
+        """
+        return _stream_encoding.hold(self.ascii85)
+
+    def apply(self, canvas, student_data):
+        """Apply the profile to a canvas created outside SimpleDocTemplate"""
+        options = self.document_options(student_data)
+        canvas.setPageCompression(options.pop('pageCompression'))
+        options.pop('invariant', None)  # Fixed when the canvas is created, see canvas_options
+        setters = {'title': canvas.setTitle, 'author': canvas.setAuthor, 'subject': canvas.setSubject,
+                   'creator': canvas.setCreator, 'producer': canvas.setProducer, 'keywords': canvas.setKeywords}
+        for field, value in options.items():
+            setters[field](value)
+
+    def fit_image(self, image, width, height):
+        """
+        Downsample an image to its printed size at the profile's resolution
+
+        Args:
+            image (PIL.Image.Image, str or file-like): Logo or photo
+            width (float): Printed width in points
+            height (float): Printed height in points
+
+        Returns:
+            ImageReader: Image ready for canvas.drawImage or platypus.Image;
+                opaque images are JPEG encoded at the profile's quality,
+                images with transparency stay lossless
+        """
+        return ImageReader(io.BytesIO(self.encode_image(image, width, height)))
+
+    def encode_image(self, image, width, height):
+        """
+        Downsample and encode an image as fit_image does
+
+        Returns:
+            bytes: JPEG data, or PNG data for images with transparency
+        """
+        if not isinstance(image, Image.Image):
+            image = Image.open(image)
+
+        target = (max(1, round(width * self.image_dpi / POINTS_PER_INCH)),
+                  max(1, round(height * self.image_dpi / POINTS_PER_INCH)))
+        if image.width > target[0] or image.height > target[1]:
+            image = image.copy()
+            image.thumbnail(target, Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+            image.save(buffer, format='PNG', optimize=True)
+        else:
+            image.convert('RGB').save(buffer, format='JPEG', quality=self.image_quality, optimize=True)
+        return buffer.getvalue()
+
+
+PROFILES = {name: OutputProfile(name, settings) for name, settings in OUTPUT_PROFILES.items()}
+
+
+def get_profile(name=None):
+    """
+    Look up an output profile
+
+    Args:
+        name (str): Profile name; PDF_STYLE['output_profile'] when omitted
+
+    Returns:
+        OutputProfile: The configured profile
+
+    Raises:
+        UnknownProfile: If no profile has that name
+    """
+    name = name or PDF_STYLE.get('output_profile', 'print')
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise UnknownProfile(f"Unknown output profile '{name}'. Choose from: {', '.join(sorted(PROFILES))}")
@@ -0,0 +1,119 @@
+"""
+Page Furniture
+Fixed report header and footer flowables, laid out once per school and
+stamped onto every page as a PDF form XObject from the onPage callbacks
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from reportlab.lib.pagesizes import A4
+
+from config import PDF_STYLE
+
+# SimpleDocTemplate frames pad their content by 6pt on every side
+FRAME_PADDING = 6
+
+# Schools whose furniture is kept laid out
+MAX_CACHED_SCHOOLS = 256
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class PageFurniture:
+    """
+    Header and footer flowables wrapped once, then drawn per document into a
+    form XObject that every page references
+
+    Form XObjects belong to a single PDF document, so the form itself is
+    recorded again in each document; what is shared across documents is the
+    paragraph and table layout.
+    """
+
+    def __init__(self, key, header, footer, pagesize=A4, margin=None):
+        """
+        Args:
+            key (str): Identity of the furniture (the school name)
+            header (list): Flowables stacked down from the top margin
+            footer (list): Flowables stacked up to the bottom margin
+            pagesize (tuple): Page width and height in points
+            margin (float): Page margin, PDF_STYLE['margin'] by default
+        """
+        self.key = key
+        self.form_name = 'Furniture' + hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+        self.pagesize = pagesize
+        self.margin = PDF_STYLE['margin'] if margin is None else margin
+        self.width = pagesize[0] - 2 * self.margin - 2 * FRAME_PADDING
+
+        self.header = self._layout(header)
+        self.footer = self._layout(footer)
+        self.header_height = sum(height for _, _, height in self.header)
+        self.footer_height = sum(height for _, _, height in self.footer)
+
+        # Shared flowables are only read while drawing, but recording the
+        # form is serialized so concurrent documents never interleave
+        self._lock = threading.Lock()
+
+    def _layout(self, flowables):
+        """Wrap each flowable once; returns (flowable, x offset, height including spacing)"""
+        placed = []
+        for flowable in flowables:
+            width, height = flowable.wrap(self.width, self.pagesize[1])
+            offset = 0
+            if getattr(flowable, 'hAlign', 'LEFT') in ('CENTER', 'CENTRE'):
+                offset = (self.width - width) / 2
+            elif getattr(flowable, 'hAlign', 'LEFT') == 'RIGHT':
+                offset = self.width - width
+            spacing = flowable.getSpaceBefore() + flowable.getSpaceAfter()
+            placed.append((flowable, offset, height + spacing))
+        return placed
+
+    def _draw_stack(self, canvas, placed, top):
+        x = self.margin + FRAME_PADDING
+        y = top
+        for flowable, offset, height in placed:
+            y -= flowable.getSpaceBefore()
+            y -= height - flowable.getSpaceBefore() - flowable.getSpaceAfter()
+            flowable.drawOn(canvas, x + offset, y)
+            y -= flowable.getSpaceAfter()
+
+    def draw(self, canvas, doc):
+        """onPage callback: record the form on the document's first page, then stamp it"""
+        if not canvas.hasForm(self.form_name):
+            with self._lock:
+                canvas.beginForm(self.form_name)
+                page_top = self.pagesize[1] - self.margin - FRAME_PADDING
+                self._draw_stack(canvas, self.header, page_top)
+                self._draw_stack(canvas, self.footer, self.margin + FRAME_PADDING + self.footer_height)
+                canvas.endForm()
+        canvas.doForm(self.form_name)
+
+
+def get_furniture(key, build):
+    """
+    Get the laid-out furniture for key, building it on first use
+
+    Args:
+        key (str): School name the furniture belongs to
+        build (callable): Returns (header flowables, footer flowables)
+
+    Returns:
+        PageFurniture: Shared, read-only furniture
+    """
+    with _cache_lock:
+        furniture = _cache.get(key)
+        if furniture is not None:
+            _cache.move_to_end(key)
+            return furniture
+
+    header, footer = build()
+    furniture = PageFurniture(key, header, footer)
+
+    with _cache_lock:
+        furniture = _cache.setdefault(key, furniture)
+        _cache.move_to_end(key)
+        while len(_cache) > MAX_CACHED_SCHOOLS:
+            _cache.popitem(last=False)
+    return furniture
@@ -0,0 +1,297 @@
+"""
+PDF Booklet Writer
+Merges rendered report PDFs at page level into one print-ready document,
+sharing identical fonts, font dictionaries and page-template forms (the
+per-school furniture) across every report instead of repeating them
+
+Works on the classic xref-table PDFs ReportLab writes (no object streams
+or cross-reference streams), which is what every report renderer here
+produces.
+"""
+
+import hashlib
+import re
+
+# Indirect reference inside a dictionary, e.g. "12 0 R" (not inside its strings)
+_REFERENCE = re.compile(rb'(\d+) 0 R\b')
+_OBJECT_HEADER = re.compile(rb'(\d+) (\d+) obj\s*')
+_PARENT = re.compile(rb'/Parent \d+ 0 R')
+_MEDIABOX = re.compile(rb'/MediaBox\s*\[([^\]]*)\]')
+
+
+class MergeError(ValueError):
+    """Raised when a PDF cannot be merged into a booklet"""
+
+
+class _SourcePDF:
+    """Objects and page order of one PDF, parsed through its xref table"""
+
+    def __init__(self, data):
+        self.data = data
+        self.objects = {}
+        try:
+            self._parse()
+        except (IndexError, ValueError) as e:
+            raise MergeError(f"Unreadable PDF: {e}")
+
+    def _parse(self):
+        data = self.data
+        xref = int(data[data.rindex(b'startxref') + 9:].split()[0])
+        if not data.startswith(b'xref', xref):
+            raise MergeError('Cross-reference streams are not supported')
+
+        position = xref + 4
+        trailer = data.index(b'trailer', position)
+        lines = data[position:trailer].split(b'\n')
+        entries = [line.split() for line in lines if line.strip()]
+        offsets = {}
+        number = 0
+        for entry in entries:
+            if len(entry) == 2:
+                number = int(entry[0])
+                continue
+            if entry[2] == b'n':
+                offsets[number] = int(entry[0])
+            number += 1
+
+        for number, offset in offsets.items():
+            self.objects[number] = self._read_object(offset)
+
+        root = re.search(rb'/Root (\d+) 0 R', data[trailer:])
+        if root is None:
+            raise MergeError('PDF has no document catalog')
+        catalog, _ = self.objects[int(root.group(1))]
+        self.pages = self._collect_pages(int(re.search(rb'/Pages (\d+) 0 R', catalog).group(1)))
+
+    def _read_object(self, offset):
+        """Return (dictionary bytes, stream bytes or None) of the object at offset"""
+        header = _OBJECT_HEADER.match(self.data, offset)
+        if header is None:
+            raise MergeError(f"No object at offset {offset}")
+        start = header.end()
+        end = self.data.index(b'endobj', start)
+        stream_at = self.data.find(b'stream', start, end)
+        if stream_at < 0:
+            return self.data[start:end].strip(), None
+
+        body = self.data[start:stream_at].strip()
+        length = re.search(rb'/Length (\d+)(?!\d| \d+ R)', body)
+        if length is None:
+            raise MergeError('Stream length must be a direct number')
+        data_start = stream_at + 6
+        data_start += 2 if self.data.startswith(b'\r\n', data_start) else 1
+        return body, self.data[data_start:data_start + int(length.group(1))]
+
+    def _collect_pages(self, number):
+        body, _ = self.objects[number]
+        if re.search(rb'/Type\s*/Pages\b', body) is None:
+            return [number]
+        pages = []
+        for kid in _REFERENCE.findall(re.search(rb'/Kids\s*\[([^\]]*)\]', body).group(1)):
+            pages.extend(self._collect_pages(int(kid)))
+        return pages
+
+
+class BookletWriter:
+    """
+    Stream pages from many PDFs into one file
+
+    Objects are written as soon as a document is added, so memory stays
+    bounded by the largest single report rather than the whole booklet.
+    Non-page objects with identical content are written once and shared.
+    """
+
+    def __init__(self, fileobj, title=''):
+        """
+        Args:
+            fileobj: Writable binary file object
+            title (str): Document title for the booklet
+        """
+        self.fileobj = fileobj
+        self.title = title
+        self.position = 0
+        self.offsets = {}
+        self.next_number = 1
+        self.shared = {}
+        self.page_numbers = []
+        self.shared_objects = 0
+        self.last_mediabox = None
+
+        # The page tree is written last, but pages point at it as their parent
+        self.pages_number = self._allocate()
+        self._write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    @property
+    def page_count(self):
+        return len(self.page_numbers)
+
+    def add_document(self, data):
+        """
+        Append every page of a PDF
+
+        Args:
+            data (bytes): A complete PDF document
+
+        Returns:
+            int: Pages added
+
+        Raises:
+            MergeError: If the PDF cannot be parsed or copied
+        """
+        source = _SourcePDF(data)
+        # Pages are numbered up front, so links and annotations pointing at a
+        # page (e.g. /Dest or /P) are renumbered instead of copying the page
+        copied = {page: self._allocate() for page in source.pages}
+        for page in source.pages:
+            body, stream = source.objects[page]
+            mediabox = _MEDIABOX.search(body)
+            if mediabox:
+                self.last_mediabox = mediabox.group(1)
+            # The parent is the booklet's page tree, not an object to copy
+            body = self._renumber(source, _PARENT.sub(b'/Parent @', body), copied, {page})
+            body = body.replace(b'/Parent @', b'/Parent %d 0 R' % self.pages_number)
+            self.page_numbers.append(self._write_object(body, stream, number=copied[page]))
+        return len(source.pages)
+
+    def add_blank_page(self, mediabox=None):
+        """Append an empty page, e.g. to start the next report on a right-hand page"""
+        if mediabox is None:
+            mediabox = self.last_mediabox or b'0 0 595.2756 841.8898'
+        contents = self._shared_object(b'<<\n/Length 0\n>>', b'')
+        body = (b'<<\n/Contents %d 0 R /MediaBox [ %s ] /Parent %d 0 R /Resources <<\n>> /Type /Page\n>>'
+                % (contents, mediabox.strip(), self.pages_number))
+        self.page_numbers.append(self._write_object(body, None))
+
+    def close(self):
+        """Write the page tree, catalog, info and cross-reference table"""
+        kids = b' '.join(b'%d 0 R' % number for number in self.page_numbers)
+        self._write_object(b'<<\n/Count %d /Kids [ %s ] /Type /Pages\n>>' % (len(self.page_numbers), kids),
+                           None, number=self.pages_number)
+        catalog = self._write_object(b'<<\n/Pages %d 0 R /Type /Catalog\n>>' % self.pages_number, None)
+        info = self._write_object(b'<<\n/Producer (Cambridge Exam System booklet) /Title (%s)\n>>'
+                                  % _pdf_string(self.title), None)
+
+        xref = self.position
+        size = self.next_number
+        lines = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        lines.extend(b'%010d 00000 n \n' % self.offsets[number] for number in range(1, size))
+        digest = hashlib.md5(b''.join(lines)).hexdigest().encode()
+        lines.append(b'trailer\n<<\n/ID [<%s><%s>] /Info %d 0 R /Root %d 0 R /Size %d\n>>\nstartxref\n%d\n%%%%EOF\n'
+                     % (digest, digest, info, catalog, size, xref))
+        self._write(b''.join(lines))
+
+    def _renumber(self, source, body, copied, stack):
+        """Copy every object body references and point the references at the copies"""
+        def replace(match):
+            return b'%d 0 R' % self._copy(source, int(match.group(1)), copied, stack)
+        return _outside_strings(body, lambda part: _REFERENCE.sub(replace, part))
+
+    def _copy(self, source, number, copied, stack):
+        if number in copied:
+            return copied[number]
+        if number not in source.objects:
+            raise MergeError(f"Missing object {number}")
+        if number in stack:
+            # A reference back to an object still being copied: fix its number now
+            copied[number] = self._allocate()
+            return copied[number]
+
+        body, stream = source.objects[number]
+        body = self._renumber(source, body, copied, stack | {number})
+        if number in copied:
+            # Objects in a cycle keep the number their back-references point at
+            return self._write_object(body, stream, number=copied[number])
+        copied[number] = self._shared_object(body, stream)
+        return copied[number]
+
+    def _shared_object(self, body, stream):
+        """Write an object unless an identical one was already written"""
+        key = hashlib.sha1(body + b'\0' + (stream if stream is not None else b'\1')).digest()
+        number = self.shared.get(key)
+        if number is None:
+            number = self.shared[key] = self._write_object(body, stream)
+        else:
+            self.shared_objects += 1
+        return number
+
+    def _allocate(self):
+        number = self.next_number
+        self.next_number += 1
+        return number
+
+    def _write_object(self, body, stream, number=None):
+        number = number or self._allocate()
+        self.offsets[number] = self.position
+        parts = [b'%d 0 obj\n' % number, body]
+        if stream is not None:
+            parts.extend([b'\nstream\n', stream, b'\nendstream'])
+        parts.append(b'\nendobj\n')
+        self._write(b''.join(parts))
+        return number
+
+    def _write(self, data):
+        self.fileobj.write(data)
+        self.position += len(data)
+
+
+def _outside_strings(body, replace):
+    """Apply replace to the parts of an object body outside its literal (...) strings"""
+    parts = []
+    start = 0
+    while True:
+        opening = body.find(b'(', start)
+        if opening < 0:
+            break
+        parts.append(replace(body[start:opening]))
+        depth = 0
+        index = opening
+        while index < len(body):
+            char = body[index]
+            if char == 0x5c:  # Backslash escapes the next byte
+                index += 2
+                continue
+            if char == 0x28:
+                depth += 1
+            elif char == 0x29:
+                depth -= 1
+                if depth == 0:
+                    break
+            index += 1
+        parts.append(body[opening:index + 1])
+        start = index + 1
+    parts.append(replace(body[start:]))
+    return b''.join(parts)
+
+
+def _pdf_string(text):
+    """Encode text as the contents of a PDF literal string"""
+    encoded = text.encode('latin-1', 'replace')
+    return encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def build_booklet(documents, fileobj, duplex=False, title=''):
+    """
+    Merge report PDFs into one booklet
+
+    Args:
+        documents (iterable): PDF bytes, in print order
+        fileobj: Writable binary file object for the booklet
+        duplex (bool): Pad each report to an even page count with blank
+            pages, so every report starts on a new sheet when printed
+            double-sided
+        title (str): Document title
+
+    Returns:
+        dict: pages, reports, blank_pages and shared_objects counts
+    """
+    writer = BookletWriter(fileobj, title)
+    reports = blank_pages = 0
+    for data in documents:
+        added = writer.add_document(data)
+        reports += 1
+        if duplex and added % 2:
+            writer.add_blank_page()
+            blank_pages += 1
+    writer.close()
+    return {'pages': writer.page_count, 'reports': reports, 'blank_pages': blank_pages,
+            'shared_objects': writer.shared_objects}
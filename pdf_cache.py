@@ -0,0 +1,253 @@
+"""
+Report PDF Cache
+Content-addressed cache of rendered report PDFs with an in-process LRU tier,
+an optional on-disk tier and single-flight coalescing of identical renders
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from config import APP_SETTINGS, CACHE_SETTINGS, IMAGE_SETTINGS, PDF_STYLE, VERIFY_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Verification settings that change a rendered report. The signing key is left
+# out: cache keys are published (as preview URLs), so they must not depend on a secret
+_VERIFY_FINGERPRINT = ('enabled', 'base_url', 'qr_size')
+
+
+def _normalize(value):
+    """Normalize student data so equivalent inputs hash identically"""
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, (bytes, bytearray)):
+        return hashlib.sha256(value).hexdigest()  # e.g. an uploaded student photo
+    return str(value)
+
+
+def cache_key(student_data, variant='', namespace='report'):
+    """
+    Build the cache key for a report
+
+    Args:
+        student_data (dict): Student data passed to the PDF generator
+        variant (str): Extra rendering options that change the output
+        namespace (str): What is cached, e.g. 'preview'; keys never collide across namespaces
+
+    Returns:
+        str: Hex SHA-256 digest of the normalized data, variant, app version and PDF layout,
+            image and (non-secret) verification settings
+    """
+    verify = {name: VERIFY_SETTINGS[name] for name in _VERIFY_FINGERPRINT}
+    payload = json.dumps(
+        [namespace, APP_SETTINGS['version'], PDF_STYLE, IMAGE_SETTINGS, verify, variant, _normalize(student_data)],
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Flight:
+    """A render in progress that other requests for the same key can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ReportCache:
+    """Byte-capped LRU cache of rendered PDFs, shared by all threads in a process"""
+
+    def __init__(self, max_bytes=None, disk_folder=None, disk_max_bytes=None, suffix='.pdf', namespace='report'):
+        self.max_bytes = CACHE_SETTINGS['memory_max_bytes'] if max_bytes is None else max_bytes
+        self.disk_folder = CACHE_SETTINGS['disk_folder'] if disk_folder is None else disk_folder
+        self.disk_max_bytes = CACHE_SETTINGS['disk_max_bytes'] if disk_max_bytes is None else disk_max_bytes
+        self.suffix = suffix  # Disk file extension; other rendered artefacts (e.g. '.png') can share the class
+        self.namespace = namespace  # Passed to cache_key, so each artefact has its own keys
+        self._entries = OrderedDict()
+        self._size = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._disk_writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+        if self.disk_folder:
+            os.makedirs(self.disk_folder, exist_ok=True)
+
+    def get(self, key):
+        """Look a PDF up in memory, then on disk; returns bytes or None"""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        data = self._disk_get(key)
+        with self._lock:
+            if data is not None:
+                self.hits += 1
+                self._memory_put(key, data)
+            else:
+                self.misses += 1
+        return data
+
+    def put(self, key, data):
+        """Store a rendered PDF in both tiers"""
+        with self._lock:
+            self._memory_put(key, data)
+        self._disk_put(key, data)
+
+    def get_or_render(self, student_data, render, variant=''):
+        """
+        Return the cached PDF for student_data, rendering it at most once
+
+        Concurrent calls with the same key share a single render: the first
+        caller renders while the others wait for its result.
+
+        Args:
+            student_data (dict): Student data passed to the PDF generator
+            render (callable): Called as render(student_data) and returns PDF bytes
+            variant (str): Extra rendering options that change the output
+
+        Returns:
+            bytes: The PDF document
+        """
+        key = cache_key(student_data, variant, self.namespace)
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = render(student_data)
+            self.put(key, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def clear(self):
+        """Drop every in-memory entry"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self):
+        """Cache counters for the health and metrics endpoints"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'disk_enabled': bool(self.disk_folder)
+            }
+
+    def _memory_put(self, key, data):
+        """Insert into the LRU and evict the oldest entries over the byte cap (lock held)"""
+        if len(data) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_folder, key[:2], key + self.suffix)
+
+    def _disk_get(self, key):
+        if not self.disk_folder:
+            return None
+        try:
+            with open(self._disk_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _disk_put(self, key, data):
+        if not self.disk_folder:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write report cache file {path}: {e}")
+            return
+
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % CACHE_SETTINGS['disk_prune_interval'] == 0
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self):
+        """Remove the least recently written disk entries above the disk byte cap"""
+        if not self.disk_folder:
+            return
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.disk_folder):
+            for name in names:
+                if not name.endswith(self.suffix):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        files.sort()
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -5,187 +5,155 @@ Uses reportlab to create professional-looking PDF reports
 
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT, TA_JUSTIFY
 from datetime import datetime
+import io
 import os
-from config import PDF_STYLE, APP_SETTINGS
+from config import PDF_STYLE, APP_SETTINGS, IMAGE_SETTINGS
+from metrics import CANVAS_FALLBACKS, REPORT_PDF_BYTES, REPORT_STAGE_SECONDS, REPORTS_RENDERED
+from pdf_styles import COLUMN_WIDTHS, STYLES, TABLE_STYLES
+from page_furniture import get_furniture
+from canvas_renderer import CanvasReportRenderer, LayoutOverflow
+from cohort_charts import CohortCharts
+from output_profiles import get_profile
+from fonts import font_markup, table_cell
+from report_images import ImageFlowable, printed_size, school_logo, student_photo
+from report_data import report_date, report_fields, subject_fields
+from template_engine import select_template
+from verification import draw_qr, report_qr
 
 class CambridgePDFGenerator:
     """Generate Cambridge-style report card PDFs"""
     
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
+    SIGNATURE_ROWS = (
+        ('_' * 30, '_' * 30),
+        ('Academic Coordinator', 'School Principal'),
+        ('Signature & Date', 'Signature & Date'),
+    )
+    
+    COPYRIGHT_TEXT = "© 2025 DOBEDA - Cambridge Examination Report System"
     
-    def setup_custom_styles(self):
-        """Setup custom paragraph styles matching Joe's template"""
-        # Cambridge header title style
-        self.styles.add(ParagraphStyle(
-            name='CambridgeTitle',
-            parent=self.styles['Normal'],
-            fontSize=16,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER,
-            spaceAfter=8,
-            textColor=colors.black
-        ))
-        
-        # Cambridge subtitle style
-        self.styles.add(ParagraphStyle(
-            name='CambridgeSubtitle',
-            parent=self.styles['Normal'],
-            fontSize=12,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER,
-            spaceAfter=6,
-            textColor=colors.black
-        ))
-        
-        # Cambridge document type style
-        self.styles.add(ParagraphStyle(
-            name='CambridgeDocType',
-            parent=self.styles['Normal'],
-            fontSize=14,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER,
-            spaceAfter=20,
-            textColor=colors.black
-        ))
-        
-        # Body text style
-        self.styles.add(ParagraphStyle(
-            name='JoeBodyText',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            fontName='Helvetica',
-            alignment=TA_LEFT,
-            spaceAfter=6
-        ))
-        
-        # Bold body text style
-        self.styles.add(ParagraphStyle(
-            name='JoeBodyTextBold',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            fontName='Helvetica-Bold',
-            alignment=TA_LEFT,
-            spaceAfter=6
-        ))
-        
-        # Comments style
-        self.styles.add(ParagraphStyle(
-            name='JoeComments',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            fontName='Helvetica',
-            alignment=TA_JUSTIFY,
-            spaceAfter=4,
-            leftIndent=10,
-            rightIndent=10
-        ))
-        
-        # Footer style
-        self.styles.add(ParagraphStyle(
-            name='JoeFooter',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            fontName='Helvetica',
-            alignment=TA_CENTER,
-            textColor=colors.grey
-        ))
-        
-        # Legacy styles for backward compatibility
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=PDF_STYLE['title_font_size'],
-            alignment=TA_CENTER,
-            spaceAfter=30,
-            textColor=colors.darkblue
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='CustomHeader',
-            parent=self.styles['Heading2'],
-            fontSize=PDF_STYLE['header_font_size'],
-            alignment=TA_CENTER,
-            spaceAfter=20
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='CustomBody',
-            parent=self.styles['Normal'],
-            fontSize=PDF_STYLE['body_font_size'],
-            alignment=TA_LEFT,
-            spaceAfter=12
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='CustomSmall',
-            parent=self.styles['Normal'],
-            fontSize=PDF_STYLE['small_font_size'],
-            alignment=TA_CENTER,
-            spaceAfter=6
-        ))
+    # Gap between the school crest and the school name
+    LOGO_SPACING = 6
+    
+    def __init__(self):
+        # Styles are built once per process (see pdf_styles) and never mutated
+        # while rendering, so one generator can be shared across threads
+        self.styles = STYLES
+        self.table_styles = TABLE_STYLES
+        self.canvas_renderer = CanvasReportRenderer(self)
     
-    def generate_enhanced_report(self, student_data, filename=None):
+    def generate_enhanced_report(self, student_data, filename=None, profile=None, template=None, draft=False):
         """
         Generate an enhanced Cambridge report card PDF with coefficients, GPA, and comments
         
         Args:
             student_data (dict): Enhanced student and grade data with coefficients
-            filename (str): Optional custom filename
+            filename (str or file-like): Optional custom filename, or a writable
+                binary file-like object (e.g. io.BytesIO) to render in memory
+            profile (str): Output profile name ('email', 'print', 'archive'),
+                PDF_STYLE['output_profile'] by default
+            template (str): Report template id; the school's template (see
+                TEMPLATE_SETTINGS) or the built-in layout by default
+            draft (bool): Render without issuing a verification record, e.g.
+                for an on-screen preview of results still being edited
             
         Returns:
-            str: Path to generated PDF file
+            str or file-like: Path to generated PDF file, or the file-like target
+        
+        Raises:
+            UnknownProfile: If the output profile is not configured
+            TemplateError: If the report template is missing or invalid
         """
-        if filename is None:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            student_name = student_data.get('name', 'Student').replace(' ', '_')
-            filename = f"{student_name}_Cambridge_Enhanced_Report_{timestamp}.pdf"
+        with get_profile(profile).stream_encoding():
+            return self._generate_enhanced_report(student_data, filename, profile, template, draft)
+    
+    def _generate_enhanced_report(self, student_data, filename, profile, template, draft):
+        """Render an enhanced report while the profile's stream encoding is held"""
+        output_profile = get_profile(profile)
+        layout = select_template(student_data, template)
         
-        # Ensure reports directory exists
-        reports_dir = APP_SETTINGS['report_folder']
-        if not os.path.exists(reports_dir):
-            os.makedirs(reports_dir)
+        if hasattr(filename, 'write'):
+            target = filename
+        else:
+            if filename is None:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                student_name = student_data.get('name', 'Student').replace(' ', '_')
+                filename = f"{student_name}_Cambridge_Enhanced_Report_{timestamp}.pdf"
+            
+            # Ensure reports directory exists
+            reports_dir = APP_SETTINGS['report_folder']
+            if not os.path.exists(reports_dir):
+                os.makedirs(reports_dir)
+            
+            target = os.path.join(reports_dir, filename)
+        
+        # Signed verification code; its record is stored once per distinct result set
+        qr = report_qr(student_data, issue=not draft)
+        
+        if layout is not None:
+            return self._build_from_template(layout, student_data, target, output_profile, qr)
+        
+        # Crest and photo are decoded and fitted once, then shared by every report
+        logo = school_logo(student_data.get('school_name', 'DOBEDA INTERNATIONAL SCHOOL'), output_profile)
+        photo = student_photo(student_data, output_profile)
         
-        filepath = os.path.join(reports_dir, filename)
+        # Fixed one-page layout drawn straight on the canvas; Platypus handles overflow
+        if PDF_STYLE.get('fast_renderer'):
+            try:
+                with REPORT_STAGE_SECONDS.time(stage='build'):
+                    self.canvas_renderer.render(student_data, target, output_profile, logo=logo, photo=photo, qr=qr)
+                REPORTS_RENDERED.inc()
+                return target
+            except LayoutOverflow:
+                CANVAS_FALLBACKS.inc()
+        
+        # Fixed header and footer laid out once per school and stamped on each page
+        furniture = self._page_furniture(student_data, logo) if PDF_STYLE.get('page_furniture') else None
         
         # Create PDF document
         doc = SimpleDocTemplate(
-            filepath,
+            target,
             pagesize=A4,
             rightMargin=PDF_STYLE['margin'],
             leftMargin=PDF_STYLE['margin'],
-            topMargin=PDF_STYLE['margin'],
-            bottomMargin=PDF_STYLE['margin']
+            topMargin=PDF_STYLE['margin'] + (furniture.header_height if furniture else 0),
+            bottomMargin=PDF_STYLE['margin'] + (furniture.footer_height if furniture else 0),
+            **output_profile.document_options(student_data)
         )
         
         # Build enhanced content
-        story = []
-        
-        # Title and header
-        story.extend(self._create_enhanced_header(student_data))
-        
-        # Student information
-        story.extend(self._create_enhanced_student_info(student_data))
-        
-        # Enhanced grades table with coefficients and teacher comments
-        story.extend(self._create_enhanced_grades_table(student_data))
-        
-        # GPA summary
-        story.extend(self._create_gpa_summary(student_data))
-        
-        # Footer
-        story.extend(self._create_enhanced_footer())
+        with REPORT_STAGE_SECONDS.time(stage='story'):
+            story = []
+            
+            # Title and header
+            if furniture is None:
+                story.extend(self._create_enhanced_header(student_data, logo))
+            
+            # Student information
+            story.extend(self._create_enhanced_student_info(student_data, photo))
+            
+            # Enhanced grades table with coefficients and teacher comments
+            story.extend(self._create_enhanced_grades_table(student_data))
+            
+            # GPA summary
+            story.extend(self._create_gpa_summary(student_data))
+            
+            # Cohort histograms, when the batch attached its distributions
+            story.extend(self._create_cohort_charts(student_data))
+            
+            # Footer
+            if furniture is None:
+                story.extend(self._create_enhanced_footer())
         
         # Build PDF
-        doc.build(story)
+        with REPORT_STAGE_SECONDS.time(stage='build'):
+            first_page, later_pages = self._page_callbacks(furniture, qr, PDF_STYLE['margin'])
+            doc.build(story, onFirstPage=first_page, onLaterPages=later_pages)
+        REPORTS_RENDERED.inc()
         
-        return filepath
+        return target
         
         # Student information
         story.extend(self._create_student_info(student_data))
@@ -204,6 +172,74 @@ class CambridgePDFGenerator:
         
         return filepath
     
+    def generate_enhanced_report_bytes(self, student_data, profile=None, template=None, draft=False):
+        """
+        Render an enhanced report entirely in memory
+        
+        Args:
+            student_data (dict): Enhanced student and grade data with coefficients
+            profile (str): Output profile name, PDF_STYLE['output_profile'] by default
+            template (str): Report template id, chosen per school by default
+            draft (bool): Render without issuing a verification record
+            
+        Returns:
+            bytes: The PDF document
+        """
+        buffer = io.BytesIO()
+        self.generate_enhanced_report(student_data, buffer, profile, template, draft)
+        pdf_bytes = buffer.getvalue()
+        REPORT_PDF_BYTES.observe(len(pdf_bytes), profile=get_profile(profile).name)
+        return pdf_bytes
+    
+    def _build_from_template(self, layout, student_data, target, output_profile, qr=None):
+        """Build a report from a compiled declarative template"""
+        doc = SimpleDocTemplate(
+            target,
+            pagesize=layout.pagesize,
+            rightMargin=layout.margin,
+            leftMargin=layout.margin,
+            topMargin=layout.margin,
+            bottomMargin=layout.margin,
+            **output_profile.document_options(student_data)
+        )
+        
+        with REPORT_STAGE_SECONDS.time(stage='story'):
+            story = layout.story(student_data)
+        
+        with REPORT_STAGE_SECONDS.time(stage='build'):
+            first_page, later_pages = self._page_callbacks(None, qr, layout.margin)
+            doc.build(story, onFirstPage=first_page, onLaterPages=later_pages)
+        REPORTS_RENDERED.inc()
+        
+        return target
+    
+    def _page_callbacks(self, furniture, qr, margin):
+        """
+        onFirstPage and onLaterPages callbacks for doc.build
+        
+        Args:
+            furniture (PageFurniture): Header and footer stamped on every page, if any
+            qr (VerificationQR): Verification QR code for the first page, if any
+            margin (float): Page margin the QR code sits inside
+        """
+        def later_pages(canvas, doc):
+            if furniture is not None:
+                furniture.draw(canvas, doc)
+        
+        def first_page(canvas, doc):
+            later_pages(canvas, doc)
+            if qr is not None:
+                draw_qr(canvas, qr, doc.pagesize, margin)
+        
+        return first_page, later_pages
+    
+    def _page_furniture(self, student_data, logo=None):
+        """Get the shared header/footer furniture for the student's school (and crest)"""
+        school_name = student_data.get('school_name', 'DOBEDA INTERNATIONAL SCHOOL')
+        key = school_name if logo is None else f"{school_name}|{logo.digest}"
+        return get_furniture(key, lambda: (self._create_enhanced_header(student_data, logo),
+                                           self._create_enhanced_footer()))
+    
     def _create_header(self, student_data):
         """Create the report header"""
         content = []
@@ -230,7 +266,7 @@ class CambridgePDFGenerator:
             ['Candidate Number:', student_data.get('candidate_number', 'N/A')],
             ['Exam Session:', student_data.get('exam_session', 'N/A')],
             ['School:', student_data.get('school', APP_SETTINGS['default_school'])],
-            ['Date of Report:', datetime.now().strftime("%B %d, %Y")]
+            ['Date of Report:', report_date(student_data).strftime("%B %d, %Y")]
         ]
         
         table = Table(student_info, colWidths=[2*inch, 4*inch])
@@ -380,20 +416,25 @@ class CambridgePDFGenerator:
         # Footer text
         footer_text = Paragraph(
             f"Generated by {APP_SETTINGS['title']} v{APP_SETTINGS['version']} | "
-            f"Report Date: {datetime.now().strftime('%Y-%m-%d %H:%M')}",
+            f"Report Date: {report_date(student_data).strftime('%Y-%m-%d')}",
             self.styles['CustomSmall']
         )
         content.append(footer_text)
         
         return content
 
-    def _create_enhanced_header(self, student_data):
+    def _create_enhanced_header(self, student_data, logo=None):
         """Create Cambridge International Examinations header matching Joe's template"""
         content = []
         
+        # School crest (centered) above the school name
+        if logo is not None:
+            content.append(ImageFlowable(logo, *printed_size(logo, IMAGE_SETTINGS['logo_size'])))
+            content.append(Spacer(1, self.LOGO_SPACING))
+        
         # School name (centered) - use dynamic school name if provided
         school_name_text = student_data.get('school_name', 'DOBEDA INTERNATIONAL SCHOOL')
-        school_name = Paragraph(school_name_text.upper(), self.styles['CambridgeTitle'])
+        school_name = Paragraph(font_markup(school_name_text.upper()), self.styles['CambridgeTitle'])
         content.append(school_name)
         
         # Main Cambridge title (centered)
@@ -408,32 +449,20 @@ class CambridgePDFGenerator:
         
         return content
 
-    def _create_enhanced_student_info(self, student_data):
+    def _create_enhanced_student_info(self, student_data, photo=None):
         """Create student information section matching Joe's template"""
         content = []
         
-        # Student info table data matching Joe's template with dynamic values
-        info_data = [
-            ['Centre Number:', student_data.get('centre_number', '12345'), 'Session:', student_data.get('session', 'June 2024')],
-            ['Candidate Name:', student_data.get('student_name', student_data.get('name', 'Unknown')), 'Candidate Number:', '  ' + student_data.get('candidate_number', '0001')],
-        ]
-        
         # Create table with proper spacing - adjusted to prevent text overlap
-        info_table = Table(info_data, colWidths=[1.3*inch, 1.7*inch, 1.5*inch, 1.1*inch])
-        info_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 0),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 3),
-            ('RIGHTPADDING', (2, 1), (2, 1), 8),  # Extra padding for "Candidate Number:" label
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-            # Bold the labels only
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
-        ]))
+        info_table = Table(self._student_info_rows(student_data), colWidths=COLUMN_WIDTHS['student_info'])
+        info_table.setStyle(self.table_styles['student_info'])
+        
+        # Student photo to the right of the details
+        if photo is not None:
+            width, height = printed_size(photo, IMAGE_SETTINGS['photo_size'])
+            info_table = Table([[info_table, ImageFlowable(photo, width, height)]],
+                               colWidths=[sum(COLUMN_WIDTHS['student_info']), width + 12])
+            info_table.setStyle(self.table_styles['student_photo'])
         
         content.append(info_table)
         content.append(Spacer(1, 20))
@@ -445,96 +474,14 @@ class CambridgePDFGenerator:
         content = []
         
         # Main results header - centered
-        results_header = Paragraph(
-            "<b>Subject Results</b>",
-            ParagraphStyle(
-                name='ResultsHeader',
-                fontSize=12,
-                alignment=TA_CENTER,
-                spaceAfter=10,
-                textColor=colors.black,
-                fontName='Helvetica-Bold'
-            )
-        )
+        results_header = Paragraph("<b>Subject Results</b>", self.styles['ResultsHeader'])
         content.append(results_header)
         
-        # Table headers with Cambridge style - abbreviated and properly spaced
-        headers = ['Subject', 'Coeff', 'Score', 'Grade', 'W. Score', 'Teacher Comments']
-        table_data = [headers]
-        
-        # Add subject data
-        for subject in student_data.get('subjects', []):
-            subject_name = subject.get('name', '')
-            
-            # Get teacher comments - look for multiple possible field names
-            teacher_comment = (
-                subject.get('teacher_comments', '') or 
-                subject.get('comment', '') or 
-                subject.get('comments', '') or 
-                'Good'  # Default comment
-            )
-            
-            row = [
-                self._wrap_text(subject_name, 30),
-                f"{subject.get('coefficient', 1.0):.1f}",
-                f"{subject.get('score', 0):.0f}%",
-                subject.get('grade', subject.get('letter_grade', 'U')),
-                f"{subject.get('weighted_score', subject.get('score', 0) * subject.get('coefficient', 1.0)):.1f}",
-                self._wrap_text(teacher_comment, 25)
-            ]
-            table_data.append(row)
-        
         # Create table with Cambridge-style formatting - wider columns for Subject and Teacher Comments
-        grades_table = Table(table_data, colWidths=[2.2*inch, 0.7*inch, 0.7*inch, 0.6*inch, 0.8*inch, 1.6*inch])
+        grades_table = Table(self._grades_rows(student_data), colWidths=COLUMN_WIDTHS['grades'])
         
         # Style the table with clean Cambridge formatting and proper alignment
-        style = [
-            # Header row styling
-            ('BACKGROUND', (0, 0), (-1, 0), colors.white),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),    # Subject column header left-aligned
-            ('ALIGN', (1, 0), (1, 0), 'CENTER'),  # Coeff header center
-            ('ALIGN', (2, 0), (2, 0), 'CENTER'),  # Score header center
-            ('ALIGN', (3, 0), (3, 0), 'CENTER'),  # Grade header center
-            ('ALIGN', (4, 0), (4, 0), 'CENTER'),  # W. Score header center
-            ('ALIGN', (5, 0), (5, 0), 'LEFT'),    # Teacher Comments header left
-            
-            # Data rows styling
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 9),
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),    # Subject names left-aligned
-            ('ALIGN', (1, 1), (1, -1), 'CENTER'),  # Coefficient values center
-            ('ALIGN', (2, 1), (2, -1), 'CENTER'),  # Score values center
-            ('ALIGN', (3, 1), (3, -1), 'CENTER'),  # Grade values center
-            ('ALIGN', (4, 1), (4, -1), 'CENTER'),  # W. Score values center
-            ('ALIGN', (5, 1), (5, -1), 'LEFT'),    # Teacher Comments left-aligned
-            
-            # Borders - clean professional lines with top border
-            ('LINEABOVE', (0, 0), (-1, 0), 2, colors.black),  # Bold line ABOVE header (top border)
-            ('LINEBELOW', (0, 0), (-1, 0), 2, colors.black),  # Bold line under header
-            ('LINEBELOW', (0, 1), (-1, -1), 0.5, colors.gray),  # Light lines under data rows
-            ('LINEBEFORE', (0, 0), (0, -1), 1, colors.black),  # Left border
-            ('LINEAFTER', (-1, 0), (-1, -1), 1, colors.black),  # Right border
-            ('LINEAFTER', (0, 0), (0, -1), 0.5, colors.gray),  # Subject column separator
-            ('LINEAFTER', (1, 0), (1, -1), 0.5, colors.gray),  # Coeff column separator
-            ('LINEAFTER', (2, 0), (2, -1), 0.5, colors.gray),  # Score column separator
-            ('LINEAFTER', (3, 0), (3, -1), 0.5, colors.gray),  # Grade column separator
-            ('LINEAFTER', (4, 0), (4, -1), 0.5, colors.gray),  # W. Score column separator
-            ('LINEAFTER', (3, 0), (3, -1), 0.5, colors.gray),  # Grade column separator
-            ('LINEAFTER', (4, 0), (4, -1), 0.5, colors.gray),  # Weighted Score column separator
-            
-            # Padding for better readability
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING', (0, 0), (-1, -1), 6),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 6),
-            
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ]
-        
-        grades_table.setStyle(TableStyle(style))
+        grades_table.setStyle(self.table_styles['grades'])
         content.append(grades_table)
         content.append(Spacer(1, 25))
         
@@ -545,64 +492,69 @@ class CambridgePDFGenerator:
         content = []
         
         # Summary header with Cambridge style
-        summary_header = Paragraph("PERFORMANCE SUMMARY", 
-                                 getSampleStyleSheet()['Heading1'])
-        summary_header.style.alignment = 1  # Center
-        summary_header.style.fontSize = 14
-        summary_header.style.fontName = 'Helvetica-Bold'
-        summary_header.style.spaceAfter = 12
+        summary_header = Paragraph("PERFORMANCE SUMMARY", self.styles['SummaryHeader'])
         content.append(summary_header)
         
-        # Calculate GPA and classification
-        gpa = student_data.get('gpa', 0.0)
-        total_subjects = student_data.get('total_subjects', 0)
-        
-        # Get overall grade and average from final_grade data
-        final_data = student_data.get('final_grade', {})
-        overall_grade = final_data.get('final_grade', 'N/A')
-        weighted_average = final_data.get('weighted_average', 0.0)
-        
-        # Cambridge A-Level Performance Classification
-        if gpa >= 3.7:
-            classification = "DISTINCTION"
-        elif gpa >= 3.0:
-            classification = "MERIT"
-        elif gpa >= 2.3:
-            classification = "CREDIT"
-        elif gpa >= 2.0:
-            classification = "PASS"
-        else:
-            classification = "UNCLASSIFIED"
-        
         # Summary table with Cambridge formatting
-        summary_data = [
-            ['Average:', f"{weighted_average:.1f}%"],
-            ['Total Subjects Attempted:', str(total_subjects)],
-            ['Performance Classification:', classification],
-            ['Overall Grade:', overall_grade]
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[3.5*inch, 2.5*inch])
-        summary_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 8),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 6),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            # Bold the classification row
-            ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
-        ]))
+        summary_table = Table(self._summary_rows(student_data), colWidths=COLUMN_WIDTHS['gpa_summary'])
+        summary_table.setStyle(self.table_styles['gpa_summary'])
         
         content.append(summary_table)
         content.append(Spacer(1, 20))
         
         return content
 
+    def _create_cohort_charts(self, student_data):
+        """Cohort score histograms for the student's subjects, highlighting their own marks"""
+        charts = CohortCharts(student_data)
+        if not charts.charts:
+            return []
+        return [Paragraph("COHORT COMPARISON", self.styles['SummaryHeader']), charts, Spacer(1, 10)]
+
+    def _student_info_rows(self, student_data):
+        """Student info table data matching Joe's template with dynamic values"""
+        fields = report_fields(student_data)
+        value = {name: table_cell(fields[name], 'Helvetica', 11)
+                 for name in ('centre_number', 'session', 'student_name', 'candidate_number')}
+        return [
+            ['Centre Number:', value['centre_number'], 'Session:', value['session']],
+            ['Candidate Name:', value['student_name'], 'Candidate Number:', '  ' + fields['candidate_number']],
+        ]
+
+    def _grades_rows(self, student_data):
+        """Subject results table data: abbreviated header row, then one row per subject"""
+        # Table headers with Cambridge style - abbreviated and properly spaced
+        headers = ['Subject', 'Coeff', 'Score', 'Grade', 'W. Score', 'Teacher Comments']
+        table_data = [headers]
+        
+        # Body cells are 9pt Helvetica with 6pt padding either side; wrap by font metrics to fit
+        subject_width = COLUMN_WIDTHS['grades'][0] - 12
+        comment_width = COLUMN_WIDTHS['grades'][5] - 12
+        
+        # Add subject data
+        for subject in student_data.get('subjects', []):
+            fields = subject_fields(subject)
+            row = [
+                table_cell(fields['name'], 'Helvetica', 9, subject_width),
+                f"{fields['coefficient']:.1f}",
+                f"{fields['score']:.0f}%",
+                fields['grade'],
+                f"{fields['weighted_score']:.1f}",
+                table_cell(fields['comment'], 'Helvetica', 9, comment_width)
+            ]
+            table_data.append(row)
+        return table_data
+
+    def _summary_rows(self, student_data):
+        """Performance summary table data with the Cambridge classification"""
+        fields = report_fields(student_data)
+        return [
+            ['Average:', f"{fields['weighted_average']:.1f}%"],
+            ['Total Subjects Attempted:', str(fields['total_subjects'])],
+            ['Performance Classification:', fields['classification']],
+            ['Overall Grade:', fields['final_grade']]
+        ]
+
     def _create_comments_section(self, student_data):
         """Create teacher comments section matching Joe's template"""
         content = []
@@ -638,25 +590,14 @@ class CambridgePDFGenerator:
         content.append(Spacer(1, 40))
         
         # Signature lines
-        sig_data = [
-            ['_' * 30, '_' * 30],
-            ['Academic Coordinator', 'School Principal'],
-            ['Signature & Date', 'Signature & Date']
-        ]
-        
-        sig_table = Table(sig_data, colWidths=[3*inch, 3*inch])
-        sig_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
-        ]))
+        sig_table = Table(self.SIGNATURE_ROWS, colWidths=COLUMN_WIDTHS['signatures'])
+        sig_table.setStyle(self.table_styles['signatures'])
         
         content.append(sig_table)
         content.append(Spacer(1, 30))
         
         # DOBEDA copyright footer
-        footer_text = Paragraph("© 2025 DOBEDA - Cambridge Examination Report System", self.styles['JoeFooter'])
+        footer_text = Paragraph(self.COPYRIGHT_TEXT, self.styles['JoeFooter'])
         content.append(footer_text)
         
         return content
@@ -740,4 +681,7 @@ class CambridgePDFGenerator:
             }
         }
         
-        return self.generate_report(sample_data, 'sample_cambridge_report.pdf')
\ No newline at end of file
+        return self.generate_report(sample_data, 'sample_cambridge_report.pdf')
+
+# Shared renderer for request handlers and batch workers; holds no per-report state
+REPORT_RENDERER = CambridgePDFGenerator()
@@ -0,0 +1,188 @@
+"""
+PDF Style Registry
+Paragraph and table styles for the report card, built once at import and
+shared read-only by every render in the process
+"""
+
+from types import MappingProxyType
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import TableStyle
+
+from config import PDF_STYLE
+
+
+class FrozenParagraphStyle(ParagraphStyle):
+    """ParagraphStyle that refuses attribute changes once constructed"""
+
+    def __init__(self, name, parent=None, **kw):
+        super().__init__(name, parent, **kw)
+        self.__dict__['_frozen'] = True
+
+    def refresh(self):
+        # Copying a frozen parent's attributes must not freeze this style mid-construction
+        super().refresh()
+        self.__dict__['_frozen'] = False
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get('_frozen'):
+            raise AttributeError(f"Style '{self.name}' is shared and read-only; "
+                                 f"derive a new ParagraphStyle instead of setting {name}")
+        super().__setattr__(name, value)
+
+
+def _freeze(style):
+    """Copy a style (resolving its parent chain) into a frozen one"""
+    attributes = {key: value for key, value in style.__dict__.items() if key not in ('name', 'parent', '_frozen')}
+    return FrozenParagraphStyle(style.name, **attributes)
+
+
+def _build_paragraph_styles():
+    """Sample styles plus the report card styles matching Joe's template"""
+    sample = getSampleStyleSheet()
+    styles = {name: _freeze(sample[name]) for name in sample.byName}
+
+    def add(name, parent, **kw):
+        styles[name] = FrozenParagraphStyle(name, parent=styles[parent], **kw)
+
+    # Cambridge header styles
+    add('CambridgeTitle', 'Normal', fontSize=16, fontName='Helvetica-Bold', alignment=TA_CENTER,
+        spaceAfter=8, textColor=colors.black)
+    add('CambridgeSubtitle', 'Normal', fontSize=12, fontName='Helvetica-Bold', alignment=TA_CENTER,
+        spaceAfter=6, textColor=colors.black)
+    add('CambridgeDocType', 'Normal', fontSize=14, fontName='Helvetica-Bold', alignment=TA_CENTER,
+        spaceAfter=20, textColor=colors.black)
+
+    # Body, comment and footer text
+    add('JoeBodyText', 'Normal', fontSize=11, fontName='Helvetica', alignment=TA_LEFT, spaceAfter=6)
+    add('JoeBodyTextBold', 'Normal', fontSize=11, fontName='Helvetica-Bold', alignment=TA_LEFT, spaceAfter=6)
+    add('JoeComments', 'Normal', fontSize=10, fontName='Helvetica', alignment=TA_JUSTIFY, spaceAfter=4,
+        leftIndent=10, rightIndent=10)
+    add('JoeFooter', 'Normal', fontSize=9, fontName='Helvetica', alignment=TA_CENTER, textColor=colors.grey)
+
+    # Section headers of the enhanced report
+    styles['ResultsHeader'] = FrozenParagraphStyle('ResultsHeader', fontSize=12, alignment=TA_CENTER,
+                                                   spaceAfter=10, textColor=colors.black,
+                                                   fontName='Helvetica-Bold')
+    add('SummaryHeader', 'Heading1', alignment=TA_CENTER, fontSize=14, fontName='Helvetica-Bold', spaceAfter=12)
+
+    # Legacy styles for backward compatibility
+    add('CustomTitle', 'Heading1', fontSize=PDF_STYLE['title_font_size'], alignment=TA_CENTER,
+        spaceAfter=30, textColor=colors.darkblue)
+    add('CustomHeader', 'Heading2', fontSize=PDF_STYLE['header_font_size'], alignment=TA_CENTER, spaceAfter=20)
+    add('CustomBody', 'Normal', fontSize=PDF_STYLE['body_font_size'], alignment=TA_LEFT, spaceAfter=12)
+    add('CustomSmall', 'Normal', fontSize=PDF_STYLE['small_font_size'], alignment=TA_CENTER, spaceAfter=6)
+
+    return MappingProxyType(styles)
+
+
+def _build_table_styles():
+    """Table styles of the enhanced report; none depend on the number of rows"""
+    student_info = TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 0),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 3),
+        ('RIGHTPADDING', (2, 1), (2, 1), 8),  # Extra padding for "Candidate Number:" label
+        ('TOPPADDING', (0, 0), (-1, -1), 4),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        # Bold the labels only
+        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+        ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+    ])
+
+    grades = TableStyle([
+        # Header row styling
+        ('BACKGROUND', (0, 0), (-1, 0), colors.white),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('ALIGN', (0, 0), (0, 0), 'LEFT'),    # Subject column header left-aligned
+        ('ALIGN', (1, 0), (1, 0), 'CENTER'),  # Coeff header center
+        ('ALIGN', (2, 0), (2, 0), 'CENTER'),  # Score header center
+        ('ALIGN', (3, 0), (3, 0), 'CENTER'),  # Grade header center
+        ('ALIGN', (4, 0), (4, 0), 'CENTER'),  # W. Score header center
+        ('ALIGN', (5, 0), (5, 0), 'LEFT'),    # Teacher Comments header left
+
+        # Data rows styling
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('ALIGN', (0, 1), (0, -1), 'LEFT'),    # Subject names left-aligned
+        ('ALIGN', (1, 1), (1, -1), 'CENTER'),  # Coefficient values center
+        ('ALIGN', (2, 1), (2, -1), 'CENTER'),  # Score values center
+        ('ALIGN', (3, 1), (3, -1), 'CENTER'),  # Grade values center
+        ('ALIGN', (4, 1), (4, -1), 'CENTER'),  # W. Score values center
+        ('ALIGN', (5, 1), (5, -1), 'LEFT'),    # Teacher Comments left-aligned
+
+        # Borders - clean professional lines with top border
+        ('LINEABOVE', (0, 0), (-1, 0), 2, colors.black),  # Bold line ABOVE header (top border)
+        ('LINEBELOW', (0, 0), (-1, 0), 2, colors.black),  # Bold line under header
+        ('LINEBELOW', (0, 1), (-1, -1), 0.5, colors.gray),  # Light lines under data rows
+        ('LINEBEFORE', (0, 0), (0, -1), 1, colors.black),  # Left border
+        ('LINEAFTER', (-1, 0), (-1, -1), 1, colors.black),  # Right border
+        ('LINEAFTER', (0, 0), (0, -1), 0.5, colors.gray),  # Subject column separator
+        ('LINEAFTER', (1, 0), (1, -1), 0.5, colors.gray),  # Coeff column separator
+        ('LINEAFTER', (2, 0), (2, -1), 0.5, colors.gray),  # Score column separator
+        ('LINEAFTER', (3, 0), (3, -1), 0.5, colors.gray),  # Grade column separator
+        ('LINEAFTER', (4, 0), (4, -1), 0.5, colors.gray),  # W. Score column separator
+
+        # Padding for better readability
+        ('TOPPADDING', (0, 0), (-1, -1), 8),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ('LEFTPADDING', (0, 0), (-1, -1), 6),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 6),
+
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ])
+
+    gpa_summary = TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 11),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LEFTPADDING', (0, 0), (-1, -1), 8),
+        ('RIGHTPADDING', (0, 0), (-1, -1), 8),
+        ('TOPPADDING', (0, 0), (-1, -1), 6),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        # Bold the classification row
+        ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
+    ])
+
+    signatures = TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+    ])
+
+    return MappingProxyType({
+        'student_info': student_info,
+        'grades': grades,
+        'gpa_summary': gpa_summary,
+        'signatures': signatures,
+        # Student info table beside the student photo
+        'student_photo': TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (0, 0), 0),
+            ('RIGHTPADDING', (0, 0), (0, 0), 0),
+        ]),
+    })
+
+
+# Column widths (points) of the enhanced report tables, keyed like TABLE_STYLES
+COLUMN_WIDTHS = MappingProxyType({
+    'student_info': (1.3 * inch, 1.7 * inch, 1.5 * inch, 1.1 * inch),
+    'grades': (2.2 * inch, 0.7 * inch, 0.7 * inch, 0.6 * inch, 0.8 * inch, 1.6 * inch),
+    'gpa_summary': (3.5 * inch, 2.5 * inch),
+    'signatures': (3 * inch, 3 * inch),
+})
+
+STYLES = _build_paragraph_styles()
+TABLE_STYLES = _build_table_styles()
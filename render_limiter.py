@@ -0,0 +1,116 @@
+"""
+Render Admission Control
+Bounds how many report PDFs render at once and how many requests may wait
+for a slot; everything beyond that is turned away immediately with a 503
+instead of queueing until nginx times out
+"""
+
+import functools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from config import RENDER_LIMITS
+from metrics import REGISTRY
+
+RENDER_REJECTED = REGISTRY.counter(
+    'cambridge_render_rejected_total', 'Report renders refused by admission control', ('reason',))
+RENDER_WAIT_SECONDS = REGISTRY.histogram(
+    'cambridge_render_wait_seconds', 'Time spent waiting for a render slot')
+
+
+class RenderOverloaded(Exception):
+    """Raised when no render slot is available; carries the suggested Retry-After in seconds"""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f'Render capacity exhausted ({reason})')
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class RenderLimiter:
+    """
+    Render concurrency limit with a short, bounded wait queue
+
+    Slots are per process. Preforked servers give each worker its share of
+    the limits (see gunicorn_config.py) rather than sharing one semaphore,
+    because a worker killed mid-render could never give its slot back.
+    """
+
+    def __init__(self, settings=None, share=1):
+        """
+        Args:
+            settings (dict): Overrides for RENDER_LIMITS
+            share (int): Number of processes rendering concurrently; the
+                limits are split between them, at least one slot each
+        """
+        settings = dict(RENDER_LIMITS, **(settings or {}))
+        self.max_concurrent = math.ceil((settings['max_concurrent'] or os.cpu_count() or 1) / share)
+        self.max_waiting = math.ceil(settings['max_waiting'] / share)
+        self.wait_timeout = settings['wait_timeout']
+        self.retry_after = settings['retry_after']
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiting = 0
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+    def _reject(self, reason):
+        RENDER_REJECTED.inc(reason=reason)
+        raise RenderOverloaded(reason, self.retry_after)
+
+    def _acquire(self):
+        if self._slots.acquire(blocking=False):
+            return
+
+        with self._lock:
+            if self._waiting >= self.max_waiting:
+                self._reject('queue_full')
+            self._waiting += 1
+
+        started = time.perf_counter()
+        try:
+            acquired = self._slots.acquire(timeout=self.wait_timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+            RENDER_WAIT_SECONDS.observe(time.perf_counter() - started)
+
+        if not acquired:
+            self._reject('timeout')
+
+    @contextmanager
+    def slot(self):
+        """
+        Hold a render slot for the duration of a with-block
+
+        Raises:
+            RenderOverloaded: If the wait queue is full or no slot frees up in time
+        """
+        self._acquire()
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+            self._slots.release()
+
+    def limit(self, render):
+        """Wrap a render function so every call holds a slot"""
+        @functools.wraps(render)
+        def limited(*args, **kwargs):
+            with self.slot():
+                return render(*args, **kwargs)
+        return limited
@@ -0,0 +1,302 @@
+"""
+Report Data Module
+Builds the student_data dictionary consumed by CambridgePDFGenerator
+from raw student details and subject marks
+"""
+
+from datetime import date
+
+from config import PDF_STYLE
+
+# Score and coefficient limits accepted by the web form
+MIN_SCORE = 0
+MAX_SCORE = 100
+MIN_COEFFICIENT = 0.1
+MAX_COEFFICIENT = 3.0
+
+
+def calculate_letter_grade(score):
+    """Calculate letter grade from numerical score - range A* to U"""
+    if score >= 90:
+        return 'A*'
+    elif score >= 80:
+        return 'A'
+    elif score >= 70:
+        return 'B'
+    elif score >= 60:
+        return 'C'
+    elif score >= 50:
+        return 'D'
+    elif score >= 40:
+        return 'E'
+    elif score >= 30:
+        return 'F'
+    elif score >= 20:
+        return 'G'
+    else:
+        return 'U'  # Ungraded for scores below 20
+
+
+def get_grade_points(score):
+    """Convert score to grade points for GPA calculation"""
+    if score >= 90:
+        return 4.0
+    elif score >= 80:
+        return 3.7
+    elif score >= 70:
+        return 3.0
+    elif score >= 60:
+        return 2.3
+    elif score >= 50:
+        return 2.0
+    elif score >= 40:
+        return 1.7
+    elif score >= 30:
+        return 1.3
+    elif score >= 20:
+        return 1.0
+    else:
+        return 0.0
+
+
+def build_subject_entry(name, score, coefficient=1.0, comment=''):
+    """
+    Build a single subject entry with grade, grade points and weighted score
+
+    Args:
+        name (str): Subject name
+        score: Raw score (0-100), number or numeric string
+        coefficient: Subject coefficient (0.1-3.0), number or numeric string
+        comment (str): Teacher comment
+
+    Returns:
+        dict: Subject entry, or None if the score or coefficient is out of range
+
+    Raises:
+        ValueError: If score or coefficient is not a number
+    """
+    score = float(score)
+    coeff = float(coefficient if coefficient not in (None, '') else 1.0)
+
+    if not (MIN_SCORE <= score <= MAX_SCORE and MIN_COEFFICIENT <= coeff <= MAX_COEFFICIENT):
+        return None
+
+    grade_points = get_grade_points(score)
+    return {
+        'name': name,
+        'score': score,
+        'coefficient': coeff,
+        'letter_grade': calculate_letter_grade(score),
+        'grade_points': grade_points,
+        'weighted_score': grade_points * coeff,
+        'comment': comment or ''
+    }
+
+
+def add_summary(student_data):
+    """
+    Add GPA, subject count and final grade summary to student_data in place
+
+    Args:
+        student_data (dict): Student data with a populated 'subjects' list
+
+    Returns:
+        dict: The same student_data dictionary
+    """
+    subjects = student_data.get('subjects', [])
+    total_weighted_score = sum(subject['weighted_score'] for subject in subjects)
+    total_coefficients = sum(subject['coefficient'] for subject in subjects)
+
+    if total_coefficients > 0:
+        overall_gpa = total_weighted_score / total_coefficients
+        student_data['gpa'] = round(overall_gpa, 2)
+        student_data['total_subjects'] = len(subjects)
+
+        # Convert GPA scale to percentage for the PDF summary
+        weighted_average = (total_weighted_score / total_coefficients) * (100/4)
+        student_data['final_grade'] = {
+            'total_weighted_score': round(total_weighted_score, 1),
+            'total_coefficient': round(total_coefficients, 1),
+            'weighted_average': round(weighted_average, 1),
+            'final_grade': calculate_letter_grade(weighted_average)
+        }
+
+    return student_data
+
+
+def report_date(student_data):
+    """
+    Date a report is issued on
+
+    Args:
+        student_data (dict): Enhanced student data; 'report_date' may hold a
+            date or an ISO date string (YYYY-MM-DD)
+
+    Returns:
+        date: The student's report date, else PDF_STYLE['report_date'], else today
+
+    Raises:
+        ValueError: If the report date is not a valid ISO date
+    """
+    value = student_data.get('report_date') or PDF_STYLE.get('report_date')
+    if not value:
+        return date.today()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+
+def performance_classification(gpa):
+    """Cambridge A-Level performance classification for a GPA on the 4.0 scale"""
+    if gpa >= 3.7:
+        return "DISTINCTION"
+    elif gpa >= 3.0:
+        return "MERIT"
+    elif gpa >= 2.3:
+        return "CREDIT"
+    elif gpa >= 2.0:
+        return "PASS"
+    else:
+        return "UNCLASSIFIED"
+
+
+def subject_fields(subject):
+    """
+    Printable fields of one subject entry, with the report's defaults applied
+
+    Args:
+        subject (dict): Subject entry from student_data['subjects']
+
+    Returns:
+        dict: name, coefficient, score, grade, weighted_score and comment
+    """
+    score = subject.get('score', 0)
+    coefficient = subject.get('coefficient', 1.0)
+    return {
+        'name': subject.get('name', ''),
+        'coefficient': coefficient,
+        'score': score,
+        'grade': subject.get('grade', subject.get('letter_grade', 'U')),
+        'weighted_score': subject.get('weighted_score', score * coefficient),
+        # Teacher comments - look for multiple possible field names
+        'comment': (subject.get('teacher_comments', '') or subject.get('comment', '') or
+                    subject.get('comments', '') or 'Good')
+    }
+
+
+def report_fields(student_data):
+    """
+    Printable fields of a whole report, with the report's defaults applied
+
+    Shared by the built-in layout and declarative report templates so both
+    print the same values.
+
+    Args:
+        student_data (dict): Enhanced student data from build_student_data
+
+    Returns:
+        dict: Student details, summary values and a 'subjects' list of subject_fields
+    """
+    gpa = student_data.get('gpa', 0.0)
+    final_data = student_data.get('final_grade', {})
+    return {
+        'school_name': student_data.get('school_name', 'DOBEDA INTERNATIONAL SCHOOL'),
+        'centre_number': student_data.get('centre_number', '12345'),
+        'session': student_data.get('session', 'June 2024'),
+        'year': student_data.get('year', ''),
+        'student_name': student_data.get('student_name', student_data.get('name', 'Unknown')),
+        'candidate_number': student_data.get('candidate_number', '0001'),
+        'report_date': report_date(student_data).strftime('%B %d, %Y'),
+        'gpa': gpa,
+        'total_subjects': student_data.get('total_subjects', 0),
+        'weighted_average': final_data.get('weighted_average', 0.0),
+        'final_grade': final_data.get('final_grade', 'N/A'),
+        'classification': performance_classification(gpa),
+        'subjects': [subject_fields(subject) for subject in student_data.get('subjects', [])]
+    }
+
+
+def build_student_data(student_info, subjects):
+    """
+    Build a complete student_data dictionary ready for the PDF generator
+
+    Args:
+        student_info (dict): Student details (student_name/name, candidate_number,
+            school_name/center_number, session, year and optional report_date)
+        subjects (list): Subject dicts with name, score, coefficient and comment
+
+    Returns:
+        dict: student_data with subjects, GPA and final grade summary
+
+    Raises:
+        ValueError: If a subject has a non-numeric score or coefficient,
+            or if no subject has a valid score and coefficient, or if the
+            report date is not a valid ISO date
+    """
+    school_name = student_info.get('school_name') or student_info.get('center_number', '')
+    student_data = {
+        'name': student_info.get('student_name') or student_info.get('name', ''),
+        'candidate_number': str(student_info.get('candidate_number', '')),
+        'school_name': school_name,
+        'school': school_name,
+        'session': str(student_info.get('session', '')),
+        'year': str(student_info.get('year', '')),
+        'subjects': []
+    }
+    if student_info.get('report_date'):
+        try:
+            student_data['report_date'] = report_date(student_info).isoformat()
+        except ValueError:
+            raise ValueError(f"Invalid report date: {student_info['report_date']}")
+
+    for subject in subjects:
+        name = subject.get('name') or subject.get('subject')
+        score = subject.get('score')
+        if not name or score in (None, ''):
+            continue
+
+        try:
+            entry = build_subject_entry(name, score, subject.get('coefficient', 1.0),
+                                        subject.get('comment', ''))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'Invalid data for {name}: {str(e)}')
+
+        if entry:
+            student_data['subjects'].append(entry)
+
+    if not student_data['subjects']:
+        raise ValueError('Please add at least one subject with valid score and coefficient')
+
+    return add_summary(student_data)
+
+
+def parse_report_form(form):
+    """
+    Read student details and indexed subject fields from the web report form
+
+    Args:
+        form: request.form with subject_count plus subject_{i}, score_{i},
+            coefficient_{i} and comment_{i} fields
+
+    Returns:
+        tuple: (student_info, subjects) ready for build_student_data
+    """
+    student_info = {
+        'student_name': form.get('student_name', ''),
+        'candidate_number': form.get('candidate_number', ''),
+        'school_name': form.get('center_number', ''),  # Form field holds the school name
+        'session': form.get('session', ''),
+        'year': form.get('year', ''),
+        'report_date': form.get('report_date', '')
+    }
+
+    subjects = [
+        {
+            'name': form.get(f'subject_{i}'),
+            'score': form.get(f'score_{i}'),
+            'coefficient': form.get(f'coefficient_{i}', '1.0'),
+            'comment': form.get(f'comment_{i}', '')
+        }
+        for i in range(int(form.get('subject_count', 0)))
+    ]
+    return student_info, subjects
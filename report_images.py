@@ -0,0 +1,238 @@
+"""
+Report Images
+School crests and student photos decoded and downscaled to their printed
+size once, then kept as shared ImageReader objects: logos per school and
+photos by content hash, each per output profile
+
+ReportLab names every drawn ImageReader by its decoded pixels, so a fresh
+reader per report would decode the image again for every document. The
+cached readers are decoded when they are built and reused by every report.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from PIL import Image, UnidentifiedImageError
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable
+
+from config import IMAGE_SETTINGS
+from output_profiles import POINTS_PER_INCH, PROFILES
+
+logger = logging.getLogger(__name__)
+
+PHOTO_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff', '.webp')
+
+# Photo files are named after the candidate number
+PHOTO_KEY = re.compile(r'^[A-Za-z0-9_-]+$')
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class ImageError(ValueError):
+    """Raised for an image file that cannot be read"""
+
+
+class CachedImageReader(ImageReader):
+    """ImageReader decoded once and safe to share between concurrent documents"""
+
+    def __init__(self, data):
+        """
+        Args:
+            data (bytes): Encoded JPEG or PNG image
+        """
+        super().__init__(io.BytesIO(data))
+        self.encoded = data
+        self.digest = hashlib.sha256(data).hexdigest()
+        # drawImage names images by their decoded pixels; decode now, once
+        self.getRGBData()
+        if self._dataA is not None:
+            self._dataA.getRGBData()
+
+    def _jpeg_fh(self):
+        # JPEGs are embedded as they are; each document reads its own handle
+        return io.BytesIO(self.encoded)
+
+
+class ImageFlowable(Flowable):
+    """Draw a cached reader at a fixed size (platypus.Image only takes files)"""
+
+    def __init__(self, reader, width, height, hAlign='CENTER'):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+        self.hAlign = hAlign
+
+    def wrap(self, availWidth, availHeight):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+def printed_size(reader, box):
+    """Largest size with the image's aspect ratio that fits the (width, height) box"""
+    width, height = reader.getSize()
+    scale = min(box[0] / width, box[1] / height)
+    return width * scale, height * scale
+
+
+def _cached(key, build):
+    """Get a cached reader, building it on first use"""
+    with _cache_lock:
+        reader = _cache.get(key)
+        if reader is not None:
+            _cache.move_to_end(key)
+            return reader
+
+    reader = build()
+
+    with _cache_lock:
+        reader = _cache.setdefault(key, reader)
+        _cache.move_to_end(key)
+        while len(_cache) > IMAGE_SETTINGS['cache_entries']:
+            _cache.popitem(last=False)
+    return reader
+
+
+def _fit(source, profile, size):
+    try:
+        return CachedImageReader(profile.encode_image(source, *size))
+    except (OSError, UnidentifiedImageError) as e:
+        raise ImageError(f"Cannot read image: {e}")
+
+
+def school_logo(school_name, profile):
+    """
+    The school's crest fitted to IMAGE_SETTINGS['logo_size'] for a profile
+
+    Args:
+        school_name (str): School name as it appears on the report
+        profile (OutputProfile): Output profile the report is rendered with
+
+    Returns:
+        CachedImageReader or None: None when the school has no crest configured
+            or the file is missing
+    """
+    path = IMAGE_SETTINGS['logos'].get(school_name)
+    if not path:
+        return None
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        logger.warning(f"Logo for {school_name} not found: {path}")
+        return None
+    # A replaced crest file gets a new key, so it is picked up without a restart
+    return _cached(('logo', school_name, mtime, profile.name),
+                   lambda: _fit(path, profile, IMAGE_SETTINGS['logo_size']))
+
+
+def photo_source(student_data):
+    """
+    Find the photo for a student
+
+    Args:
+        student_data (dict): Enhanced student data; 'photo' may hold image bytes
+            or a path, otherwise the imported thumbnail for the candidate
+            number is used when there is one
+
+    Returns:
+        bytes or None: Encoded image data
+    """
+    photo = student_data.get('photo')
+    if isinstance(photo, (bytes, bytearray)):
+        return bytes(photo)
+    if not photo:
+        candidate = str(student_data.get('candidate_number', ''))
+        if not PHOTO_KEY.match(candidate):
+            return None
+        photo = os.path.join(IMAGE_SETTINGS['thumbnail_folder'], candidate + '.jpg')
+    try:
+        with open(photo, 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def student_photo(student_data, profile):
+    """
+    The student's photo fitted to IMAGE_SETTINGS['photo_size'] for a profile
+
+    Photos are cached by content hash, so the same picture is decoded once
+    however it reaches the report.
+
+    Returns:
+        CachedImageReader or None: None when the student has no photo
+    """
+    data = photo_source(student_data)
+    if data is None:
+        return None
+    digest = hashlib.sha256(data).hexdigest()
+    return _cached(('photo', digest, profile.name),
+                   lambda: _fit(io.BytesIO(data), profile, IMAGE_SETTINGS['photo_size']))
+
+
+def import_photo_directory(folder, thumbnail_folder=None):
+    """
+    Precompute photo thumbnails for a directory of student photos
+
+    Each photo is named after its candidate number (e.g. 0042.jpg). It is
+    decoded once and downscaled to the printed photo size at the highest
+    resolution of any output profile, so rendering never touches the
+    original camera files.
+
+    Args:
+        folder (str): Directory of original photos
+        thumbnail_folder (str): Output directory, IMAGE_SETTINGS['thumbnail_folder']
+            by default
+
+    Returns:
+        dict: imported (candidate numbers) and skipped (file name -> reason)
+    """
+    thumbnail_folder = thumbnail_folder or IMAGE_SETTINGS['thumbnail_folder']
+    os.makedirs(thumbnail_folder, exist_ok=True)
+    width, height = IMAGE_SETTINGS['photo_size']
+    dpi = max(profile.image_dpi for profile in PROFILES.values())
+    target = (round(width * dpi / POINTS_PER_INCH), round(height * dpi / POINTS_PER_INCH))
+
+    imported, skipped = [], {}
+    for name in sorted(os.listdir(folder)):
+        key, extension = os.path.splitext(name)
+        if extension.lower() not in PHOTO_EXTENSIONS:
+            continue
+        if not PHOTO_KEY.match(key):
+            skipped[name] = 'file name is not a candidate number'
+            continue
+        try:
+            with Image.open(os.path.join(folder, name)) as image:
+                image.draft('RGB', target)  # Let JPEG decode at a reduced scale
+                thumbnail = image.convert('RGB')
+                thumbnail.thumbnail(target, Image.LANCZOS)
+        except (OSError, UnidentifiedImageError) as e:
+            skipped[name] = str(e)
+            continue
+        path = os.path.join(thumbnail_folder, key + '.jpg')
+        thumbnail.save(path + '.tmp', format='JPEG', quality=92)
+        os.replace(path + '.tmp', path)
+        imported.append(key)
+
+    logger.info(f"Imported {len(imported)} student photos into {thumbnail_folder}, skipped {len(skipped)}")
+    return {'imported': imported, 'skipped': skipped}
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python report_images.py <photo directory>")
+    result = import_photo_directory(sys.argv[1])
+    print(f"✅ Imported {len(result['imported'])} photos into {IMAGE_SETTINGS['thumbnail_folder']}")
+    for name, reason in result['skipped'].items():
+        print(f"⚠️  Skipped {name}: {reason}")
@@ -0,0 +1,116 @@
+"""
+Report Previews
+PNG images of a report's first page for the web UI, rasterized from the real
+PDF so teachers see exactly what will print
+
+Previews are cached by a content hash of the input data, kept apart from the
+report cache keys and free of secrets, which is also their URL: browsers may
+keep them indefinitely, and an unchanged report is never rendered or
+rasterized twice. The cache is on disk by default, so every worker can serve
+a preview another one rendered. Previews are drafts, so rendering one does
+not issue a verification record.
+"""
+
+import logging
+import subprocess
+
+from config import PREVIEW_SETTINGS
+from pdf_cache import ReportCache, cache_key
+from pdf_generator import REPORT_RENDERER
+
+logger = logging.getLogger(__name__)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+class PreviewUnavailable(RuntimeError):
+    """Raised when the configured rasterizer is not installed"""
+
+
+class PreviewError(RuntimeError):
+    """Raised when a PDF could not be rasterized"""
+
+
+def rasterize_first_page(pdf_bytes, dpi=None):
+    """
+    Rasterize the first page of a PDF to PNG with poppler's pdftoppm
+
+    Args:
+        pdf_bytes (bytes): The PDF document
+        dpi (int): Resolution, PREVIEW_SETTINGS['dpi'] by default
+
+    Returns:
+        bytes: PNG image
+
+    Raises:
+        PreviewUnavailable: If the rasterizer is not installed
+        PreviewError: If rasterizing fails or times out
+    """
+    dpi = dpi or PREVIEW_SETTINGS['dpi']
+    # PDF from stdin, one PNG of page one to stdout: no temporary files
+    command = [PREVIEW_SETTINGS['rasterizer'], '-png', '-r', str(dpi), '-f', '1', '-l', '1', '-singlefile', '-', '-']
+    try:
+        result = subprocess.run(command, input=pdf_bytes, capture_output=True,
+                                timeout=PREVIEW_SETTINGS['timeout'], check=True)
+    except FileNotFoundError:
+        raise PreviewUnavailable(f"Report previews need {PREVIEW_SETTINGS['rasterizer']} (poppler-utils)")
+    except subprocess.TimeoutExpired:
+        raise PreviewError(f"Rasterizing the preview took longer than {PREVIEW_SETTINGS['timeout']}s")
+    except subprocess.CalledProcessError as e:
+        raise PreviewError(f"Rasterizing the preview failed: {e.stderr.decode('utf-8', 'replace').strip()}")
+
+    if not result.stdout.startswith(PNG_SIGNATURE):
+        raise PreviewError('Rasterizer did not produce a PNG image')
+    return result.stdout
+
+
+class ReportPreviews:
+    """Rendered report previews, cached in memory and on disk by input hash"""
+
+    def __init__(self, cache=None):
+        """
+        Args:
+            cache (ReportCache): PNG cache, built from PREVIEW_SETTINGS by default
+        """
+        self.cache = cache or ReportCache(
+            max_bytes=PREVIEW_SETTINGS['memory_max_bytes'],
+            disk_folder=PREVIEW_SETTINGS['disk_folder'],
+            disk_max_bytes=PREVIEW_SETTINGS['disk_max_bytes'],
+            suffix='.png',
+            namespace='preview'
+        )
+
+    def render(self, student_data, profile, layout=None, limit=None):
+        """
+        Make sure the preview of a report is cached
+
+        Args:
+            student_data (dict): Enhanced student data
+            profile (OutputProfile): Output profile the preview is rendered with
+            layout (CompiledTemplate): Report template, None for the built-in layout
+            limit (callable): Wraps the render function, e.g. RenderLimiter.limit
+
+        Returns:
+            str: Preview key (hex SHA-256 of the inputs) to fetch it with get()
+
+        Raises:
+            PreviewUnavailable: If the rasterizer is not installed
+            PreviewError: If rasterizing fails
+        """
+        # Edited templates get a new version and so a new preview
+        variant = f"preview/{PREVIEW_SETTINGS['dpi']}/{profile.name}"
+        if layout is not None:
+            variant += f"/{layout.version}"
+        template = layout.id if layout is not None else None
+
+        def render(data):
+            pdf_bytes = REPORT_RENDERER.generate_enhanced_report_bytes(data, profile=profile.name,
+                                                                       template=template, draft=True)
+            return rasterize_first_page(pdf_bytes)
+
+        self.cache.get_or_render(student_data, limit(render) if limit else render, variant=variant)
+        return cache_key(student_data, variant, self.cache.namespace)
+
+    def get(self, key):
+        """The cached PNG for a preview key, or None once it has been evicted"""
+        return self.cache.get(key)
@@ -0,0 +1,196 @@
+"""
+Report Payload Schema
+Validates JSON report payloads against a declarative schema that is compiled
+once at import into plain Python checks
+"""
+
+import json
+import re
+from datetime import date
+
+from config import CAMBRIDGE_SUBJECTS
+from report_data import MAX_COEFFICIENT, MAX_SCORE, MIN_COEFFICIENT, MIN_SCORE
+
+# Current payload schema version accepted by /api/v1/reports
+SCHEMA_VERSION = 1
+
+SUBJECT_SCHEMA = {
+    'name': {'type': 'string', 'required': True, 'max_length': 100},
+    'score': {'type': 'number', 'required': True, 'min': MIN_SCORE, 'max': MAX_SCORE},
+    'coefficient': {'type': 'number', 'min': MIN_COEFFICIENT, 'max': MAX_COEFFICIENT},
+    'comment': {'type': 'string', 'max_length': 500}
+}
+
+STUDENT_SCHEMA = {
+    'version': {'type': 'integer', 'min': SCHEMA_VERSION, 'max': SCHEMA_VERSION},
+    'student_name': {'type': 'string', 'required': True, 'max_length': 100},
+    'candidate_number': {'type': 'string', 'max_length': 20},
+    'school_name': {'type': 'string', 'max_length': 200},
+    'session': {'type': 'string', 'max_length': 50},
+    'year': {'type': 'string', 'max_length': 10},
+    'report_date': {'type': 'string', 'format': 'date'},
+    'subjects': {
+        'type': 'array',
+        'required': True,
+        'min_items': 1,
+        'max_items': len(CAMBRIDGE_SUBJECTS),
+        'items': SUBJECT_SCHEMA
+    }
+}
+
+TYPE_NAMES = {
+    'string': 'a string',
+    'number': 'a number',
+    'integer': 'an integer',
+    'array': 'a list',
+    'object': 'an object'
+}
+
+
+ISO_DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def _is_iso_date(value):
+    """True for a real calendar date written YYYY-MM-DD"""
+    if not ISO_DATE.fullmatch(value):
+        return False
+    try:
+        date.fromisoformat(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _type_check(type_name):
+    """Return a predicate for a schema type name"""
+    if type_name == 'string':
+        return lambda value: isinstance(value, str)
+    if type_name == 'number':
+        return lambda value: isinstance(value, (int, float)) and not isinstance(value, bool)
+    if type_name == 'integer':
+        return lambda value: isinstance(value, int) and not isinstance(value, bool)
+    if type_name == 'array':
+        return lambda value: isinstance(value, list)
+    return lambda value: isinstance(value, dict)
+
+
+def _compile_field(name, rule):
+    """Compile one field rule into a check(value, path, errors) function"""
+    is_type = _type_check(rule['type'])
+    type_message = f"must be {TYPE_NAMES[rule['type']]}"
+    minimum = rule.get('min')
+    maximum = rule.get('max')
+    max_length = rule.get('max_length')
+    min_items = rule.get('min_items')
+    max_items = rule.get('max_items')
+    date_format = rule.get('format') == 'date'
+    check_item = compile_schema(rule['items']) if 'items' in rule else None
+
+    def check(value, path, errors):
+        if not is_type(value):
+            errors.append({'field': path, 'message': type_message})
+            return
+        if minimum is not None and value < minimum:
+            errors.append({'field': path, 'message': f'must be at least {minimum}'})
+        if maximum is not None and value > maximum:
+            errors.append({'field': path, 'message': f'must be at most {maximum}'})
+        if max_length is not None and len(value) > max_length:
+            errors.append({'field': path, 'message': f'must be at most {max_length} characters'})
+        if date_format and not _is_iso_date(value):
+            errors.append({'field': path, 'message': 'must be a date in YYYY-MM-DD format'})
+        if min_items is not None and len(value) < min_items:
+            errors.append({'field': path, 'message': f'must have at least {min_items} item(s)'})
+        if max_items is not None and len(value) > max_items:
+            errors.append({'field': path, 'message': f'must have at most {max_items} items'})
+        if check_item is not None:
+            for index, item in enumerate(value):
+                check_item(item, f'{path}[{index}]', errors)
+
+    return check
+
+
+def compile_schema(schema):
+    """
+    Compile an object schema into a validator function
+
+    Args:
+        schema (dict): Field name -> rule dict (type, required, min, max,
+            max_length, format ('date' for YYYY-MM-DD strings), min_items,
+            max_items, items)
+
+    Returns:
+        callable: validate(obj, path, errors) appending {'field', 'message'} dicts
+    """
+    checks = [(name, rule.get('required', False), _compile_field(name, rule))
+              for name, rule in schema.items()]
+
+    def validate(obj, path, errors):
+        if not isinstance(obj, dict):
+            errors.append({'field': path or '$', 'message': 'must be an object'})
+            return
+        for name, required, check in checks:
+            field_path = f'{path}.{name}' if path else name
+            value = obj.get(name)
+            if value is None:
+                if required:
+                    errors.append({'field': field_path, 'message': 'is required'})
+                continue
+            check(value, field_path, errors)
+
+    return validate
+
+
+# Compiled once at import - validation never re-reads the schema dicts
+_validate_student = compile_schema(STUDENT_SCHEMA)
+
+
+def validate_student(payload):
+    """
+    Validate one student report payload
+
+    Returns:
+        list: Error dicts with 'field' and 'message'; empty when valid
+    """
+    errors = []
+    _validate_student(payload, '', errors)
+    return errors
+
+
+def parse_ndjson(content):
+    """
+    Parse and validate newline-delimited JSON, one student per line
+
+    Args:
+        content (str or bytes): NDJSON payload
+
+    Returns:
+        tuple: (students, errors) where errors carry the 1-based 'line' number
+    """
+    if isinstance(content, bytes):
+        try:
+            content = content.decode('utf-8')
+        except UnicodeDecodeError as e:
+            return [], [{'line': 0, 'field': '$', 'message': f'invalid UTF-8: {str(e)}'}]
+
+    students = []
+    errors = []
+    for line_number, line in enumerate(content.splitlines(), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            errors.append({'line': line_number, 'field': '$', 'message': f'invalid JSON: {str(e)}'})
+            continue
+
+        line_errors = validate_student(payload)
+        if line_errors:
+            errors.extend(dict(error, line=line_number) for error in line_errors)
+        else:
+            students.append(payload)
+
+    if not students and not errors:
+        errors.append({'line': 0, 'field': '$', 'message': 'no students provided'})
+    return students, errors
+
@@ -0,0 +1,297 @@
+"""
+Report Template Engine
+Declarative JSON report layouts (sections, tables, column widths, styles and
+data bindings) compiled once into flowable factories and cached by template
+id and file modification time, so rendering a report never parses a template
+
+A template is a JSON file <id>.json in TEMPLATE_SETTINGS['folder']:
+
+    {
+      "page": {"size": "A4", "margin": 30},
+      "sections": [
+        {"type": "paragraph", "text": "{school_name!u}", "style": "CambridgeTitle"},
+        {"type": "spacer", "height": 15},
+        {"type": "table", "style": "grades", "widths": [2.2, 0.7],
+         "header": ["Subject", "Score"],
+         "repeat": {"over": "subjects", "cells": ["{name}", "{score:.0f}%"]},
+         "wrap": [0], "font": ["Helvetica", 9]}
+      ]
+    }
+
+Bindings are str.format fields over report_data.report_fields (plus the
+subject fields inside a repeat); the !u conversion upper-cases a value.
+Column widths are in inches; table styles name an entry of TABLE_STYLES or
+list TableStyle commands inline.
+"""
+
+import json
+import os
+import re
+import string
+import threading
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape, letter
+from reportlab.lib.units import inch
+from reportlab.platypus import PageBreak, Paragraph, Spacer, Table, TableStyle
+
+from config import PDF_STYLE, TEMPLATE_SETTINGS
+from fonts import font_markup, table_cell
+from pdf_styles import STYLES, TABLE_STYLES
+from report_data import report_fields, subject_fields
+
+PAGE_SIZES = {'A4': A4, 'LETTER': letter}
+
+# Template ids come from requests, so they may only name files in the folder
+TEMPLATE_ID = re.compile(r'^[A-Za-z0-9_-]+$')
+
+# Fields a binding may use, taken from the shared report field builders; their
+# values for empty student data are used to try every binding once at compile time
+_SAMPLE_VALUES = dict(report_fields({}), **subject_fields({}))
+REPORT_FIELDS = frozenset(report_fields({})) - {'subjects'}
+SUBJECT_FIELDS = REPORT_FIELDS | frozenset(subject_fields({}))
+
+# Mistakes in a template's JSON surface as these while it is compiled
+_SPEC_ERRORS = (AttributeError, LookupError, TypeError, ValueError)
+
+# TableStyle commands with a colour argument, and its index after the cell range
+_COLOR_ARGUMENT = {
+    'BACKGROUND': 0, 'TEXTCOLOR': 0,
+    'GRID': 1, 'BOX': 1, 'OUTLINE': 1, 'INNERGRID': 1,
+    'LINEABOVE': 1, 'LINEBELOW': 1, 'LINEBEFORE': 1, 'LINEAFTER': 1,
+}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+class TemplateError(ValueError):
+    """Raised for a missing, unreadable or invalid report template"""
+
+
+class _Binding:
+    """Text with format fields, parsed once and filled per report"""
+
+    def __init__(self, text, fields, where):
+        self.parts = []
+        try:
+            parsed = list(string.Formatter().parse(str(text)))
+        except ValueError as e:
+            raise TemplateError(f"{where}: {e}")
+
+        for literal, field, spec, conversion in parsed:
+            if field is not None:
+                if field not in fields:
+                    raise TemplateError(f"{where}: unknown field '{field}'")
+                if conversion not in (None, 'u'):
+                    raise TemplateError(f"{where}: unsupported conversion '!{conversion}'")
+            self.parts.append((literal, field, spec or '', conversion))
+
+        # A format spec that does not fit its value fails here, not in a report
+        try:
+            self(_SAMPLE_VALUES)
+        except (TypeError, ValueError) as e:
+            raise TemplateError(f"{where}: {e}")
+
+    def __call__(self, values, markup=False):
+        """Fill the fields; markup=True escapes values (with fallback fonts) for Paragraph text"""
+        out = []
+        for literal, field, spec, conversion in self.parts:
+            out.append(literal)
+            if field is not None:
+                value = values[field]
+                if conversion == 'u':
+                    value = str(value).upper()
+                value = format(value, spec)
+                out.append(font_markup(value) if markup else value)
+        return ''.join(out)
+
+
+def _table_style(style, where):
+    if isinstance(style, str):
+        if style not in TABLE_STYLES:
+            raise TemplateError(f"{where}: unknown table style '{style}'")
+        return TABLE_STYLES[style]
+
+    commands = []
+    for command in style or []:
+        name, start, stop, *args = command
+        if name in _COLOR_ARGUMENT and len(args) > _COLOR_ARGUMENT[name]:
+            index = _COLOR_ARGUMENT[name]
+            args[index] = colors.toColor(args[index])
+        commands.append((name, tuple(start), tuple(stop), *args))
+    return TableStyle(commands)
+
+
+def _compile_paragraph(section, where):
+    style_name = section.get('style', 'Normal')
+    if style_name not in STYLES:
+        raise TemplateError(f"{where}: unknown paragraph style '{style_name}'")
+    style = STYLES[style_name]
+    text = _Binding(section.get('text', ''), REPORT_FIELDS, where)
+    return lambda values: [Paragraph(text(values, markup=True), style)]
+
+
+def _compile_spacer(section, where):
+    height = float(section.get('height', 12))
+    return lambda values: [Spacer(1, height)]
+
+
+def _compile_table(section, where):
+    widths = [float(width) * inch for width in section.get('widths', [])]
+    if not widths:
+        raise TemplateError(f"{where}: a table needs column widths")
+    style = _table_style(section.get('style'), where)
+
+    header = [str(cell) for cell in section.get('header', [])]
+    rows = [[_Binding(cell, REPORT_FIELDS, where) for cell in row] for row in section.get('rows', [])]
+    repeat = section.get('repeat')
+    cells = [_Binding(cell, SUBJECT_FIELDS, where) for cell in repeat['cells']] if repeat else []
+    if repeat and repeat.get('over', 'subjects') != 'subjects':
+        raise TemplateError(f"{where}: tables can only repeat over 'subjects'")
+    for row in [header] + rows + ([cells] if cells else []):
+        if row and len(row) != len(widths):
+            raise TemplateError(f"{where}: rows must have {len(widths)} cells")
+
+    # Wrapped columns are measured once per distinct text (see text_layout);
+    # text Helvetica cannot draw becomes a Paragraph with fallback fonts
+    font = section.get('font', ('Helvetica', 9))
+    if not isinstance(font, (list, tuple)) or len(font) != 2:
+        raise TemplateError(f"{where}: font must be a [name, size] pair")
+    font_name, font_size = str(font[0]), float(font[1])
+    padding = float(section.get('padding', 6))
+    wrap_widths = {column: widths[column] - 2 * padding for column in section.get('wrap', [])}
+
+    def fill(binding, values, column):
+        return table_cell(binding(values), font_name, font_size, wrap_widths.get(column))
+
+    def build(values):
+        data = [list(header)] if header else []
+        data.extend([fill(cell, values, column) for column, cell in enumerate(row)] for row in rows)
+        for subject in values['subjects'] if cells else []:
+            subject_values = dict(values, **subject)
+            data.append([fill(cell, subject_values, column) for column, cell in enumerate(cells)])
+        if not data:
+            return []
+        table = Table(data, colWidths=widths, repeatRows=1 if header else 0)
+        table.setStyle(style)
+        return [table]
+
+    return build
+
+
+_SECTIONS = {
+    'paragraph': _compile_paragraph,
+    'spacer': _compile_spacer,
+    'table': _compile_table,
+    'page_break': lambda section, where: (lambda values: [PageBreak()]),
+}
+
+
+class CompiledTemplate:
+    """A parsed report template: page setup plus one flowable factory per section"""
+
+    def __init__(self, template_id, mtime, spec):
+        """
+        Args:
+            template_id (str): Template id (file name without .json)
+            mtime (int): File modification time in nanoseconds
+            spec (dict): Parsed JSON template
+        """
+        self.id = template_id
+        self.mtime = mtime
+        self.version = f"{template_id}@{mtime}"
+
+        try:
+            page = spec.get('page', {})
+            size = str(page.get('size', PDF_STYLE['page_size'])).upper()
+            self.margin = float(page.get('margin', PDF_STYLE['margin']))
+        except _SPEC_ERRORS as e:
+            raise TemplateError(f"{template_id} page: {e}")
+        if size not in PAGE_SIZES:
+            raise TemplateError(f"{template_id}: unknown page size '{size}'")
+        self.pagesize = landscape(PAGE_SIZES[size]) if page.get('landscape') else PAGE_SIZES[size]
+
+        self.sections = []
+        for index, section in enumerate(spec.get('sections', [])):
+            where = f"{template_id} section {index + 1}"
+            kind = section.get('type') if isinstance(section, dict) else None
+            if kind not in _SECTIONS:
+                raise TemplateError(f"{where}: unknown section type '{kind}'")
+            try:
+                self.sections.append(_SECTIONS[kind](section, where))
+            except TemplateError:
+                raise
+            except _SPEC_ERRORS as e:
+                raise TemplateError(f"{where}: {e}")
+
+    def story(self, student_data):
+        """
+        Build the flowables of one report
+
+        Args:
+            student_data (dict): Enhanced student data
+
+        Returns:
+            list: Platypus flowables
+        """
+        values = report_fields(student_data)
+        story = []
+        for build in self.sections:
+            story.extend(build(values))
+        return story
+
+
+def load_template(template_id):
+    """
+    Get a compiled template, compiling it on first use or after the file changes
+
+    Args:
+        template_id (str): Template id (file name without .json)
+
+    Returns:
+        CompiledTemplate: Shared, read-only compiled template
+
+    Raises:
+        TemplateError: If the template does not exist or is invalid
+    """
+    if not TEMPLATE_ID.match(template_id or ''):
+        raise TemplateError(f"Invalid report template id '{template_id}'")
+
+    path = os.path.join(TEMPLATE_SETTINGS['folder'], template_id + '.json')
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise TemplateError(f"Unknown report template '{template_id}'")
+
+    compiled = _cache.get(template_id)
+    if compiled is not None and compiled.mtime == mtime:
+        return compiled
+
+    with _cache_lock:
+        compiled = _cache.get(template_id)
+        if compiled is None or compiled.mtime != mtime:
+            try:
+                with open(path, encoding='utf-8') as f:
+                    spec = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                raise TemplateError(f"Cannot read report template '{template_id}': {e}")
+            compiled = CompiledTemplate(template_id, mtime, spec)
+            _cache[template_id] = compiled
+    return compiled
+
+
+def select_template(student_data, template_id=None):
+    """
+    Choose the template for a report: the requested one, else the school's, else the default
+
+    Args:
+        student_data (dict): Enhanced student data
+        template_id (str): Template requested explicitly, if any
+
+    Returns:
+        CompiledTemplate or None: None selects the built-in layout
+    """
+    template_id = (template_id or
+                   TEMPLATE_SETTINGS['schools'].get(student_data.get('school_name', '')) or
+                   TEMPLATE_SETTINGS['default'])
+    return load_template(template_id) if template_id else None
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Test script for class-wide batch report generation
+"""
+
+import io
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+
+from batch_jobs import BatchJobManager, RosterError, parse_roster
+
+CSV_ROSTER = """student_name,candidate_number,school_name,session,year,subject,score,coefficient,comment
+Joe Bloggs,0001,DOBEDA INTERNATIONAL SCHOOL,June,2024,Mathematics,86,1.3,Good
+Joe Bloggs,0001,DOBEDA INTERNATIONAL SCHOOL,June,2024,Physics,77,1.2,Good effort
+Ann Lee,0002,DOBEDA INTERNATIONAL SCHOOL,June,2024,Biology,91,1.2,Excellent
+"""
+
+JSON_ROSTER = """{"students": [
+    {"student_name": "Joe Bloggs", "candidate_number": "0001",
+     "subjects": [{"name": "Mathematics", "score": 86, "coefficient": 1.3}]}
+]}"""
+
+
+def wait_for_job(manager, job_id, timeout=60):
+    """Poll a batch job until it finishes"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = manager.get_status(job_id)
+        if status['state'] in ('completed', 'completed_with_errors', 'failed'):
+            return status
+        time.sleep(0.1)
+    raise AssertionError(f"Batch {job_id} did not finish in {timeout}s")
+
+
+def test_parse_csv_roster():
+    """CSV rows are grouped into one student per candidate number"""
+    students = parse_roster(CSV_ROSTER, 'text/csv')
+    assert len(students) == 2
+    assert students[0]['student_name'] == 'Joe Bloggs'
+    assert [s['name'] for s in students[0]['subjects']] == ['Mathematics', 'Physics']
+    print("✅ CSV roster parsed")
+
+
+def test_parse_json_roster():
+    """JSON rosters are detected without a content type"""
+    students = parse_roster(JSON_ROSTER)
+    assert len(students) == 1
+    assert students[0]['subjects'][0]['score'] == 86
+    print("✅ JSON roster parsed")
+
+
+def test_invalid_roster_rejected():
+    """Malformed rosters raise RosterError"""
+    for content in ('', 'name,mark\nJoe,50\n', '{"students": []}'):
+        try:
+            parse_roster(content)
+        except RosterError:
+            continue
+        raise AssertionError(f"Roster should have been rejected: {content!r}")
+    print("✅ Invalid rosters rejected")
+
+
+def test_empty_batch_rejected():
+    """A batch without students is refused instead of never finishing"""
+    jobs_dir = tempfile.mkdtemp()
+    manager = BatchJobManager(jobs_dir, max_workers=1, use_processes=False)
+    try:
+        manager.submit_prepared([])
+        raise AssertionError("Empty batch was accepted")
+    except RosterError:
+        pass
+    finally:
+        manager.shutdown()
+        shutil.rmtree(jobs_dir, ignore_errors=True)
+    print("✅ Empty batch rejected")
+
+
+def test_batch_job_builds_archive():
+    """A submitted roster renders every report into one ZIP archive"""
+    jobs_dir = tempfile.mkdtemp()
+    manager = BatchJobManager(jobs_dir, max_workers=2, use_processes=False)
+    try:
+        job_id = manager.submit(parse_roster(CSV_ROSTER, 'text/csv'))
+        status = wait_for_job(manager, job_id)
+
+        assert status['state'] == 'completed', status
+        assert status['completed'] == 2 and status['failed'] == 0
+
+        with zipfile.ZipFile(manager.archive_path(job_id)) as archive:
+            names = archive.namelist()
+            assert len(names) == 2
+            assert all(archive.read(name).startswith(b'%PDF') for name in names)
+        print(f"✅ Batch archive built: {names}")
+    finally:
+        manager.shutdown()
+        shutil.rmtree(jobs_dir, ignore_errors=True)
+
+
+def test_batch_endpoints():
+    """The batch API accepts a roster with 202 and serves status and the ZIP"""
+    from app import app, batch_manager
+
+    client = app.test_client()
+    response = client.post('/api/v1/batches',
+                           data={'roster': (io.BytesIO(CSV_ROSTER.encode()), 'roster.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    assert wait_for_job(batch_manager, job_id)['state'] == 'completed'
+    status = client.get(f'/api/v1/batches/{job_id}').get_json()
+    assert status['progress'] == 100.0
+
+    download = client.get(f'/api/v1/batches/{job_id}/download')
+    assert download.status_code == 200
+    assert download.mimetype == 'application/zip'
+    download.close()
+
+    assert client.get('/api/v1/batches/' + '0' * 32).status_code == 404
+    shutil.rmtree(os.path.join(batch_manager.jobs_dir, job_id), ignore_errors=True)
+    print("✅ Batch endpoints working")
+
+
+if __name__ == "__main__":
+    test_parse_csv_roster()
+    test_parse_json_roster()
+    test_invalid_roster_rejected()
+    test_empty_batch_rejected()
+    test_batch_job_builds_archive()
+    test_batch_endpoints()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Test script for the cohort broadsheet
+"""
+
+import io
+import random
+import time
+
+from broadsheet import BroadsheetError, _column_widths, broadsheet_rows, generate_broadsheet, subject_blocks
+from config import PDF_STYLE
+from pdf_booklet import _SourcePDF
+from report_data import build_student_data
+from test_batch_jobs import CSV_ROSTER
+
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English Language', 'French', 'History']
+
+
+def make_cohort(count, seed=1):
+    """Students taking a random five of the subjects each"""
+    rng = random.Random(seed)
+    return [
+        build_student_data(
+            {'student_name': f'Student {index}', 'candidate_number': f'{index:04d}',
+             'school_name': 'Hilltop Academy', 'session': 'June', 'year': '2025'},
+            [{'name': name, 'score': rng.randint(20, 100), 'coefficient': 1.0} for name in rng.sample(SUBJECTS, 5)])
+        for index in range(count)
+    ]
+
+
+def test_rows_use_report_results():
+    """Cells show the scores, grades and averages computed for the reports"""
+    cohort = make_cohort(3)
+    header, body, subjects, leading, trailing = broadsheet_rows(
+        cohort, ['candidate_number', 'student_name', 'weighted_average', 'final_grade'], ['score', 'grade'])
+
+    assert len(header) == 2 and len(body) == 3
+    assert len(body[0]) == len(leading) + 2 * len(subjects) + len(trailing)
+    for row, student_data in zip(body, cohort):
+        assert row[0] == student_data['candidate_number']
+        assert row[-1] == student_data['final_grade']['final_grade']
+        assert row[-2] == f"{student_data['final_grade']['weighted_average']:.1f}%"
+        for subject in student_data['subjects']:
+            column = len(leading) + 2 * subjects.index(subject['name'])
+            assert row[column:column + 2] == [f"{subject['score']:.0f}", subject['letter_grade']]
+    print(f"✅ Broadsheet rows built for {len(subjects)} subjects")
+
+
+def test_unknown_column_rejected():
+    """Column keys are checked before anything is rendered"""
+    for columns, cells in ((['student_name', 'shoe_size'], None), (None, ['score', 'rank'])):
+        try:
+            broadsheet_rows(make_cohort(1), columns, cells)
+        except BroadsheetError:
+            continue
+        raise AssertionError(f"Accepted columns {columns} / {cells}")
+    print("✅ Unknown broadsheet columns rejected")
+
+
+def test_large_cohort_scales_linearly():
+    """Render time grows with the cohort size, not with its square"""
+    timings = {}
+    for count in (300, 1200):
+        cohort = make_cohort(count)
+        start = time.perf_counter()
+        pdf = generate_broadsheet(cohort)
+        timings[count] = time.perf_counter() - start
+        assert len(_SourcePDF(pdf).pages) > 1
+
+    # Four times the rows should cost well under the sixteen times of quadratic layout
+    assert timings[1200] < timings[300] * 8, timings
+    print(f"✅ Broadsheet timings: {', '.join(f'{n} rows {t:.2f}s' for n, t in timings.items())}")
+
+
+def test_many_subjects_split_across_pages():
+    """Subjects that do not fit across the page continue on further pages, never off the edge"""
+    rng = random.Random(3)
+    names = [f'Subject {index}' for index in range(53)]
+    cohort = [
+        build_student_data({'student_name': f'Student {index}', 'candidate_number': f'{index:04d}'},
+                           [{'name': name, 'score': rng.randint(20, 100), 'coefficient': 1.0}
+                            for name in rng.sample(names, 12)])
+        for index in range(30)
+    ]
+    header, body, subjects, leading, trailing = broadsheet_rows(cohort)
+    assert len(subjects) > 15
+
+    frame_width = 842 - 2 * PDF_STYLE['margin']
+    blocks = subject_blocks(frame_width, leading, trailing, subjects, 2)
+    assert len(blocks) > 1
+    assert [name for block, _ in blocks for name in block] == subjects
+    assert all(not block_trailing for _, block_trailing in blocks[:-1]) and blocks[-1][1] == trailing
+    for block, block_trailing in blocks:
+        assert sum(_column_widths(frame_width, leading, block_trailing, block, 2)) <= frame_width + 0.01
+
+    pdf = generate_broadsheet(cohort)
+    assert len(_SourcePDF(pdf).pages) == len(blocks)
+
+    try:
+        subject_blocks(100, leading, trailing, subjects, 2)
+        raise AssertionError("Student columns wider than the page were accepted")
+    except BroadsheetError:
+        pass
+    print(f"✅ {len(subjects)} subjects split into {len(blocks)} page-wide blocks")
+
+
+def test_broadsheet_endpoint():
+    """The broadsheet API renders an uploaded roster and rejects bad columns"""
+    from app import app
+
+    client = app.test_client()
+    response = client.post('/api/v1/broadsheets?columns=student_name,gpa,final_grade',
+                           data={'roster': (io.BytesIO(CSV_ROSTER.encode()), 'roster.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200 and response.mimetype == 'application/pdf'
+    assert response.get_data().startswith(b'%PDF')
+    response.close()
+
+    response = client.post('/api/v1/broadsheets?columns=shoe_size',
+                           data={'roster': (io.BytesIO(CSV_ROSTER.encode()), 'roster.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 400
+    print("✅ Broadsheet endpoint working")
+
+
+if __name__ == "__main__":
+    test_rows_use_report_results()
+    test_unknown_column_rejected()
+    test_large_cohort_scales_linearly()
+    test_many_subjects_split_across_pages()
+    test_broadsheet_endpoint()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the direct-canvas fast path and its Platypus fallback
+"""
+
+import base64
+import re
+import zlib
+
+from config import PDF_STYLE
+from metrics import CANVAS_FALLBACKS
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+
+STUDENT = {'student_name': 'Joe Bloggs', 'candidate_number': '0007', 'school_name': 'Dobeda International'}
+SUBJECTS = [
+    {'name': 'Mathematics', 'score': 88, 'coefficient': 1.3, 'comment': 'Excellent'},
+    {'name': 'Physics', 'score': 73, 'coefficient': 1.2, 'comment': 'Solid work this term overall, keep going'},
+    {'name': 'Chemistry', 'score': 61, 'coefficient': 1.2, 'comment': 'Good'},
+]
+
+
+def text_positions(pdf):
+    """Absolute (x, y, text) of every string shown in the PDF content streams"""
+    positions = []
+    for match in re.finditer(rb'/Length (\d+)(?:(?!stream).)*?stream\r?\n', pdf, re.S):
+        raw = pdf[match.end():match.end() + int(match.group(1))]
+        if raw.endswith(b'~>'):
+            raw = base64.a85decode(raw[:-2])
+        try:
+            content = zlib.decompressobj().decompress(raw).decode('latin1')
+        except zlib.error:
+            continue
+        stack, origin = [], (0, 0)
+        pattern = r'(q)|(Q)|1 0 0 1 ([-\d.]+) ([-\d.]+) cm|1 0 0 1 ([-\d.]+) ([-\d.]+) Tm[^()]*?(?:([-\d.]+) 0 Td )?\((.*?)\) Tj'
+        for match in re.finditer(pattern, content):
+            if match.group(1):
+                stack.append(origin)
+            elif match.group(2):
+                origin = stack.pop()
+            elif match.group(3):
+                origin = (origin[0] + float(match.group(3)), origin[1] + float(match.group(4)))
+            else:
+                x = origin[0] + float(match.group(5)) + float(match.group(7) or 0)
+                y = origin[1] + float(match.group(6))
+                positions.append((round(x, 2), round(y, 2), match.group(8)))
+    return sorted(positions, key=lambda item: (-item[1], item[0]))
+
+
+def render_both(student_data):
+    original = PDF_STYLE.get('fast_renderer')
+    try:
+        PDF_STYLE['fast_renderer'] = False
+        platypus = REPORT_RENDERER.generate_enhanced_report_bytes(student_data)
+        PDF_STYLE['fast_renderer'] = True
+        fast = REPORT_RENDERER.generate_enhanced_report_bytes(student_data)
+        return platypus, fast
+    finally:
+        PDF_STYLE['fast_renderer'] = original
+
+
+def test_fast_path_matches_platypus_layout():
+    """The canvas renderer places every string where Platypus does"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    original = PDF_STYLE.get('page_furniture')
+    try:
+        for furniture in (False, True):
+            PDF_STYLE['page_furniture'] = furniture
+            platypus, fast = render_both(student_data)
+            assert fast.startswith(b'%PDF') and b'/Subtype /Form' not in fast
+            positions = text_positions(fast)
+            assert any(text == 'Mathematics' for _, _, text in positions)
+            assert positions == text_positions(platypus)
+    finally:
+        PDF_STYLE['page_furniture'] = original
+    print("✅ Canvas layout matches Platypus")
+
+
+def test_overflow_falls_back_to_platypus():
+    """Reports that need a second page are rendered by Platypus"""
+    subjects = [dict(subject, comment='A long comment that wraps over several lines of the table cell ' * 2)
+                for subject in SUBJECTS * 3]
+    student_data = build_student_data(STUDENT, subjects)
+    fallbacks = CANVAS_FALLBACKS.value()
+    platypus, fast = render_both(student_data)
+
+    assert CANVAS_FALLBACKS.value() == fallbacks + 1
+    pages = platypus.count(b'/Type /Page\n')
+    assert pages > 1 and fast.count(b'/Type /Page\n') == pages
+    print("✅ Overflowing report falls back to Platypus")
+
+
+def test_markup_school_name_falls_back():
+    """School names with paragraph markup characters use the Platypus path"""
+    student_data = build_student_data(dict(STUDENT, school_name='Saint Mary &amp; John'), SUBJECTS)
+    fallbacks = CANVAS_FALLBACKS.value()
+    render_both(student_data)
+    assert CANVAS_FALLBACKS.value() == fallbacks + 1
+    print("✅ Markup in the school name falls back to Platypus")
+
+
+if __name__ == "__main__":
+    test_fast_path_matches_platypus_layout()
+    test_overflow_falls_back_to_platypus()
+    test_markup_school_name_falls_back()
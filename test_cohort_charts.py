@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Test script for cohort score histograms in student reports
+"""
+
+import io
+import random
+import shutil
+import tempfile
+import time
+import zipfile
+
+from reportlab.platypus import SimpleDocTemplate
+
+import cohort_charts
+from batch_jobs import BatchJobManager
+from cohort_charts import CohortCharts, attach_cohort, cohort_distributions
+from config import COHORT_SETTINGS
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+
+SUBJECTS = ['Mathematics', 'Physics', 'Biology', 'English Language']
+
+
+def cohort(size, seed=7):
+    """A class of students taking every subject, with varied marks"""
+    rng = random.Random(seed)
+    return [build_student_data({'student_name': f'Student {index}', 'candidate_number': f'{index:04d}',
+                                'school_name': 'Hilltop Academy', 'session': 'June', 'year': '2025'},
+                               [{'name': name, 'score': rng.randint(0, 100), 'coefficient': 1.0}
+                                for name in SUBJECTS])
+            for index in range(size)]
+
+
+def test_distributions_counted():
+    """Each mark lands in its bar; 100 is in the top bar and small subjects are left out"""
+    students = cohort(COHORT_SETTINGS['min_students'])
+    students[0]['subjects'][0]['score'] = 100
+    students[1]['subjects'][0]['score'] = 0
+    students[0]['subjects'].append({'name': 'Latin', 'score': 50, 'coefficient': 1.0})
+
+    distributions = cohort_distributions(students)
+    assert sorted(distributions) == sorted(SUBJECTS)
+    maths = distributions['Mathematics']
+    assert len(maths) == 100 // COHORT_SETTINGS['bin_width']
+    assert sum(maths) == len(students) and maths[-1] >= 1 and maths[0] >= 1
+    print("✅ Cohort distributions counted")
+
+
+def test_base_charts_built_once_per_subject():
+    """Every report in a batch shares the subject charts and only adds its own marker"""
+    students = cohort(40)
+    distributions = attach_cohort(students)
+    assert all(student['cohort'] is distributions for student in students)
+
+    cohort_charts._base_chart.cache_clear()
+    for student_data in students[:10]:
+        pdf = REPORT_RENDERER.generate_enhanced_report_bytes(student_data, 'email')
+        assert pdf.startswith(b'%PDF')
+    info = cohort_charts._base_chart.cache_info()
+    assert info.misses == len(SUBJECTS) and info.hits == 9 * len(SUBJECTS), info
+    print(f"✅ Base charts built once per subject: {info}")
+
+
+def test_report_cost_independent_of_cohort_size():
+    """A report for a student in a large cohort costs the same as in a small one"""
+    small, large = cohort(11, seed=3), cohort(3000, seed=11)
+
+    start = time.perf_counter()
+    attach_cohort(large)
+    counting = time.perf_counter() - start
+    assert counting < 0.5, counting
+
+    def per_report(students):
+        # Ten reports not rendered before, so neither side reuses cached verification codes
+        REPORT_RENDERER.generate_enhanced_report_bytes(students[0], 'email')
+        start = time.perf_counter()
+        for student_data in students[1:11]:
+            REPORT_RENDERER.generate_enhanced_report_bytes(student_data, 'email')
+        return (time.perf_counter() - start) / 10
+
+    attach_cohort(small)
+    small_cost, large_cost = per_report(small), per_report(large)
+    assert large_cost < small_cost * 2 + 0.002, (small_cost, large_cost)
+    print(f"✅ Per report {small_cost * 1000:.2f} ms (11 students), {large_cost * 1000:.2f} ms "
+          f"(3000 students); cohort counted in {counting * 1000:.1f} ms")
+
+
+def test_charts_only_for_cohort_subjects():
+    """Subjects without a distribution get no chart, and reports without a cohort none at all"""
+    students = cohort(COHORT_SETTINGS['min_students'])
+    attach_cohort(students)
+    students[0]['subjects'].append({'name': 'Latin', 'score': 50, 'coefficient': 1.0})
+
+    assert [chart[0] for chart in CohortCharts(students[0]).charts] == SUBJECTS
+    assert REPORT_RENDERER._create_cohort_charts(cohort(1)[0]) == []
+    print("✅ Charts only drawn for cohort subjects")
+
+
+def test_labels_use_fallback_fonts():
+    """Subject names the label font cannot draw get the fallback font, as in the report tables"""
+    students = cohort(COHORT_SETTINGS['min_students'])
+    for student_data in students:
+        student_data['subjects'][0]['name'] = '数学'
+    attach_cohort(students)
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer).build([CohortCharts(students[0])])
+    assert b'/BaseFont /STSong-Light' in buffer.getvalue()
+    print("✅ Chart labels drawn with fallback fonts")
+
+
+def test_batch_with_cohort_charts():
+    """A batch submitted with cohort charts renders every report"""
+    jobs_dir = tempfile.mkdtemp()
+    manager = BatchJobManager(jobs_dir, max_workers=2, use_processes=False)
+    try:
+        from test_batch_jobs import wait_for_job
+
+        job_id = manager.submit_prepared(cohort(6), cohort_charts=True)
+        status = wait_for_job(manager, job_id)
+        assert status['state'] == 'completed' and status['cohort_charts'], status
+        with zipfile.ZipFile(manager.archive_path(job_id)) as archive:
+            assert len(archive.namelist()) == 6
+        print("✅ Batch with cohort charts built")
+    finally:
+        manager.shutdown()
+        shutil.rmtree(jobs_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_distributions_counted()
+    test_base_charts_built_once_per_subject()
+    test_report_cost_independent_of_cohort_size()
+    test_charts_only_for_cohort_subjects()
+    test_labels_use_fallback_fonts()
+    test_batch_with_cohort_charts()
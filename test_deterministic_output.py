@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test script for byte-deterministic PDF output
+"""
+
+import time
+from datetime import date
+
+from broadsheet import generate_broadsheet
+from config import PDF_STYLE
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data, report_date, report_fields
+
+STUDENT = {'student_name': 'Ada Obi', 'candidate_number': '0042', 'school_name': 'Hilltop Academy',
+           'session': 'June', 'year': '2025'}
+SUBJECTS = [{'name': 'Mathematics', 'score': 84, 'coefficient': 1.3, 'comment': 'Excellent'},
+            {'name': 'Physics', 'score': 71, 'coefficient': 1.0, 'comment': 'Good'}]
+
+RENDER_PATHS = {
+    'canvas': {'fast_renderer': True, 'page_furniture': True},
+    'platypus': {'fast_renderer': False, 'page_furniture': True},
+    'platypus without furniture': {'fast_renderer': False, 'page_furniture': False},
+}
+
+
+class pdf_style:
+    """Override PDF_STYLE entries while the block runs"""
+
+    def __init__(self, **overrides):
+        self.overrides = overrides
+
+    def __enter__(self):
+        self.original = {key: PDF_STYLE.get(key) for key in self.overrides}
+        PDF_STYLE.update(self.overrides)
+
+    def __exit__(self, *exc):
+        PDF_STYLE.update(self.original)
+
+
+def render_twice(render):
+    """Render the same input twice, a second apart so clock-based fields would differ"""
+    first = render()
+    time.sleep(1.1)
+    return first, render()
+
+
+def test_reports_byte_identical():
+    """Every render path gives identical bytes for identical inputs"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    for name, overrides in RENDER_PATHS.items():
+        with pdf_style(deterministic=True, **overrides):
+            first, second = render_twice(lambda: REPORT_RENDERER.generate_enhanced_report_bytes(dict(student_data)))
+        assert first == second, name
+
+    with pdf_style(deterministic=True):
+        first, second = render_twice(
+            lambda: REPORT_RENDERER.generate_enhanced_report_bytes(student_data, template='compact'))
+        assert first == second
+    print(f"✅ Byte-identical reports on {len(RENDER_PATHS)} render paths and templates")
+
+
+def test_broadsheet_byte_identical():
+    """Broadsheets are deterministic too"""
+    cohort = [build_student_data(dict(STUDENT, candidate_number=f'{i:04d}'), SUBJECTS) for i in range(20)]
+    with pdf_style(deterministic=True):
+        first, second = render_twice(lambda: generate_broadsheet(cohort))
+    assert first == second
+    print("✅ Byte-identical broadsheets")
+
+
+def test_default_mode_keeps_timestamps():
+    """Outside deterministic mode documents carry their creation time"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    with pdf_style(deterministic=False):
+        first, second = render_twice(lambda: REPORT_RENDERER.generate_enhanced_report_bytes(student_data))
+    assert first != second
+    print("✅ Default mode stamps the creation time")
+
+
+def test_different_inputs_differ():
+    """The document ID follows the content, so other students get other files"""
+    with pdf_style(deterministic=True):
+        ada = REPORT_RENDERER.generate_enhanced_report_bytes(build_student_data(STUDENT, SUBJECTS))
+        other = REPORT_RENDERER.generate_enhanced_report_bytes(
+            build_student_data(dict(STUDENT, candidate_number='0043'), SUBJECTS))
+    assert ada != other
+    print("✅ Different students render different files")
+
+
+def test_report_date_injectable():
+    """The report date comes from the data or settings instead of the clock"""
+    student_data = build_student_data(dict(STUDENT, report_date='2025-08-14'), SUBJECTS)
+    assert student_data['report_date'] == '2025-08-14'
+    assert report_date(student_data) == date(2025, 8, 14)
+    assert report_fields(student_data)['report_date'] == 'August 14, 2025'
+
+    with pdf_style(report_date='2024-01-31'):
+        assert report_date({}) == date(2024, 1, 31)
+        assert report_date(student_data) == date(2025, 8, 14)
+    assert report_date({}) == date.today()
+
+    try:
+        build_student_data(dict(STUDENT, report_date='14/08/2025'), SUBJECTS)
+    except ValueError:
+        print("✅ Report date injectable and validated")
+        return
+    raise AssertionError("Accepted an invalid report date")
+
+
+if __name__ == "__main__":
+    test_reports_byte_identical()
+    test_broadsheet_byte_identical()
+    test_default_mode_keeps_timestamps()
+    test_different_inputs_differ()
+    test_report_date_injectable()
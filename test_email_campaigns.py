@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for cohort email campaigns to guardians
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from batch_jobs import BatchJobManager, RosterError, parse_roster
+from config import BATCH_SETTINGS
+from email_campaigns import CampaignManager, guardian_emails
+from mail_outbox import MailSender, Outbox
+from test_mail_outbox import SETTINGS, FakeSMTP
+
+CSV_ROSTER = """student_name,candidate_number,guardian_email,subject,score,coefficient
+Joe Bloggs,0001,mum@example.com; dad@example.com,Mathematics,86,1.3
+Joe Bloggs,0001,,Physics,77,1.2
+Ann Lee,0002,guardian@example.com,Biology,91,1.2
+"""
+
+
+def test_guardian_emails_are_split_and_deduplicated():
+    """Guardian addresses can be a list or a separated string"""
+    assert guardian_emails({'guardian_email': 'a@x.com; b@x.com, a@x.com'}) == ['a@x.com', 'b@x.com']
+    assert guardian_emails({'guardian_emails': ['c@x.com']}) == ['c@x.com']
+    print("✅ Guardian addresses parsed")
+
+
+def test_campaign_mails_every_guardian():
+    """A campaign renders each report once and mails it to every guardian"""
+    work_dir = tempfile.mkdtemp()
+    FakeSMTP.connections = []
+    outbox = Outbox(os.path.join(work_dir, 'outbox.db'), settings=SETTINGS)
+    sender = MailSender(outbox, smtp_factory=FakeSMTP, settings=dict(SETTINGS, poll_interval=0.05))
+    pool = BatchJobManager(os.path.join(work_dir, 'jobs'), max_workers=2, use_processes=False)
+    sender.start()
+    try:
+        manager = CampaignManager(outbox, sender, pool)
+        campaign_id = manager.submit(parse_roster(CSV_ROSTER, 'text/csv'))
+
+        deadline = time.time() + 30
+        while manager.progress(campaign_id)['state'] != 'completed' and time.time() < deadline:
+            time.sleep(0.05)
+
+        progress = manager.progress(campaign_id)
+        assert progress['state'] == 'completed', progress
+        assert progress['rendered'] == 2
+        assert progress['messages']['sent'] == 3
+        assert sorted(r['recipient'] for r in progress['recipients']) == [
+            'dad@example.com', 'guardian@example.com', 'mum@example.com']
+        assert len(FakeSMTP.connections) == 1
+        print("✅ Campaign delivered to 3 guardians")
+    finally:
+        sender.stop()
+        pool.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def test_student_without_guardian_is_rejected():
+    """Rosters with missing guardian addresses are rejected up front"""
+    roster = parse_roster('student_name,subject,score\nJoe,Mathematics,86\n', 'text/csv')
+    try:
+        CampaignManager(None, None, None).submit(roster)
+    except RosterError as e:
+        assert 'guardian' in str(e)
+        print("✅ Missing guardian rejected")
+        return
+    raise AssertionError("Roster without guardians should be rejected")
+
+
+def test_oversized_campaign_is_rejected():
+    """Campaigns are held to the batch size limit before anything is rendered"""
+    roster = [{'student_name': f'Student {index}', 'guardian_email': 'parent@example.com',
+               'subjects': [{'name': 'Mathematics', 'score': 70}]}
+              for index in range(BATCH_SETTINGS['max_students'] + 1)]
+    try:
+        CampaignManager(None, None, None).submit(roster)
+    except RosterError as e:
+        assert 'limit' in str(e)
+        print("✅ Oversized campaign rejected")
+        return
+    raise AssertionError("Roster over the batch limit should be rejected")
+
+
+def test_rate_limit_spaces_messages():
+    """messages_per_minute spaces out consecutive sends"""
+    work_dir = tempfile.mkdtemp()
+    try:
+        outbox = Outbox(os.path.join(work_dir, 'outbox.db'), settings=SETTINGS)
+        for n in range(3):
+            outbox.enqueue(f'parent{n}@example.com', 'Report', 'Body')
+
+        sender = MailSender(outbox, smtp_factory=FakeSMTP, settings=dict(SETTINGS, messages_per_minute=600))
+        started = time.time()
+        while sender.send_due():
+            pass
+        elapsed = time.time() - started
+
+        assert outbox.counts() == {'sent': 3}
+        assert elapsed >= 0.2, elapsed
+        print(f"✅ 3 messages at 600/min took {elapsed:.2f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_guardian_emails_are_split_and_deduplicated()
+    test_campaign_mails_every_guardian()
+    test_student_without_guardian_is_rejected()
+    test_oversized_campaign_is_rejected()
+    test_rate_limit_spaces_messages()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for fallback fonts in multilingual reports
+"""
+
+import os
+
+import reportlab
+
+import fonts
+from config import FONT_SETTINGS
+from fonts import font_markup, needs_fallback, register_fonts, text_runs
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+
+VERA = os.path.join(os.path.dirname(reportlab.__file__), 'fonts', 'Vera.ttf')
+
+
+def reset_fonts():
+    """Forget registered fallbacks and cached lookups so settings changes take effect"""
+    fonts._fallbacks = None
+    fonts.font_for.cache_clear()
+    fonts.text_runs.cache_clear()
+
+
+def make_student(name, comment='Good'):
+    return build_student_data(
+        {'student_name': name, 'candidate_number': '0042', 'school_name': 'Hilltop Academy',
+         'session': 'June', 'year': '2025'},
+        [{'name': 'First Language Chinese', 'score': 88, 'coefficient': 1.0, 'comment': comment}])
+
+
+def test_latin_text_keeps_base_font():
+    """Text Helvetica can encode never switches font"""
+    for text in ('Joe Bloggs', 'Zoë Müller-Straße', 'A & B <ok>'):
+        assert not needs_fallback(text)
+    assert font_markup('A & B') == 'A &amp; B'
+    print("✅ Latin text stays in Helvetica")
+
+
+def test_chinese_runs_use_cid_font():
+    """Chinese names and comments are drawn with the CID fallback"""
+    assert text_runs('王小明 Wang') == (('STSong-Light', '王小明 '), (None, 'Wang'))
+    assert font_markup('王 & Co') == '<font name="STSong-Light">王 </font>&amp; Co'
+
+    pdf = REPORT_RENDERER.generate_enhanced_report_bytes(make_student('王小明', '写作很好'))
+    assert b'/BaseFont /STSong-Light' in pdf
+    print(f"✅ Chinese report rendered with STSong-Light ({len(pdf)} bytes)")
+
+
+def test_truetype_fallback_registered_once():
+    """TrueType fallbacks are parsed once per process and embedded as subsets"""
+    original = FONT_SETTINGS['fallbacks']
+    try:
+        FONT_SETTINGS['fallbacks'] = [{'name': 'VeraFallback', 'file': VERA},
+                                      {'name': 'Missing', 'file': 'no-such-font.ttf'}]
+        reset_fonts()
+        registered = register_fonts()
+        assert [name for name, _ in registered] == ['VeraFallback']
+        assert register_fonts() is registered
+
+        assert text_runs('Łukasz') == (('VeraFallback', 'Ł'), (None, 'ukasz'))
+        pdf = REPORT_RENDERER.generate_enhanced_report_bytes(make_student('Łukasz Nowak'))
+        assert b'/FontFile2' in pdf and b'+BitstreamVeraSans' in pdf
+        print("✅ TrueType fallback registered once and subset")
+    finally:
+        FONT_SETTINGS['fallbacks'] = original
+        reset_fonts()
+
+
+def test_runs_cached():
+    """Repeated names are split into runs once"""
+    text_runs('李华')
+    hits = text_runs.cache_info().hits
+    for _ in range(10):
+        text_runs('李华')
+    assert text_runs.cache_info().hits == hits + 10
+    print("✅ Text runs served from cache")
+
+
+if __name__ == "__main__":
+    test_latin_text_keeps_base_font()
+    test_chinese_runs_use_cid_font()
+    test_truetype_fallback_registered_once()
+    test_runs_cached()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test script for HTML report previews
+"""
+
+import time
+
+import html_preview
+from html_preview import render_html_preview
+from report_data import build_student_data, report_fields
+
+STUDENT = {'student_name': 'Ada <Obi>', 'candidate_number': '0042', 'school_name': 'Hilltop Academy',
+           'session': 'June', 'year': '2025'}
+SUBJECTS = [{'name': 'Mathematics', 'score': 84, 'coefficient': 1.3, 'comment': 'Excellent & consistent'},
+            {'name': 'Physics', 'score': 71, 'coefficient': 1.0, 'comment': 'Good'}]
+FORM = {'student_name': 'Ada Obi', 'candidate_number': '0042', 'center_number': 'Hilltop Academy',
+        'session': 'June', 'year': '2025', 'subject_count': '1',
+        'subject_0': '0580', 'score_0': '84', 'coefficient_0': '1.2', 'comment_0': 'Excellent'}
+
+
+def test_preview_shows_report_values():
+    """The HTML prints the same computed values as the PDF, escaped"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    fields = report_fields(student_data)
+    html = render_html_preview(student_data)
+
+    assert 'Ada &lt;Obi&gt;' in html and '<Obi>' not in html
+    assert 'Excellent &amp; consistent' in html
+    assert 'HILLTOP ACADEMY' in html
+    assert f"{fields['weighted_average']:.1f}%" in html
+    assert fields['classification'] in html and '84%' in html
+    assert f"{fields['subjects'][0]['weighted_score']:.1f}" in html
+    print("✅ HTML preview shows the report's values")
+
+
+def test_template_compiled_once():
+    """Repeat previews reuse the compiled template and take well under a millisecond"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    render_html_preview(student_data)
+    compiled = html_preview._environment.get_template('report_preview.html')
+
+    start = time.perf_counter()
+    for _ in range(200):
+        render_html_preview(student_data)
+    per_preview = (time.perf_counter() - start) / 200
+
+    assert html_preview._environment.get_template('report_preview.html') is compiled
+    assert per_preview < 0.005, per_preview
+    print(f"✅ HTML preview in {per_preview * 1000:.3f} ms")
+
+
+def test_html_preview_endpoint():
+    """Form fields and JSON records both get an HTML preview; bad input is rejected"""
+    from app import app
+
+    client = app.test_client()
+    response = client.post('/api/v1/previews/html', data=FORM)
+    body = response.get_json()
+    assert response.status_code == 200 and body['success']
+    assert '84%' in body['html'] and body['final_grade']['final_grade']
+
+    response = client.post('/api/v1/previews/html', json=dict(STUDENT, subjects=SUBJECTS))
+    assert response.status_code == 200 and 'Physics' in response.get_json()['html']
+
+    assert client.post('/api/v1/previews/html', json={'student_name': 'No subjects'}).status_code == 422
+    assert client.post('/api/v1/previews/html', data=dict(FORM, score_0='')).status_code == 400
+    assert client.post('/api/v1/previews/html', data=dict(FORM, subject_count='x')).status_code == 400
+    print("✅ HTML preview endpoint working")
+
+
+if __name__ == "__main__":
+    test_preview_shows_report_values()
+    test_template_compiled_once()
+    test_html_preview_endpoint()
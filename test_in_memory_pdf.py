@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for in-memory PDF rendering and streamed report downloads
+"""
+
+import io
+import os
+
+from pdf_generator import CambridgePDFGenerator
+
+FORM_DATA = {
+    'student_name': 'Joe Bloggs',
+    'candidate_number': '0001',
+    'center_number': 'DOBEDA INTERNATIONAL SCHOOL',
+    'session': 'June',
+    'year': '2024',
+    'subject_count': '2',
+    'subject_0': 'Mathematics',
+    'score_0': '86',
+    'coefficient_0': '1.3',
+    'comment_0': 'Good',
+    'subject_1': 'Physics',
+    'score_1': '77',
+    'coefficient_1': '1.2',
+    'comment_1': 'Good effort',
+}
+
+
+def test_render_to_buffer():
+    """generate_enhanced_report accepts a file-like target"""
+    test_data = {
+        'student_name': 'Joe',
+        'subjects': [{'name': 'Mathematics', 'coefficient': 1.3, 'score': 86.0, 'grade': 'A'}]
+    }
+    buffer = io.BytesIO()
+    result = CambridgePDFGenerator().generate_enhanced_report(test_data, buffer)
+
+    assert result is buffer
+    assert buffer.getvalue().startswith(b'%PDF')
+    print(f"✅ Rendered {len(buffer.getvalue())} bytes in memory")
+
+
+def test_generate_report_streams_pdf():
+    """The /generate_report route streams the PDF without touching reports/"""
+    from app import app, REPORTS_FOLDER
+
+    before = set(os.listdir(REPORTS_FOLDER))
+    response = app.test_client().post('/generate_report', data=FORM_DATA)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/pdf'
+    assert response.get_data().startswith(b'%PDF')
+    assert set(os.listdir(REPORTS_FOLDER)) == before
+    response.close()
+    print("✅ Report streamed without temp files")
+
+
+if __name__ == "__main__":
+    test_render_to_buffer()
+    test_generate_report_streams_pdf()
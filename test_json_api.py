@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test script for the versioned JSON / NDJSON report API
+"""
+
+import json
+import os
+import shutil
+
+from report_schema import parse_ndjson, validate_student
+
+VALID_STUDENT = {
+    'version': 1,
+    'student_name': 'Joe Bloggs',
+    'candidate_number': '0001',
+    'school_name': 'DOBEDA INTERNATIONAL SCHOOL',
+    'session': 'June',
+    'year': '2024',
+    'subjects': [
+        {'name': 'Mathematics', 'score': 86, 'coefficient': 1.3, 'comment': 'Good'},
+        {'name': 'Physics', 'score': 77}
+    ]
+}
+
+
+def test_valid_payload_has_no_errors():
+    """A well-formed payload validates cleanly"""
+    assert validate_student(VALID_STUDENT) == []
+    print("✅ Valid payload accepted")
+
+
+def test_errors_are_reported_per_field():
+    """Every invalid field gets its own structured error"""
+    payload = dict(VALID_STUDENT, student_name=None, version=2, subjects=[
+        {'name': 'Mathematics', 'score': 120},
+        {'name': 'Physics', 'score': '77', 'coefficient': 5}
+    ])
+    fields = {error['field']: error['message'] for error in validate_student(payload)}
+
+    assert fields == {
+        'version': 'must be at most 1',
+        'student_name': 'is required',
+        'subjects[0].score': 'must be at most 100',
+        'subjects[1].score': 'must be a number',
+        'subjects[1].coefficient': 'must be at most 3.0',
+    }, fields
+    print("✅ Per-field errors reported")
+
+
+def test_ndjson_errors_carry_line_numbers():
+    """NDJSON errors identify the offending line"""
+    content = '\n'.join([json.dumps(VALID_STUDENT), '{not json', json.dumps({'subjects': []})])
+    students, errors = parse_ndjson(content)
+
+    assert len(students) == 1
+    assert {(error['line'], error['field']) for error in errors} == {
+        (2, '$'), (3, 'student_name'), (3, 'subjects')
+    }
+    print("✅ NDJSON line errors reported")
+
+
+def test_invalid_utf8_rejected():
+    """NDJSON that is not UTF-8 is a validation error, not a server error"""
+    from app import app
+
+    students, errors = parse_ndjson(b'\xff\xfe')
+    assert students == [] and errors[0]['message'].startswith('invalid UTF-8')
+
+    response = app.test_client().post('/api/v1/reports', data=b'\xff\xfe{}', content_type='application/x-ndjson')
+    assert response.status_code == 422 and response.get_json()['errors'][0]['line'] == 0
+    print("✅ Invalid UTF-8 rejected")
+
+
+def test_bad_report_dates_rejected():
+    """Report dates must be real YYYY-MM-DD dates; bad ones get 422, not a server error"""
+    from app import app
+
+    assert validate_student(dict(VALID_STUDENT, report_date='2025-06-30')) == []
+    client = app.test_client()
+    for value in ('2025-99-01', 'garbage', '30/06/2025', '20250630'):
+        errors = validate_student(dict(VALID_STUDENT, report_date=value))
+        assert errors == [{'field': 'report_date', 'message': 'must be a date in YYYY-MM-DD format'}], errors
+
+        response = client.post('/api/v1/reports', json=dict(VALID_STUDENT, report_date=value))
+        assert response.status_code == 422 and response.get_json()['errors'], value
+        response = client.post('/api/v1/reports', data=json.dumps(dict(VALID_STUDENT, report_date=value)),
+                               content_type='application/x-ndjson')
+        assert response.status_code == 422 and response.get_json()['errors'][0]['line'] == 1, value
+    print("✅ Bad report dates rejected")
+
+
+def test_json_endpoint_returns_pdf():
+    """POST /api/v1/reports with JSON returns the rendered PDF"""
+    from app import app
+
+    client = app.test_client()
+    response = client.post('/api/v1/reports', json=VALID_STUDENT)
+    assert response.status_code == 200
+    assert response.get_data().startswith(b'%PDF')
+    response.close()
+
+    invalid = client.post('/api/v1/reports', json={'subjects': []})
+    assert invalid.status_code == 422
+    assert invalid.get_json()['errors']
+    print("✅ JSON endpoint working")
+
+
+def test_ndjson_endpoint_queues_batch():
+    """POST /api/v1/reports with NDJSON queues a batch job"""
+    from app import app, batch_manager
+
+    body = '\n'.join(json.dumps(dict(VALID_STUDENT, candidate_number=str(n))) for n in range(3))
+    response = app.test_client().post('/api/v1/reports', data=body,
+                                      content_type='application/x-ndjson')
+    assert response.status_code == 202
+    data = response.get_json()
+    assert data['total'] == 3
+
+    from test_batch_jobs import wait_for_job
+    assert wait_for_job(batch_manager, data['job_id'])['state'] == 'completed'
+    shutil.rmtree(os.path.join(batch_manager.jobs_dir, data['job_id']), ignore_errors=True)
+    print("✅ NDJSON endpoint queued a batch")
+
+
+if __name__ == "__main__":
+    test_valid_payload_has_no_errors()
+    test_errors_are_reported_per_field()
+    test_ndjson_errors_carry_line_numbers()
+    test_invalid_utf8_rejected()
+    test_bad_report_dates_rejected()
+    test_json_endpoint_returns_pdf()
+    test_ndjson_endpoint_queues_batch()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Test script for queued JSON logging with compressed rotation
+"""
+
+import glob
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import shutil
+import tempfile
+
+import logging_config
+from logging_config import SUBJECT_LOGGER, configure_logging, stop_logging
+
+
+def read_lines(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_json_lines_written_by_listener():
+    """Records are written as JSON lines, with extra fields, from the listener thread"""
+    log_dir = tempfile.mkdtemp()
+    path = os.path.join(log_dir, 'app.log')
+    try:
+        listener = configure_logging({'file': path, 'console': False, 'rotate': None})
+        assert listener is not None
+        logging.getLogger('cambridge.test').info("Report rendered", extra={'student': 'Joe Bloggs'})
+        stop_logging()
+
+        entries = read_lines(path)
+        assert entries[-1]['message'] == "Report rendered"
+        assert entries[-1]['student'] == 'Joe Bloggs'
+        assert entries[-1]['level'] == 'INFO'
+        print("✅ JSON log line written asynchronously")
+    finally:
+        stop_logging()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def test_rotated_files_are_gzipped():
+    """Size rotation compresses old files and keeps backup_count of them"""
+    log_dir = tempfile.mkdtemp()
+    path = os.path.join(log_dir, 'app.log')
+    try:
+        configure_logging({'file': path, 'console': False, 'rotate': 'size',
+                           'max_bytes': 2000, 'backup_count': 3})
+        log = logging.getLogger('cambridge.test')
+        for n in range(200):
+            log.info(f"Line {n} " + 'x' * 50)
+        stop_logging()
+
+        backups = sorted(glob.glob(path + '.*'))
+        assert backups == [f'{path}.{n}.gz' for n in (1, 2, 3)], backups
+        with gzip.open(backups[0], 'rt', encoding='utf-8') as f:
+            assert json.loads(f.readline())['logger'] == 'cambridge.test'
+        print(f"✅ Rotated into {len(backups)} gzip backups")
+    finally:
+        stop_logging()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def test_subject_lines_are_sampled():
+    """Per-subject debug lines are dropped at rate 0 and kept at rate 1"""
+    log_dir = tempfile.mkdtemp()
+    path = os.path.join(log_dir, 'app.log')
+    try:
+        subject_logger = logging.getLogger(SUBJECT_LOGGER)
+
+        configure_logging({'file': path, 'console': False, 'rotate': None, 'subject_sample_rate': 0})
+        assert not subject_logger.isEnabledFor(logging.DEBUG)
+
+        configure_logging({'file': path, 'console': False, 'rotate': None, 'subject_sample_rate': 1})
+        for n in range(5):
+            subject_logger.debug(f"Added subject {n}")
+        stop_logging()
+
+        subject_lines = [e for e in read_lines(path) if e['logger'] == SUBJECT_LOGGER]
+        assert len(subject_lines) == 5
+        print("✅ Subject lines sampled")
+    finally:
+        stop_logging()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def test_forked_workers_never_rotate():
+    """A forked worker gets its own listener writing through a watched, non-rotating file"""
+    log_dir = tempfile.mkdtemp()
+    path = os.path.join(log_dir, 'app.log')
+    try:
+        parent_listener = configure_logging({'file': path, 'console': False, 'rotate': 'size',
+                                             'max_bytes': 2000, 'backup_count': 3})
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                listener = logging_config._listener
+                handler = listener.handlers[0]
+                ok = (listener is not parent_listener and
+                      not isinstance(handler, logging.handlers.BaseRotatingHandler) and
+                      isinstance(handler, logging.handlers.WatchedFileHandler))
+                for n in range(100):
+                    logging.getLogger('cambridge.worker').info(f"Worker line {n} " + 'x' * 50)
+                stop_logging()
+            finally:
+                os._exit(0 if ok else 1)
+        _, exit_status = os.waitpid(pid, 0)
+        assert exit_status == 0
+        stop_logging()
+
+        # Far past max_bytes, but only the parent may rotate
+        assert glob.glob(path + '.*') == []
+        workers = [e for e in read_lines(path) if e['logger'] == 'cambridge.worker']
+        assert len(workers) == 100
+        print("✅ Forked worker wrote without rotating")
+    finally:
+        stop_logging()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+def test_external_rotation_reopens_file():
+    """With rotate "external" a file moved away by logrotate is reopened"""
+    log_dir = tempfile.mkdtemp()
+    path = os.path.join(log_dir, 'app.log')
+    try:
+        configure_logging({'file': path, 'console': False, 'rotate': 'external', 'async': False})
+        log = logging.getLogger('cambridge.test')
+        log.info("Before rotation")
+        os.rename(path, path + '.1')
+        log.info("After rotation")
+        stop_logging()
+
+        assert [e['message'] for e in read_lines(path + '.1')] == ["Before rotation"]
+        assert [e['message'] for e in read_lines(path)] == ["After rotation"]
+        print("✅ Externally rotated file reopened")
+    finally:
+        stop_logging()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_json_lines_written_by_listener()
+    test_rotated_files_are_gzipped()
+    test_subject_lines_are_sampled()
+    test_forked_workers_never_rotate()
+    test_external_rotation_reopens_file()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent mail outbox and pooled SMTP sender
+"""
+
+import os
+import smtplib
+import socket
+import tempfile
+
+from mail_outbox import MailSender, Outbox, build_message
+
+SETTINGS = {
+    'smtp_host': 'localhost',
+    'smtp_port': 2525,
+    'username': 'reports',
+    'password': 'secret',
+    'use_tls': False,
+    'use_ssl': False,
+    'sender': 'reports@dobeda.school',
+    'retry_base_delay': 0,
+}
+
+
+class FakeSMTP:
+    """Local SMTP stand-in that records connections and messages"""
+
+    connections = []
+
+    def __init__(self, host, port, timeout=None):
+        self.messages = []
+        self.logins = []
+        self.fail_next = []
+        FakeSMTP.connections.append(self)
+
+    def login(self, username, password):
+        self.logins.append(username)
+
+    def send_message(self, message):
+        if self.fail_next:
+            raise self.fail_next.pop(0)
+        self.messages.append(message)
+
+    def quit(self):
+        pass
+
+
+def make_outbox():
+    db_path = os.path.join(tempfile.mkdtemp(), 'outbox.db')
+    return Outbox(db_path, settings=SETTINGS)
+
+
+def test_message_has_pdf_attachment():
+    """Rendered PDF bytes are attached in memory"""
+    message = build_message('a@example.com', 'b@example.com', 'Report', 'Body',
+                            'report.pdf', b'%PDF-1.4 test')
+    attachments = list(message.iter_attachments())
+    assert len(attachments) == 1
+    assert attachments[0].get_content_type() == 'application/pdf'
+    assert attachments[0].get_content() == b'%PDF-1.4 test'
+    print("✅ PDF attached to message")
+
+
+def test_one_connection_for_many_messages():
+    """The sender logs in once and reuses the connection for every message"""
+    FakeSMTP.connections = []
+    outbox = make_outbox()
+    ids = [outbox.enqueue(f'parent{n}@example.com', 'Report', 'Body', 'r.pdf', b'%PDF')
+           for n in range(5)]
+
+    sender = MailSender(outbox, smtp_factory=FakeSMTP, settings=SETTINGS)
+    assert sender.send_due()
+
+    assert len(FakeSMTP.connections) == 1
+    assert FakeSMTP.connections[0].logins == ['reports']
+    assert len(FakeSMTP.connections[0].messages) == 5
+    assert all(outbox.get(message_id)['status'] == 'sent' for message_id in ids)
+    print("✅ 5 messages sent over one SMTP connection")
+
+
+def test_transient_failure_is_retried():
+    """A temporary SMTP error leaves the message pending for another attempt"""
+    FakeSMTP.connections = []
+    outbox = make_outbox()
+    message_id = outbox.enqueue('parent@example.com', 'Report', 'Body')
+
+    sender = MailSender(outbox, smtp_factory=FakeSMTP, settings=SETTINGS)
+    sender._connection().fail_next.append(smtplib.SMTPDataError(451, b'try again'))
+    sender.send_due()
+
+    message = outbox.get(message_id)
+    assert message['status'] == 'pending' and message['attempts'] == 1
+
+    sender.send_due()
+    assert outbox.get(message_id)['status'] == 'sent'
+    print("✅ Transient failure retried")
+
+
+def test_rejected_recipient_fails_permanently():
+    """A refused recipient is not retried"""
+    FakeSMTP.connections = []
+    outbox = make_outbox()
+    message_id = outbox.enqueue('nobody@example.com', 'Report', 'Body')
+
+    sender = MailSender(outbox, smtp_factory=FakeSMTP, settings=SETTINGS)
+    sender._connection().fail_next.append(
+        smtplib.SMTPRecipientsRefused({'nobody@example.com': (550, b'no such user')}))
+    sender.send_due()
+
+    assert outbox.get(message_id)['status'] == 'failed'
+    assert not outbox.claim_due(10)
+    print("✅ Refused recipient failed permanently")
+
+
+def test_malformed_message_fails_permanently():
+    """A header with a line break fails its message instead of stalling the batch"""
+    FakeSMTP.connections = []
+    outbox = make_outbox()
+    broken = outbox.enqueue('parent@example.com\r\nBcc: other@example.com', 'Report', 'Body')
+    good = outbox.enqueue('parent@example.com', 'Report', 'Body')
+
+    MailSender(outbox, smtp_factory=FakeSMTP, settings=SETTINGS).send_due()
+    assert outbox.get(broken)['status'] == 'failed'
+    assert outbox.get(good)['status'] == 'sent'
+    assert not outbox.claim_due(10)
+    print("✅ Malformed message failed permanently")
+
+
+def test_send_email_rejects_bad_recipient():
+    """The report form cannot queue mail for an address with a line break"""
+    from app import app
+
+    form = {'recipient_email': 'parent@example.com\nBcc: other@example.com', 'student_name': 'Ada Obi',
+            'subject_count': '1', 'subject_0': 'Mathematics', 'score_0': '84'}
+    response = app.test_client().post('/send_email', data=form)
+    assert response.status_code == 400 and not response.get_json()['success']
+    print("✅ Bad recipient rejected")
+
+
+def test_delivery_against_local_smtpd():
+    """End-to-end delivery to a local aiosmtpd server, when available"""
+    try:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.handlers import Sink
+    except ImportError:
+        print("⚠️ aiosmtpd not installed - skipping live SMTP test")
+        return
+
+    received = []
+
+    class Handler(Sink):
+        async def handle_DATA(self, server, session, envelope):
+            received.append(envelope)
+            return '250 OK'
+
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+
+    controller = Controller(Handler(), hostname='127.0.0.1', port=port)
+    controller.start()
+    try:
+        outbox = make_outbox()
+        outbox.enqueue('parent@example.com', 'Report', 'Body', 'r.pdf', b'%PDF')
+        settings = dict(SETTINGS, smtp_host='127.0.0.1', smtp_port=port, username='')
+        MailSender(outbox, settings=settings).send_due()
+        assert len(received) == 1
+        print("✅ Delivered to local SMTP server")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    test_message_has_pdf_attachment()
+    test_one_connection_for_many_messages()
+    test_transient_failure_is_retried()
+    test_rejected_recipient_fails_permanently()
+    test_malformed_message_fails_permanently()
+    test_send_email_rejects_bad_recipient()
+    test_delivery_against_local_smtpd()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test script for the /metrics endpoint and report stage histograms
+"""
+
+from metrics import Counter, Gauge, Histogram, Registry
+from test_in_memory_pdf import FORM_DATA
+
+
+def test_exposition_format():
+    """Counters, gauges and histograms render in the Prometheus text format"""
+    registry = Registry()
+    requests = registry.register(Counter('requests_total', 'Requests', ('status',)))
+    registry.register(Gauge('queue_depth', 'Queue depth', ('state',), callback=lambda: {('pending',): 3}))
+    latency = registry.register(Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)))
+
+    requests.inc(status=200)
+    requests.inc(status=200)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{status="200"} 2' in text
+    assert 'queue_depth{state="pending"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_count 3' in text
+    print("✅ Exposition format rendered")
+
+
+def test_metrics_endpoint_reports_stages():
+    """A generated report shows up in the stage histograms and request counters"""
+    from app import app
+
+    client = app.test_client()
+    response = client.post('/generate_report', data=FORM_DATA)
+    assert response.status_code == 200
+    response.get_data()
+    response.close()
+
+    metrics = client.get('/metrics')
+    assert metrics.status_code == 200
+    assert metrics.mimetype == 'text/plain'
+    text = metrics.get_data(as_text=True)
+    for stage in ('parse', 'calculate', 'send'):
+        assert f'cambridge_report_stage_seconds_count{{stage="{stage}"}}' in text, stage
+    assert 'cambridge_http_requests_total{method="POST",endpoint="generate_report",status="200"}' in text
+    assert 'cambridge_batch_pending_reports 0' in text
+    print("✅ /metrics reports per-stage latency")
+
+
+if __name__ == "__main__":
+    test_exposition_format()
+    test_metrics_endpoint_reports_stages()
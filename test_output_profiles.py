@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Test script for the email / print / archive PDF output profiles
+"""
+
+import threading
+
+from PIL import Image
+from reportlab import rl_config
+
+from output_profiles import PROFILES, OutputProfile, UnknownProfile, get_profile
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+
+STUDENT = {'student_name': 'Amina Yusuf', 'candidate_number': '0321', 'school_name': 'Dobeda International'}
+SUBJECTS = [
+    {'name': 'Mathematics', 'score': 82, 'coefficient': 1.3, 'comment': 'Excellent'},
+    {'name': 'Biology', 'score': 67, 'coefficient': 1.2, 'comment': 'Good effort'},
+]
+
+
+def test_email_profile_strips_metadata():
+    """Email PDFs drop document info and come out smaller than print PDFs"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    email = REPORT_RENDERER.generate_enhanced_report_bytes(student_data, 'email')
+    printed = REPORT_RENDERER.generate_enhanced_report_bytes(student_data, 'print')
+
+    assert b'/Title ()' in email and b'Amina Yusuf' not in email
+    assert b'/Title (Statement of Results - Amina Yusuf)' in printed
+    assert b'ASCII85Decode' not in email
+    assert len(email) < len(printed)
+    print(f"✅ Email profile {len(email)} bytes, print profile {len(printed)} bytes")
+
+
+def test_ascii85_chosen_per_profile():
+    """ASCII85 is a per-profile option that leaves ReportLab's own default alone"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    default = rl_config.useA85
+    PROFILES['mail7bit'] = OutputProfile('mail7bit', {'ascii85': True, 'metadata': False})
+    try:
+        results = {}
+
+        def render(profile):
+            results[profile] = REPORT_RENDERER.generate_enhanced_report_bytes(student_data, profile)
+
+        threads = [threading.Thread(target=render, args=(name,)) for name in ('mail7bit', 'email') * 3]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert b'ASCII85Decode' in results['mail7bit']
+        assert b'ASCII85Decode' not in results['email']
+        assert rl_config.useA85 == default
+    finally:
+        del PROFILES['mail7bit']
+    print("✅ ASCII85 chosen per profile")
+
+
+def test_unknown_profile_rejected():
+    """Misspelled profile names fail loudly"""
+    try:
+        get_profile('fax')
+    except UnknownProfile:
+        pass
+    else:
+        raise AssertionError("Unknown profile accepted")
+    assert get_profile().name == 'print'
+    print("✅ Unknown profile rejected")
+
+
+def test_images_downsampled_to_printed_size():
+    """Photos are scaled to the profile's resolution at their printed size"""
+    photo = Image.new('RGB', (2400, 3000), (180, 120, 90))
+    crest = Image.new('RGBA', (1600, 1600), (0, 0, 120, 128))
+
+    # 1 x 1.25 inch at 110 dpi
+    assert get_profile('email').fit_image(photo, 72, 90).getSize() == (110, 138)
+    assert get_profile('print').fit_image(photo, 72, 90).getSize() == (300, 375)
+    # Transparent crests stay lossless; small images are never upscaled
+    assert get_profile('archive').fit_image(crest, 36, 36).getSize() == (75, 75)
+    assert get_profile('print').fit_image(Image.new('RGB', (40, 40)), 72, 72).getSize() == (40, 40)
+    print("✅ Images downsampled per profile")
+
+
+def test_route_reports_size():
+    """The JSON API takes a profile and reports the resulting size"""
+    from app import app
+
+    payload = dict(STUDENT, version=1, subjects=SUBJECTS)
+    client = app.test_client()
+    response = client.post('/api/v1/reports?profile=email', json=payload)
+    assert response.status_code == 200
+    assert response.headers['X-Report-Profile'] == 'email'
+    assert int(response.headers['X-Report-Size']) == len(response.get_data())
+    response.close()
+
+    assert client.post('/api/v1/reports?profile=fax', json=payload).status_code == 400
+    print("✅ Route reports PDF size")
+
+
+if __name__ == "__main__":
+    test_email_profile_strips_metadata()
+    test_ascii85_chosen_per_profile()
+    test_unknown_profile_rejected()
+    test_images_downsampled_to_printed_size()
+    test_route_reports_size()
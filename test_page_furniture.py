@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test script for page furniture drawn as a form XObject
+"""
+
+from config import PDF_STYLE
+from page_furniture import get_furniture
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+
+SUBJECTS = [
+    {'name': 'Mathematics', 'score': 88, 'coefficient': 1.3, 'comment': 'Excellent'},
+    {'name': 'Chemistry', 'score': 69, 'coefficient': 1.2, 'comment': 'Steady progress'},
+]
+
+
+def make_student(name, school):
+    return build_student_data({'student_name': name, 'candidate_number': '0100', 'school_name': school}, SUBJECTS)
+
+
+def test_furniture_is_laid_out_once_per_school():
+    """Reports from the same school reuse one laid-out furniture object"""
+    first = REPORT_RENDERER._page_furniture(make_student('Ann Lee', 'Hilltop Academy'))
+    second = REPORT_RENDERER._page_furniture(make_student('Joe Bloggs', 'Hilltop Academy'))
+    other = REPORT_RENDERER._page_furniture(make_student('Sam Roe', 'Valley School'))
+
+    assert first is second
+    assert other is not first and other.form_name != first.form_name
+    assert first.header_height > 0 and first.footer_height > 0
+    print("✅ Furniture cached per school")
+
+
+def test_report_stamps_form_xobject():
+    """The rendered PDF draws the furniture through a form XObject"""
+    original = PDF_STYLE.get('page_furniture')
+    fast_renderer = PDF_STYLE.get('fast_renderer')
+    try:
+        PDF_STYLE['page_furniture'] = True
+        PDF_STYLE['fast_renderer'] = False
+        student = make_student('Ann Lee', 'Hilltop Academy')
+        pdf = REPORT_RENDERER.generate_enhanced_report_bytes(student)
+        form_name = get_furniture('Hilltop Academy', None).form_name
+        assert form_name.encode() in pdf
+        assert b'/Subtype /Form' in pdf
+
+        PDF_STYLE['page_furniture'] = False
+        pdf = REPORT_RENDERER.generate_enhanced_report_bytes(student)
+        assert b'/Subtype /Form' not in pdf
+        print("✅ Furniture stamped as a form XObject")
+    finally:
+        PDF_STYLE['page_furniture'] = original
+        PDF_STYLE['fast_renderer'] = fast_renderer
+
+
+if __name__ == "__main__":
+    test_furniture_is_laid_out_once_per_school()
+    test_report_stamps_form_xobject()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for class booklet PDFs
+"""
+
+import io
+import re
+import shutil
+import tempfile
+
+from reportlab.pdfgen import canvas
+
+from batch_jobs import BatchJobManager, FORMAT_BOOKLET, RosterError, parse_roster
+from pdf_booklet import MergeError, _SourcePDF, build_booklet
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+from test_batch_jobs import CSV_ROSTER, wait_for_job
+
+SUBJECTS = [
+    {'name': 'Mathematics', 'score': 84, 'coefficient': 1.3, 'comment': 'Excellent'},
+    {'name': 'Physics', 'score': 71, 'coefficient': 1.2, 'comment': 'Good effort'},
+]
+
+
+def render_reports(count, subjects=SUBJECTS):
+    """Render one report per student for the same school"""
+    return [
+        REPORT_RENDERER.generate_enhanced_report_bytes(build_student_data(
+            {'student_name': f'Student {index}', 'candidate_number': f'{index:04d}',
+             'school_name': 'Hilltop Academy', 'session': 'June', 'year': '2025'},
+            subjects))
+        for index in range(count)
+    ]
+
+
+def test_booklet_merges_pages_and_shares_fonts():
+    """Every page is kept, in order, while fonts are written once"""
+    reports = render_reports(4)
+    output = io.BytesIO()
+    merged = build_booklet(reports, output, title='Hilltop Academy')
+    booklet = output.getvalue()
+
+    expected = sum(len(_SourcePDF(report).pages) for report in reports)
+    assert merged['pages'] == expected == len(_SourcePDF(booklet).pages)
+    assert merged['reports'] == 4 and merged['shared_objects'] > 0
+    assert booklet.count(b'/BaseFont') == reports[0].count(b'/BaseFont')
+    assert len(booklet) < sum(len(report) for report in reports)
+    print(f"✅ Booklet merged {merged['pages']} pages, {len(booklet)} bytes")
+
+
+def test_duplex_padding():
+    """Duplex booklets start every report on an odd page"""
+    reports = render_reports(3)
+    output = io.BytesIO()
+    merged = build_booklet(reports, output, duplex=True)
+
+    counts = [len(_SourcePDF(report).pages) for report in reports]
+    assert merged['blank_pages'] == sum(count % 2 for count in counts)
+    assert merged['pages'] % 2 == 0
+    assert len(_SourcePDF(output.getvalue()).pages) == merged['pages']
+    print(f"✅ Duplex booklet padded with {merged['blank_pages']} blank pages")
+
+
+def annotations(pdf, page):
+    """Object numbers in a page's /Annots array"""
+    return [int(n) for n in re.search(rb'/Annots \[([^\]]*)\]', pdf.objects[page][0]).group(1).split()[::3]]
+
+
+def linked_pdf():
+    """Two pages: a URI link whose string looks like a reference, and a link to page two
+    that points back at its page (/P) and shares a cycle with the URI link"""
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pageCompression=0)
+    c.drawString(100, 700, 'Page one')
+    c.linkURL('https://example.org/ref/12 0 R (see)', (100, 690, 200, 710))
+    c.linkAbsolute('to two', 'two', (100, 600, 200, 620))
+    c.showPage()
+    c.bookmarkPage('two')
+    c.drawString(100, 700, 'Page two')
+    c.showPage()
+    c.save()
+    pdf = _SourcePDF(buffer.getvalue())
+    uri_link, page_link = annotations(pdf, pdf.pages[0])
+
+    # Same-length edits keep the xref offsets valid
+    data = buffer.getvalue()
+    data = data.replace(b'/Border [ 0 0 0 ] /Contents (to two)',
+                        b'/IRT %d 0 R /P %d 0 R /Contents (two) ' % (uri_link, pdf.pages[0]), 1)
+    data = data.replace(b'/Border [ 0 0 0 ]', b'/Popup %d 0 R     ' % page_link, 1)
+    assert len(data) == len(buffer.getvalue())
+    return data
+
+
+def test_links_and_cycles_merged():
+    """Link annotations survive: strings are left alone and back-references resolved"""
+    output = io.BytesIO()
+    merged = build_booklet([linked_pdf(), linked_pdf()], output)
+    booklet = _SourcePDF(output.getvalue())
+    assert merged['pages'] == len(booklet.pages) == 4
+
+    for first, second in (booklet.pages[0:2], booklet.pages[2:4]):
+        uri_link, page_link = annotations(booklet, first)
+        uri_body, link_body = booklet.objects[uri_link][0], booklet.objects[page_link][0]
+        assert b'(https://example.org/ref/12 0 R \\(see\\))' in uri_body
+        assert b'/Popup %d 0 R' % page_link in uri_body
+        assert b'/IRT %d 0 R' % uri_link in link_body
+        assert b'/P %d 0 R' % first in link_body
+        assert b'/Dest [ %d 0 R' % second in link_body
+    print("✅ Link annotations merged")
+
+
+def test_invalid_pdf_rejected():
+    """Input that is not a PDF raises MergeError"""
+    try:
+        build_booklet([b'not a pdf'], io.BytesIO())
+    except MergeError:
+        print("✅ Invalid PDF rejected")
+        return
+    raise AssertionError('Invalid PDF accepted')
+
+
+def test_batch_job_builds_booklet():
+    """A booklet batch merges the roster's reports into one PDF"""
+    jobs_dir = tempfile.mkdtemp()
+    manager = BatchJobManager(jobs_dir, max_workers=2, use_processes=False)
+    try:
+        try:
+            manager.submit(parse_roster(CSV_ROSTER, 'text/csv'), 'tarball')
+            raise AssertionError('Unknown batch format accepted')
+        except RosterError:
+            pass
+
+        job_id = manager.submit(parse_roster(CSV_ROSTER, 'text/csv'), FORMAT_BOOKLET, duplex=True)
+        status = wait_for_job(manager, job_id)
+        assert status['state'] == 'completed', status
+        assert status['format'] == FORMAT_BOOKLET and status['pages'] % 2 == 0
+
+        path = manager.archive_path(job_id)
+        assert path.endswith('booklet.pdf')
+        with open(path, 'rb') as f:
+            assert len(_SourcePDF(f.read()).pages) == status['pages']
+        print(f"✅ Batch booklet built with {status['pages']} pages")
+    finally:
+        manager.shutdown()
+        shutil.rmtree(jobs_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_booklet_merges_pages_and_shares_fonts()
+    test_duplex_padding()
+    test_links_and_cycles_merged()
+    test_invalid_pdf_rejected()
+    test_batch_job_builds_booklet()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-addressed report PDF cache
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+
+from pdf_cache import ReportCache, cache_key
+
+STUDENT = {
+    'name': 'Joe Bloggs',
+    'subjects': [{'name': 'Mathematics', 'score': 86, 'coefficient': 1.3}]
+}
+
+
+def test_key_is_normalized():
+    """Equivalent student data hashes to the same key"""
+    same = {
+        'subjects': [{'coefficient': 1.3, 'score': 86.0, 'name': 'Mathematics '}],
+        'name': ' Joe Bloggs'
+    }
+    assert cache_key(STUDENT) == cache_key(same)
+    assert cache_key(STUDENT) != cache_key(STUDENT, variant='email')
+    print("✅ Cache keys normalized")
+
+
+def test_key_independent_of_signing_key():
+    """The verification signing key never feeds a (published) cache key"""
+    from config import VERIFY_SETTINGS
+
+    original = dict(VERIFY_SETTINGS)
+    try:
+        VERIFY_SETTINGS['signing_key'] = 'first secret'
+        first = cache_key(STUDENT)
+        VERIFY_SETTINGS['signing_key'] = 'second secret'
+        assert cache_key(STUDENT) == first
+        VERIFY_SETTINGS['base_url'] = 'https://results.example.org'
+        assert cache_key(STUDENT) != first
+    finally:
+        VERIFY_SETTINGS.update(original)
+    print("✅ Cache key independent of the signing key")
+
+
+def test_lru_respects_byte_cap():
+    """The oldest entries are evicted once the byte cap is exceeded"""
+    cache = ReportCache(max_bytes=10, disk_folder='')
+    cache.put('a', b'12345')
+    cache.put('b', b'12345')
+    cache.get('a')  # 'a' becomes most recently used
+    cache.put('c', b'12345')
+
+    assert cache.get('a') == b'12345'
+    assert cache.get('b') is None
+    assert cache.stats()['bytes'] == 10
+    print("✅ LRU byte cap enforced")
+
+
+def test_concurrent_requests_share_one_render():
+    """Identical requests arriving together render only once"""
+    cache = ReportCache(max_bytes=1024, disk_folder='')
+    calls = []
+
+    def render(student_data):
+        calls.append(student_data['name'])
+        time.sleep(0.2)
+        return b'%PDF-fake'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_render(STUDENT, render)))
+               for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ['Joe Bloggs']
+    assert results == [b'%PDF-fake'] * 5
+    assert cache.stats()['coalesced'] == 4
+    print("✅ Concurrent renders coalesced")
+
+
+def test_disk_tier_survives_memory_clear():
+    """Entries written to the disk tier are found after the LRU is cleared"""
+    disk_folder = tempfile.mkdtemp()
+    try:
+        cache = ReportCache(max_bytes=1024, disk_folder=disk_folder)
+        cache.get_or_render(STUDENT, lambda data: b'%PDF-disk')
+        cache.clear()
+
+        assert cache.get_or_render(STUDENT, lambda data: b'%PDF-new') == b'%PDF-disk'
+        print("✅ Disk tier hit after memory clear")
+    finally:
+        shutil.rmtree(disk_folder, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_key_is_normalized()
+    test_key_independent_of_signing_key()
+    test_lru_respects_byte_cap()
+    test_concurrent_requests_share_one_render()
+    test_disk_tier_survives_memory_clear()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared style registry and thread-safe renderer
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from pdf_generator import REPORT_RENDERER, CambridgePDFGenerator
+from pdf_styles import STYLES, TABLE_STYLES
+from report_data import build_student_data
+
+STUDENT = {'student_name': 'Thread Safe', 'candidate_number': '0042', 'school_name': 'Dobeda'}
+SUBJECTS = [
+    {'name': 'Mathematics', 'score': 91, 'coefficient': 1.3, 'comment': 'Excellent'},
+    {'name': 'Physics', 'score': 74, 'coefficient': 1.2, 'comment': 'Good effort'},
+]
+
+
+def test_styles_are_read_only():
+    """Shared styles cannot be modified in place"""
+    heading_size = STYLES['Heading1'].fontSize
+    try:
+        STYLES['Heading1'].fontSize = 14
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("Shared style was modified")
+    assert STYLES['Heading1'].fontSize == heading_size
+    assert STYLES['SummaryHeader'].fontSize == 14
+    assert 'grades' in TABLE_STYLES
+    print("✅ Shared styles are read-only")
+
+
+def test_generators_share_the_registry():
+    """Creating a generator allocates no styles"""
+    assert CambridgePDFGenerator().styles is STYLES
+    assert CambridgePDFGenerator().table_styles is TABLE_STYLES
+    print("✅ Generators share one style registry")
+
+
+def test_shared_renderer_across_threads():
+    """One renderer instance serves concurrent renders"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: REPORT_RENDERER.generate_enhanced_report_bytes(student_data), range(16)))
+
+    assert all(pdf.startswith(b'%PDF') for pdf in results)
+    sizes = {len(pdf) for pdf in results}
+    assert max(sizes) - min(sizes) < 64, sizes
+    print(f"✅ {len(results)} concurrent renders on a shared renderer")
+
+
+if __name__ == "__main__":
+    test_styles_are_read_only()
+    test_generators_share_the_registry()
+    test_shared_renderer_across_threads()
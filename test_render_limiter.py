@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for render admission control
+"""
+
+import threading
+import time
+
+from render_limiter import RenderLimiter, RenderOverloaded
+from test_in_memory_pdf import FORM_DATA
+
+
+def test_waiting_request_gets_free_slot():
+    """A request within the wait queue gets the slot once it is released"""
+    limiter = RenderLimiter({'max_concurrent': 1, 'max_waiting': 1, 'wait_timeout': 2})
+    results = []
+
+    def render():
+        with limiter.slot():
+            results.append('rendered')
+
+    with limiter.slot():
+        waiter = threading.Thread(target=render)
+        waiter.start()
+        time.sleep(0.1)
+        assert limiter.waiting == 1
+    waiter.join()
+
+    assert results == ['rendered']
+    assert limiter.active == 0 and limiter.waiting == 0
+    print("✅ Waiting request rendered after slot freed")
+
+
+def test_overflow_is_rejected_fast():
+    """Requests beyond the wait queue are refused without waiting"""
+    limiter = RenderLimiter({'max_concurrent': 1, 'max_waiting': 0, 'wait_timeout': 5, 'retry_after': 7})
+    with limiter.slot():
+        started = time.perf_counter()
+        try:
+            with limiter.slot():
+                raise AssertionError("Second render should have been refused")
+        except RenderOverloaded as e:
+            assert e.reason == 'queue_full' and e.retry_after == 7
+        assert time.perf_counter() - started < 0.5
+    print("✅ Overflow refused immediately")
+
+
+def test_wait_timeout_rejects():
+    """A waiting request gives up after wait_timeout"""
+    limiter = RenderLimiter({'max_concurrent': 1, 'max_waiting': 1, 'wait_timeout': 0.1})
+    with limiter.slot():
+        try:
+            with limiter.slot():
+                raise AssertionError("Render should have timed out")
+        except RenderOverloaded as e:
+            assert e.reason == 'timeout'
+    assert limiter.waiting == 0
+    print("✅ Wait timed out")
+
+
+def test_limits_shared_between_workers():
+    """Each preforked worker gets its share of the limits, at least one slot"""
+    limiter = RenderLimiter({'max_concurrent': 8, 'max_waiting': 4}, share=3)
+    assert limiter.max_concurrent == 3 and limiter.max_waiting == 2
+    limiter = RenderLimiter({'max_concurrent': 2, 'max_waiting': 0}, share=5)
+    assert limiter.max_concurrent == 1 and limiter.max_waiting == 0
+    print("✅ Limits shared between workers")
+
+
+def test_route_returns_503_with_retry_after():
+    """Report routes answer 503 with Retry-After when no slot is free"""
+    import app
+
+    original = app.render_limiter
+    app.render_limiter = RenderLimiter({'max_concurrent': 1, 'max_waiting': 0, 'retry_after': 3})
+    try:
+        with app.render_limiter.slot():
+            form = dict(FORM_DATA, student_name='Busy Server Student')
+            response = app.app.test_client().post('/generate_report', data=form)
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '3'
+        assert response.get_json()['retry_after'] == 3
+        print("✅ 503 with Retry-After")
+    finally:
+        app.render_limiter = original
+
+
+if __name__ == "__main__":
+    test_waiting_request_gets_free_slot()
+    test_overflow_is_rejected_fast()
+    test_wait_timeout_rejects()
+    test_limits_shared_between_workers()
+    test_route_returns_503_with_retry_after()
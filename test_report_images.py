@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for school crests and student photos
+"""
+
+import io
+import os
+import re
+import shutil
+import tempfile
+
+from PIL import Image
+
+from config import IMAGE_SETTINGS, PDF_STYLE
+from output_profiles import get_profile
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+from report_images import import_photo_directory, school_logo, student_photo
+from test_canvas_renderer import render_both, text_positions
+
+SCHOOL = 'Crest Test Academy'
+STUDENT = {'student_name': 'Ada Obi', 'candidate_number': '0042', 'school_name': SCHOOL,
+           'session': 'June', 'year': '2025'}
+SUBJECTS = [{'name': 'Mathematics', 'score': 84, 'coefficient': 1.3, 'comment': 'Excellent'}]
+
+
+def image_sizes(pdf):
+    """(width, height) of every colour image XObject in a PDF, leaving out soft masks"""
+    return [(int(width), int(height)) for height, width in
+            re.findall(rb'/ColorSpace /DeviceRGB[^>]*?/Height (\d+)[^>]*?/Subtype /Image[^>]*?/Width (\d+)', pdf)]
+
+
+def camera_photo(size=(2400, 3200)):
+    """A large noisy JPEG, as a phone camera would produce"""
+    buffer = io.BytesIO()
+    Image.effect_noise(size, 60).convert('RGB').save(buffer, format='JPEG', quality=95)
+    return buffer.getvalue()
+
+
+class crest:
+    """Configure a large transparent crest for SCHOOL while the block runs"""
+
+    def __enter__(self):
+        self.folder = tempfile.mkdtemp()
+        path = os.path.join(self.folder, 'crest.png')
+        Image.new('RGBA', (1200, 800), (20, 60, 140, 255)).save(path)
+        IMAGE_SETTINGS['logos'][SCHOOL] = path
+        return path
+
+    def __exit__(self, *exc):
+        del IMAGE_SETTINGS['logos'][SCHOOL]
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+def test_logo_decoded_once_per_profile():
+    """The crest is fitted once per school and profile, at the profile's resolution"""
+    with crest():
+        print_logo = school_logo(SCHOOL, get_profile('print'))
+        assert school_logo(SCHOOL, get_profile('print')) is print_logo
+        email_logo = school_logo(SCHOOL, get_profile('email'))
+        assert email_logo is not print_logo
+        assert email_logo.getSize()[0] < print_logo.getSize()[0] <= 54 * 300 / 72
+
+        pdf = REPORT_RENDERER.generate_enhanced_report_bytes(build_student_data(STUDENT, SUBJECTS))
+        assert image_sizes(pdf) == [print_logo.getSize()]
+    print(f"✅ Crest fitted once: {print_logo.getSize()} print, {email_logo.getSize()} email")
+
+
+def test_logo_layout_matches_on_both_paths():
+    """The fast canvas path places the header under the crest where Platypus does"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    original = PDF_STYLE.get('page_furniture')
+    with crest():
+        try:
+            for furniture in (False, True):
+                PDF_STYLE['page_furniture'] = furniture
+                platypus, fast = render_both(student_data)
+                assert text_positions(fast) == text_positions(platypus)
+                assert len(image_sizes(fast)) == 1
+        finally:
+            PDF_STYLE['page_furniture'] = original
+    print("✅ Crest layout matches on both render paths")
+
+
+def test_photo_downscaled_and_cached_by_content():
+    """A camera photo is embedded at printed size, once per distinct picture"""
+    photo = camera_photo()
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    student_data['photo'] = photo
+
+    reader = student_photo(student_data, get_profile('email'))
+    assert student_photo(dict(student_data, photo=bytes(photo)), get_profile('email')) is reader
+
+    pdf = REPORT_RENDERER.generate_enhanced_report_bytes(student_data, profile='email')
+    width, height = image_sizes(pdf)[0]
+    assert width <= 60 * 110 / 72 + 1 and height <= 75 * 110 / 72 + 1
+    assert len(pdf) < len(photo) / 10
+    print(f"✅ {len(photo)} byte photo embedded at {width}x{height} in a {len(pdf)} byte report")
+
+
+def test_photo_directory_import():
+    """Bulk import writes thumbnails that reports pick up by candidate number"""
+    source = tempfile.mkdtemp()
+    thumbnails = tempfile.mkdtemp()
+    original = IMAGE_SETTINGS['thumbnail_folder']
+    try:
+        with open(os.path.join(source, '0042.jpg'), 'wb') as f:
+            f.write(camera_photo())
+        with open(os.path.join(source, 'broken.jpg'), 'wb') as f:
+            f.write(b'not an image')
+        with open(os.path.join(source, 'class photo.jpg'), 'wb') as f:
+            f.write(camera_photo((40, 40)))
+        with open(os.path.join(source, 'notes.txt'), 'w') as f:
+            f.write('ignored')
+
+        result = import_photo_directory(source, thumbnails)
+        assert result['imported'] == ['0042']
+        assert set(result['skipped']) == {'broken.jpg', 'class photo.jpg'}
+        with Image.open(os.path.join(thumbnails, '0042.jpg')) as thumbnail:
+            assert thumbnail.height <= 75 * 300 / 72 + 1
+
+        IMAGE_SETTINGS['thumbnail_folder'] = thumbnails
+        pdf = REPORT_RENDERER.generate_enhanced_report_bytes(build_student_data(STUDENT, SUBJECTS))
+        assert len(image_sizes(pdf)) == 1
+        print("✅ Photo directory imported as thumbnails")
+    finally:
+        IMAGE_SETTINGS['thumbnail_folder'] = original
+        shutil.rmtree(source, ignore_errors=True)
+        shutil.rmtree(thumbnails, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    test_logo_decoded_once_per_profile()
+    test_logo_layout_matches_on_both_paths()
+    test_photo_downscaled_and_cached_by_content()
+    test_photo_directory_import()
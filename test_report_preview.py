@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for cached PNG report previews
+"""
+
+import io
+import shutil
+import struct
+import tempfile
+
+import report_preview
+from config import PREVIEW_SETTINGS, VERIFY_SETTINGS
+from output_profiles import get_profile
+from pdf_cache import ReportCache, cache_key
+from report_data import build_student_data
+from report_preview import PreviewUnavailable, ReportPreviews
+
+FORM = {'student_name': 'Ada Obi', 'candidate_number': '0042', 'center_number': 'Hilltop Academy',
+        'session': 'June', 'year': '2025', 'subject_count': '1',
+        'subject_0': '0580', 'score_0': '84', 'coefficient_0': '1.2', 'comment_0': 'Excellent'}
+
+
+def png_size(png):
+    """(width, height) from a PNG's IHDR chunk"""
+    return struct.unpack('>II', png[16:24])
+
+
+def student():
+    return build_student_data({'student_name': 'Ada Obi', 'candidate_number': '0042',
+                               'school_name': 'Hilltop Academy', 'session': 'June', 'year': '2025'},
+                              [{'name': 'Mathematics', 'score': 84, 'coefficient': 1.2, 'comment': 'Excellent'}])
+
+
+def tiny_png():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (4, 4), 'white').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def test_missing_rasterizer_reported():
+    """Without the rasterizer the API answers 503 instead of failing the request"""
+    from app import app
+
+    original = PREVIEW_SETTINGS['rasterizer']
+    PREVIEW_SETTINGS['rasterizer'] = 'no-such-rasterizer'
+    try:
+        try:
+            ReportPreviews().render(student(), get_profile('email'))
+            raise AssertionError("Rendered a preview without a rasterizer")
+        except PreviewUnavailable:
+            pass
+        response = app.test_client().post('/api/v1/previews', data=FORM)
+        assert response.status_code == 503 and 'no-such-rasterizer' in response.get_json()['error']
+    finally:
+        PREVIEW_SETTINGS['rasterizer'] = original
+    print("✅ Missing rasterizer reported as 503")
+
+
+def test_preview_served_with_cache_headers():
+    """Previews are served immutable under their content hash, with 304 revalidation"""
+    from app import app, report_previews
+
+    key = 'ab' * 32
+    png = tiny_png()
+    report_previews.cache.put(key, png)
+    client = app.test_client()
+
+    response = client.get(f'/api/v1/previews/{key}.png')
+    assert response.status_code == 200 and response.mimetype == 'image/png'
+    assert response.get_data() == png
+    cache_control = response.headers['Cache-Control']
+    assert 'public' in cache_control and 'immutable' in cache_control and 'max-age=31536000' in cache_control
+    assert response.headers['ETag'] == f'"{key}"'
+
+    response = client.get(f'/api/v1/previews/{key}.png', headers={'If-None-Match': f'"{key}"'})
+    assert response.status_code == 304 and not response.get_data()
+
+    assert client.get(f"/api/v1/previews/{'cd' * 32}.png").status_code == 404
+    assert client.get('/api/v1/previews/not-a-key.png').status_code == 404
+    assert client.get('/preview').status_code == 302
+    print("✅ Preview served with immutable cache headers")
+
+
+def test_preview_rasterized_once():
+    """The real first page is rasterized at screen resolution, once per distinct input"""
+    if shutil.which(PREVIEW_SETTINGS['rasterizer']) is None:
+        print(f"⚠️  {PREVIEW_SETTINGS['rasterizer']} not installed, rasterization not tested")
+        return
+    from app import app
+
+    client = app.test_client()
+    first = client.post('/api/v1/previews', data=FORM).get_json()
+    assert first['success']
+    png = client.get(first['url']).get_data()
+    width, height = png_size(png)
+    assert abs(width - 595 * PREVIEW_SETTINGS['dpi'] / 72) <= 1 and abs(height - 842 * PREVIEW_SETTINGS['dpi'] / 72) <= 1
+
+    previews = ReportPreviews()
+    previews.render(student(), get_profile('email'))
+    previews.render(student(), get_profile('email'))
+    assert previews.cache.stats()['hits'] == 1
+
+    edited = client.post('/api/v1/previews', data=dict(FORM, comment_0='Outstanding')).get_json()
+    assert edited['url'] != first['url']
+    print(f"✅ Preview rasterized at {width}x{height}")
+
+
+def test_preview_shared_between_workers():
+    """A preview rendered by one worker is served by another, under a key that reveals no secret"""
+    folder = tempfile.mkdtemp()
+    original_rasterize, original_key = report_preview.rasterize_first_page, VERIFY_SETTINGS['signing_key']
+    report_preview.rasterize_first_page = lambda pdf_bytes, dpi=None: tiny_png()
+
+    def worker():
+        return ReportPreviews(ReportCache(disk_folder=folder, suffix='.png', namespace='preview'))
+
+    try:
+        key = worker().render(student(), get_profile('email'))
+        assert worker().get(key) == tiny_png()
+
+        variant = f"preview/{PREVIEW_SETTINGS['dpi']}/email"
+        assert key not in (cache_key(student(), variant), cache_key(student()))
+        VERIFY_SETTINGS['signing_key'] = 'another-secret'
+        assert worker().render(student(), get_profile('email')) == key
+    finally:
+        report_preview.rasterize_first_page = original_rasterize
+        VERIFY_SETTINGS['signing_key'] = original_key
+        shutil.rmtree(folder, ignore_errors=True)
+    print("✅ Preview shared between workers")
+
+
+if __name__ == "__main__":
+    test_missing_rasterizer_reported()
+    test_preview_served_with_cache_headers()
+    test_preview_rasterized_once()
+    test_preview_shared_between_workers()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Test script for declarative report templates
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from config import PDF_STYLE, TEMPLATE_SETTINGS
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+from template_engine import TemplateError, load_template, select_template
+from test_canvas_renderer import text_positions
+
+STUDENT = {'student_name': 'Lina Haddad', 'candidate_number': '0450', 'school_name': 'Hilltop Academy',
+           'session': 'June', 'year': '2025'}
+SUBJECTS = [
+    {'name': 'Mathematics', 'score': 84, 'coefficient': 1.3, 'comment': 'Excellent'},
+    {'name': 'Physics', 'score': 71, 'coefficient': 1.2, 'comment': 'Solid work this term overall, keep going'},
+    {'name': 'Art and Design', 'score': 58, 'coefficient': 1.0, 'comment': ''},
+]
+
+SIMPLE_TEMPLATE = {
+    'sections': [
+        {'type': 'paragraph', 'text': '{school_name!u}', 'style': 'CambridgeTitle'},
+        {'type': 'table', 'style': 'grades', 'widths': [3, 1],
+         'header': ['Subject', 'Grade'], 'repeat': {'over': 'subjects', 'cells': ['{name}', '{grade}']}}
+    ]
+}
+
+
+def test_enhanced_template_matches_builtin_layout():
+    """The shipped enhanced template reproduces the built-in layout"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    original = PDF_STYLE.get('page_furniture')
+    try:
+        PDF_STYLE['page_furniture'] = False
+        builtin = REPORT_RENDERER.generate_enhanced_report_bytes(student_data)
+        templated = REPORT_RENDERER.generate_enhanced_report_bytes(student_data, template='enhanced')
+    finally:
+        PDF_STYLE['page_furniture'] = original
+
+    positions = text_positions(templated)
+    assert any(text == 'HILLTOP ACADEMY' for _, _, text in positions)
+    assert positions == text_positions(builtin)
+    print("✅ Enhanced template matches the built-in layout")
+
+
+def test_template_compiled_once_until_modified():
+    """Templates are cached by id and recompiled only when the file changes"""
+    folder = tempfile.mkdtemp()
+    original = TEMPLATE_SETTINGS['folder']
+    try:
+        TEMPLATE_SETTINGS['folder'] = folder
+        path = os.path.join(folder, 'slip.json')
+        with open(path, 'w') as f:
+            json.dump(SIMPLE_TEMPLATE, f)
+
+        first = load_template('slip')
+        assert load_template('slip') is first
+
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        second = load_template('slip')
+        assert second is not first and second.version != first.version
+        print("✅ Template cached until its file changes")
+    finally:
+        TEMPLATE_SETTINGS['folder'] = original
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def test_invalid_templates_rejected():
+    """Bad ids, unknown fields and unknown styles fail when the template is compiled"""
+    folder = tempfile.mkdtemp()
+    original = TEMPLATE_SETTINGS['folder']
+    try:
+        TEMPLATE_SETTINGS['folder'] = folder
+        broken = {
+            'unknown_field': {'sections': [{'type': 'paragraph', 'text': '{mother_name}'}]},
+            'unknown_style': {'sections': [{'type': 'paragraph', 'text': 'x', 'style': 'Comic'}]},
+            'bad_width': {'sections': [{'type': 'table', 'widths': [1, 1], 'rows': [['{gpa}']]}]},
+            'bad_font': {'sections': [{'type': 'table', 'widths': [1], 'rows': [['x']], 'font': 'Helvetica'}]},
+            'bad_height': {'sections': [{'type': 'spacer', 'height': 'tall'}]},
+            'bad_padding': {'sections': [{'type': 'table', 'widths': [1], 'rows': [['x']], 'padding': 'wide'}]},
+            'bad_widths': {'sections': [{'type': 'table', 'widths': ['wide'], 'rows': [['x']]}]},
+            'bad_wrap': {'sections': [{'type': 'table', 'widths': [1], 'rows': [['x']], 'wrap': [3]}]},
+            'short_command': {'sections': [{'type': 'table', 'widths': [1], 'rows': [['x']],
+                                            'style': [['GRID', [0, 0]]]}]},
+            'bad_spec': {'sections': [{'type': 'table', 'widths': [1],
+                                       'repeat': {'cells': ['{name:.0f}']}}]},
+            'bad_margin': {'page': {'margin': 'wide'}, 'sections': []},
+            'not_a_section': {'sections': ['paragraph']},
+        }
+        for template_id, spec in broken.items():
+            with open(os.path.join(folder, template_id + '.json'), 'w') as f:
+                json.dump(spec, f)
+
+        for template_id in list(broken) + ['../config', 'missing']:
+            try:
+                load_template(template_id)
+            except TemplateError as e:
+                assert template_id in str(e) or template_id in ('../config', 'missing'), e
+                continue
+            raise AssertionError(f"Template {template_id} accepted")
+        print("✅ Invalid templates rejected")
+    finally:
+        TEMPLATE_SETTINGS['folder'] = original
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def test_template_selected_per_school():
+    """Schools can be mapped to their own template"""
+    student_data = build_student_data(dict(STUDENT, school_name='Saint Mary & John'), SUBJECTS)
+    assert select_template(student_data) is None
+
+    TEMPLATE_SETTINGS['schools']['Saint Mary & John'] = 'compact'
+    try:
+        assert select_template(student_data).id == 'compact'
+        assert select_template(student_data, 'enhanced').id == 'enhanced'
+
+        pdf = REPORT_RENDERER.generate_enhanced_report_bytes(student_data)
+        assert any(text == 'SAINT MARY & JOHN' for _, _, text in text_positions(pdf))
+        assert not any('Teacher Comments' in text for _, _, text in text_positions(pdf))
+        print("✅ Template selected per school")
+    finally:
+        del TEMPLATE_SETTINGS['schools']['Saint Mary & John']
+
+
+def test_route_template_parameter():
+    """The JSON API renders with a requested template and rejects unknown ones"""
+    from app import app
+
+    payload = dict(STUDENT, version=1, subjects=SUBJECTS)
+    client = app.test_client()
+    response = client.post('/api/v1/reports?template=compact', json=payload)
+    assert response.status_code == 200 and response.get_data().startswith(b'%PDF')
+    response.close()
+
+    assert client.post('/api/v1/reports?template=nope', json=payload).status_code == 400
+    print("✅ Route template parameter working")
+
+
+if __name__ == "__main__":
+    test_enhanced_template_matches_builtin_layout()
+    test_template_compiled_once_until_modified()
+    test_invalid_templates_rejected()
+    test_template_selected_per_school()
+    test_route_template_parameter()
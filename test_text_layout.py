@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script for the font-metric text layout cache
+"""
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from pdf_generator import REPORT_RENDERER
+from pdf_styles import COLUMN_WIDTHS
+from text_layout import wrap_lines
+
+
+def test_lines_fit_measured_width():
+    """Every wrapped line fits the cell when measured in its font"""
+    comment = 'Consistently thoughtful answers, with very well organised written explanations'
+    lines = wrap_lines(comment, 'Helvetica', 9, 103.2)
+
+    assert len(lines) > 1
+    assert ' '.join(lines) == comment
+    assert all(stringWidth(line, 'Helvetica', 9) <= 103.2 for line in lines)
+    print(f"✅ Comment wrapped into {len(lines)} measured lines")
+
+
+def test_overlong_word_is_split():
+    """A single word wider than the cell is split instead of overflowing"""
+    lines = wrap_lines('Pneumonoultramicroscopicsilicovolcanoconiosis', 'Helvetica', 9, 60)
+    assert len(lines) > 1
+    assert all(stringWidth(line, 'Helvetica', 9) <= 60 for line in lines)
+    assert wrap_lines('', 'Helvetica', 9, 60) == ('',)
+    print("✅ Overlong word split")
+
+
+def test_repeated_cells_hit_cache():
+    """Identical cells across a batch are measured once"""
+    student_data = {'subjects': [{'name': 'Mathematics', 'score': 80, 'coefficient': 1.2, 'comment': 'Good effort'}]}
+    REPORT_RENDERER._grades_rows(student_data)
+    hits = wrap_lines.cache_info().hits
+
+    for _ in range(50):
+        rows = REPORT_RENDERER._grades_rows(student_data)
+
+    assert wrap_lines.cache_info().hits == hits + 100
+    assert rows[1][0] == 'Mathematics' and rows[1][5] == 'Good effort'
+    print("✅ Repeated cells served from the layout cache")
+
+
+def test_subject_column_uses_its_width():
+    """Long subject names wrap to the subject column, not a character count"""
+    name = 'English Language and Literature Extended'
+    student_data = {'subjects': [{'name': name, 'score': 70, 'coefficient': 1.0, 'comment': 'Good'}]}
+    cell = REPORT_RENDERER._grades_rows(student_data)[1][0]
+
+    width = COLUMN_WIDTHS['grades'][0] - 12
+    assert all(stringWidth(line, 'Helvetica', 9) <= width for line in cell.split('\n'))
+    assert cell.replace('\n', ' ') == name
+    print("✅ Subject names wrapped to the column width")
+
+
+if __name__ == "__main__":
+    test_lines_fit_measured_width()
+    test_overlong_word_is_split()
+    test_repeated_cells_hit_cache()
+    test_subject_column_uses_its_width()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test script for report verification codes
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import verification
+from config import PDF_STYLE, VERIFY_SETTINGS
+from pdf_generator import REPORT_RENDERER
+from report_data import build_student_data
+from test_canvas_renderer import render_both, text_positions
+from verification import (VerificationError, check_token, check_verification_settings, lookup, report_qr,
+                          report_token, verification_record)
+
+STUDENT = {'student_name': 'Ada Obi', 'candidate_number': '0042', 'school_name': 'Hilltop Academy',
+           'session': 'June', 'year': '2025'}
+SUBJECTS = [{'name': 'Mathematics', 'score': 84, 'coefficient': 1.3, 'comment': 'Excellent'},
+            {'name': 'Physics', 'score': 71, 'coefficient': 1.0, 'comment': 'Good'}]
+
+
+class verification_folder:
+    """Sign and store verification records in a temporary folder while the block runs"""
+
+    def __enter__(self):
+        self.folder = tempfile.mkdtemp()
+        self.original = dict(VERIFY_SETTINGS)
+        VERIFY_SETTINGS.update(enabled=True, base_url='https://results.example.org', signing_key='',
+                               key_file=os.path.join(self.folder, 'verification.key'),
+                               store_db=os.path.join(self.folder, 'verification.db'))
+        reset_verification()
+        return self.folder
+
+    def __exit__(self, *exc):
+        VERIFY_SETTINGS.update(self.original)
+        reset_verification()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+
+def reset_verification():
+    """Forget the loaded key, the open store and cached QR codes"""
+    verification._key = None
+    verification._store = None
+    verification._issue.cache_clear()
+    verification._qr_code.cache_clear()
+
+
+def test_token_signed_and_stable():
+    """The same results give the same token; tampered tokens are rejected"""
+    with verification_folder() as folder:
+        record = verification_record(build_student_data(STUDENT, SUBJECTS))
+        token = report_token(record)
+        assert report_token(verification_record(build_student_data(STUDENT, SUBJECTS))) == token
+        assert check_token(token) == token.split('.')[0]
+        assert oct(os.stat(os.path.join(folder, 'verification.key')).st_mode & 0o777) == '0o600'
+
+        raised_score = verification_record(build_student_data(STUDENT, [dict(SUBJECTS[0], score=94)]))
+        forged = report_token(raised_score).split('.')[0] + '.' + token.split('.')[1]
+        for bad in (forged, token[:-2], 'not-a-token', ''):
+            try:
+                check_token(bad)
+            except VerificationError:
+                continue
+            raise AssertionError(f"Accepted {bad!r}")
+
+        # Another school's key signs different tokens
+        verification._key = b'another key'
+        assert report_token(record) != token
+    print(f"✅ Signed token {token}")
+
+
+def test_rendered_report_verifies():
+    """Rendering a report issues its record; /verify answers from the store"""
+    from app import app
+
+    with verification_folder():
+        student_data = build_student_data(STUDENT, SUBJECTS)
+        pdf = REPORT_RENDERER.generate_enhanced_report_bytes(student_data)
+        assert pdf.startswith(b'%PDF')
+        token = report_token(verification_record(student_data))
+
+        issued = lookup(token)
+        assert issued['record']['candidate_number'] == '0042'
+        assert issued['record']['subjects'][0] == {'name': 'Mathematics', 'score': 84.0, 'grade': 'A'}
+
+        client = app.test_client()
+        response = client.get(f'/verify/{token}')
+        assert response.status_code == 200 and response.get_json()['valid'] is True
+        assert response.get_json()['report']['final_grade'] == student_data['final_grade']['final_grade']
+
+        assert client.get(f'/verify/{token[:-3]}AAA').status_code == 400
+        unissued = report_token(verification_record(build_student_data(dict(STUDENT, year='2026'), SUBJECTS)))
+        assert client.get(f'/verify/{unissued}').status_code == 404
+    print("✅ Rendered report verified through /verify")
+
+
+def test_drafts_not_issued():
+    """Previews carry the QR code but their results cannot be verified"""
+    with verification_folder():
+        student_data = build_student_data(STUDENT, SUBJECTS)
+        REPORT_RENDERER.generate_enhanced_report_bytes(student_data, draft=True)
+        assert lookup(report_token(verification_record(student_data))) is None
+    print("✅ Draft renders issue no verification record")
+
+
+def test_warmup_not_issued():
+    """The warmup render at worker start leaves the verification store untouched"""
+    import app
+
+    with verification_folder():
+        app.warm_up()
+        assert verification._issue.cache_info().currsize == 0
+    print("✅ Warmup issues no verification record")
+
+
+def test_qr_drawing_cached():
+    """A report's QR code is encoded once and reused by later renders"""
+    with verification_folder():
+        student_data = build_student_data(STUDENT, SUBJECTS)
+        qr = report_qr(student_data)
+        assert len(qr.drawing.contents) == 1  # Dark modules merged into one path
+        assert report_qr(dict(student_data)) is qr
+
+        start = time.perf_counter()
+        for profile in ('email', 'print', 'archive'):
+            REPORT_RENDERER.generate_enhanced_report_bytes(student_data, profile=profile)
+        elapsed = time.perf_counter() - start
+        assert verification._qr_code.cache_info().misses == 1
+
+        VERIFY_SETTINGS['enabled'] = False
+        assert report_qr(student_data) is None
+    print(f"✅ QR code encoded once for three profiles ({elapsed * 1000:.1f} ms)")
+
+
+def test_disabled_without_base_url():
+    """Without a public base URL no QR code is printed, and enabling it anyway is refused"""
+    from app import app
+
+    original = dict(VERIFY_SETTINGS)
+    try:
+        VERIFY_SETTINGS.update(enabled=False, base_url='')
+        check_verification_settings()
+        assert report_qr(build_student_data(STUDENT, SUBJECTS)) is None
+        assert app.test_client().get('/verify/abc.def').status_code == 404
+
+        VERIFY_SETTINGS['enabled'] = True
+        for check in (check_verification_settings, lambda: report_qr(build_student_data(STUDENT, SUBJECTS))):
+            try:
+                check()
+                raise AssertionError("Verification enabled without a base URL")
+            except VerificationError as e:
+                assert 'VERIFY_BASE_URL' in str(e)
+    finally:
+        VERIFY_SETTINGS.update(original)
+    print("✅ Verification off without a base URL")
+
+
+def test_qr_layout_matches_on_both_paths():
+    """The QR code leaves the text where it was on both render paths"""
+    student_data = build_student_data(STUDENT, SUBJECTS)
+    original = PDF_STYLE.get('page_furniture')
+    with verification_folder():
+        try:
+            for furniture in (False, True):
+                PDF_STYLE['page_furniture'] = furniture
+                platypus, fast = render_both(student_data)
+                assert text_positions(fast) == text_positions(platypus)
+        finally:
+            PDF_STYLE['page_furniture'] = original
+    print("✅ QR code layout matches on both render paths")
+
+
+if __name__ == "__main__":
+    test_token_signed_and_stable()
+    test_rendered_report_verifies()
+    test_drafts_not_issued()
+    test_warmup_not_issued()
+    test_qr_drawing_cached()
+    test_disabled_without_base_url()
+    test_qr_layout_matches_on_both_paths()
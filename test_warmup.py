@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Test script for the warmup render and /ready probe
+"""
+
+import gunicorn_config
+
+
+def test_ready_after_warmup():
+    """/ready returns 503 until the warmup render has finished"""
+    import app
+
+    client = app.app.test_client()
+    app.warmup_complete.clear()
+    assert client.get('/ready').status_code == 503
+
+    app.warm_up()
+    response = client.get('/ready')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'ready'
+    print("✅ Ready after warmup")
+
+
+def test_workers_sized_from_cores():
+    """Worker count follows the available cores unless overridden"""
+    assert gunicorn_config.preload_app
+    assert gunicorn_config.workers >= 2
+    assert gunicorn_config.available_cores() >= 1
+    print(f"✅ {gunicorn_config.workers} workers configured")
+
+
+if __name__ == "__main__":
+    test_ready_after_warmup()
+    test_workers_sized_from_cores()
@@ -0,0 +1,76 @@
+"""
+Text Layout Cache
+Line breaks measured with font metrics rather than character counts, cached
+per (text, font, size, width) so the subject names and comments repeated
+across a batch are measured once per process
+"""
+
+import functools
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from config import PDF_STYLE
+
+
+@functools.lru_cache(maxsize=PDF_STYLE.get('text_layout_cache', 4096))
+def wrap_lines(text, font_name, font_size, width):
+    """
+    Break text into lines that fit width when drawn in the given font
+
+    Lines break between words; a single word wider than the cell is split
+    between characters rather than overflowing the cell border.
+
+    Args:
+        text (str): Cell text; <br/> tags are treated as spaces
+        font_name (str): Registered font name, e.g. 'Helvetica'
+        font_size (float): Font size in points
+        width (float): Available width in points (cell width minus padding)
+
+    Returns:
+        tuple: The lines, at least one
+    """
+    text = text.replace('<br/>', ' ').replace('<br>', ' ')
+    space = stringWidth(' ', font_name, font_size)
+
+    lines = []
+    current = []
+    current_width = 0
+    for word in text.split():
+        word_width = stringWidth(word, font_name, font_size)
+        if current and current_width + space + word_width <= width:
+            current.append(word)
+            current_width += space + word_width
+            continue
+
+        if current:
+            lines.append(' '.join(current))
+        if word_width > width:
+            pieces = _split_word(word, font_name, font_size, width)
+            lines.extend(pieces[:-1])
+            word = pieces[-1]
+            word_width = stringWidth(word, font_name, font_size)
+        current = [word]
+        current_width = word_width
+
+    if current:
+        lines.append(' '.join(current))
+    return tuple(lines) or ('',)
+
+
+def _split_word(word, font_name, font_size, width):
+    """Split one overlong word into pieces that each fit width"""
+    pieces = []
+    piece = ''
+    for char in word:
+        if piece and stringWidth(piece + char, font_name, font_size) > width:
+            pieces.append(piece)
+            piece = char
+        else:
+            piece += char
+    pieces.append(piece)
+    return pieces
+
+
+def wrap_text(text, font_name, font_size, width):
+    """Wrapped text as one newline-joined string, as platypus.Table cells expect"""
+    return '\n'.join(wrap_lines(text, font_name, font_size, width))
@@ -0,0 +1,342 @@
+"""
+Report Verification
+Signed verification codes for Statements of Results: every report carries a
+QR code linking to /verify/<token>. The token names a record of the report's
+key results in an indexed SQLite store and is signed with the school's key,
+so forged tokens are rejected without a lookup and genuine ones are answered
+from the store without rendering anything
+
+Tokens follow the key results, so re-rendering a report (another output
+profile, an email after a download) gives the same token. QR codes are
+encoded once per token and kept with their dark modules merged into
+horizontal runs, both as a ReportLab drawing and as the PDF operators that
+draw it.
+"""
+
+import base64
+import binascii
+import functools
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from reportlab.graphics.barcode import qrencoder
+from reportlab.graphics.shapes import Drawing, Path
+from reportlab.lib import colors
+from reportlab.lib.rl_accel import fp_str
+
+from config import VERIFY_SETTINGS
+from report_data import report_fields
+
+logger = logging.getLogger(__name__)
+
+RECORD_ID_BYTES = 12
+SIGNATURE_BYTES = 9
+
+# Blank modules around the code, as the QR specification asks for
+QUIET_ZONE = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id TEXT PRIMARY KEY,
+    record TEXT NOT NULL,
+    created_at REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+_key = None
+_key_lock = threading.Lock()
+_store = None
+_store_lock = threading.Lock()
+
+
+class VerificationError(ValueError):
+    """Raised for a verification token that is malformed or not signed with our key"""
+
+
+def _encode(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def _decode(text, length):
+    try:
+        raw = base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+    except (binascii.Error, ValueError):
+        raise VerificationError('Invalid verification code')
+    if len(raw) != length:
+        raise VerificationError('Invalid verification code')
+    return raw
+
+
+def _load_key():
+    """The configured signing key, else the key file, created on first use"""
+    if VERIFY_SETTINGS['signing_key']:
+        return VERIFY_SETTINGS['signing_key'].encode('utf-8')
+
+    path = VERIFY_SETTINGS['key_file']
+    if not os.path.exists(path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, 'wb') as f:
+            os.chmod(temp, 0o600)
+            f.write(secrets.token_bytes(32))
+        try:
+            os.link(temp, path)  # Fails if another process created the key first
+            logger.info(f"Created report signing key {path}")
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def signing_key():
+    """Key that signs verification tokens, loaded once per process"""
+    global _key
+    if _key is None:
+        with _key_lock:
+            if _key is None:
+                _key = _load_key()
+    return _key
+
+
+def verification_record(student_data):
+    """
+    Key results of a report, as printed on it and shown to whoever verifies it
+
+    Args:
+        student_data (dict): Enhanced student data from build_student_data
+
+    Returns:
+        dict: Student, school, session, subject results and final grade
+    """
+    fields = report_fields(student_data)
+    return {
+        'student_name': fields['student_name'],
+        'candidate_number': fields['candidate_number'],
+        'school_name': fields['school_name'],
+        'session': fields['session'],
+        'year': fields['year'],
+        'subjects': [{'name': subject['name'], 'score': round(subject['score'], 1), 'grade': subject['grade']}
+                     for subject in fields['subjects']],
+        'gpa': round(fields['gpa'], 2),
+        'weighted_average': round(fields['weighted_average'], 1),
+        'final_grade': fields['final_grade'],
+    }
+
+
+def _canonical(record):
+    return json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def _signature(record_id):
+    return hmac.new(signing_key(), record_id.encode('ascii'), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def report_token(record):
+    """
+    Signed token for a verification record
+
+    Returns:
+        str: '<record id>.<signature>', URL safe; the record id is a digest
+            of the record, so the same results always get the same token
+    """
+    record_id = _encode(hashlib.sha256(_canonical(record).encode('utf-8')).digest()[:RECORD_ID_BYTES])
+    return f"{record_id}.{_encode(_signature(record_id))}"
+
+
+def check_token(token):
+    """
+    Check a token's signature
+
+    Returns:
+        str: The record id to look up
+
+    Raises:
+        VerificationError: If the token is malformed or its signature does not match
+    """
+    record_id, _, signature = token.partition('.')
+    _decode(record_id, RECORD_ID_BYTES)
+    if not hmac.compare_digest(_decode(signature, SIGNATURE_BYTES), _signature(record_id)):
+        raise VerificationError('Invalid verification code')
+    return record_id
+
+
+class VerificationStore:
+    """SQLite store of issued reports' key results, indexed by record id"""
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or VERIFY_SETTINGS['store_db']
+        folder = os.path.dirname(self.db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        """Open an autocommit connection that is closed on exit"""
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def add(self, record_id, record):
+        """Record an issued report; re-issuing the same results keeps the first issue date"""
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO records (id, record, created_at) VALUES (?, ?, ?)",
+                         (record_id, _canonical(record), time.time()))
+
+    def get(self, record_id):
+        """
+        Look up an issued report by its primary key
+
+        Returns:
+            dict or None: record and issued_at (Unix time), None if never issued
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT record, created_at FROM records WHERE id = ?", (record_id,)).fetchone()
+        if row is None:
+            return None
+        return {'record': json.loads(row[0]), 'issued_at': row[1]}
+
+
+def get_store():
+    """The process-wide verification store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = VerificationStore()
+    return _store
+
+
+def lookup(token):
+    """
+    Verify a token and fetch the report it was issued for
+
+    Returns:
+        dict or None: As VerificationStore.get
+
+    Raises:
+        VerificationError: If the token is not genuine
+    """
+    return get_store().get(check_token(token))
+
+
+class VerificationQR:
+    """A QR code encoded once, as a ReportLab drawing and as ready-made PDF operators"""
+
+    def __init__(self, text, size):
+        """
+        Args:
+            text (str): Data to encode
+            size (float): Width and height in points, quiet zone included
+        """
+        code = qrencoder.QRCode(None, qrencoder.QRErrorCorrectLevel.M)
+        code.addData(text)
+        code.make()
+        count = code.getModuleCount()
+        module = size / (count + 2 * QUIET_ZONE)
+
+        # Horizontal runs of dark modules as (x, y, width) in points
+        runs = []
+        for row in range(count):
+            y = size - (row + QUIET_ZONE + 1) * module
+            col = 0
+            while col < count:
+                if not code.isDark(row, col):
+                    col += 1
+                    continue
+                start = col
+                while col < count and code.isDark(row, col):
+                    col += 1
+                runs.append(((start + QUIET_ZONE) * module, y, (col - start) * module))
+
+        self.text = text
+        self.width = self.height = size
+        self.drawing = Drawing(size, size)
+        path = Path(fillColor=colors.black, strokeColor=None, strokeWidth=0)
+        for x, y, width in runs:
+            path.moveTo(x, y)
+            path.lineTo(x + width, y)
+            path.lineTo(x + width, y + module)
+            path.lineTo(x, y + module)
+            path.closePath()
+        self.drawing.add(path)
+        # renderPDF formats every point of the path on each draw; the operators
+        # are formatted once here and copied into each page instead
+        self.operators = ' '.join(f"{fp_str(x, y, width, module)} re" for x, y, width in runs) + ' f'
+
+    def drawOn(self, canvas, x, y):
+        """Draw the code with its lower left corner at (x, y)"""
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.setFillColor(colors.black)
+        canvas.addLiteral(self.operators)
+        canvas.restoreState()
+
+
+@functools.lru_cache(maxsize=VERIFY_SETTINGS.get('qr_cache', 1024))
+def _issue(token, record_json):
+    """Store a record, once per token and process"""
+    get_store().add(token.partition('.')[0], json.loads(record_json))
+
+
+@functools.lru_cache(maxsize=VERIFY_SETTINGS.get('qr_cache', 1024))
+def _qr_code(token, base_url, size):
+    return VerificationQR(f"{base_url.rstrip('/')}/verify/{token}", size)
+
+
+def check_verification_settings():
+    """
+    Check that enabled verification has a public address for its QR codes
+
+    Raises:
+        VerificationError: If verification is enabled without a base_url
+    """
+    if VERIFY_SETTINGS['enabled'] and not VERIFY_SETTINGS['base_url']:
+        raise VerificationError('Report verification is enabled without a base_url (set VERIFY_BASE_URL)')
+
+
+def report_qr(student_data, issue=True):
+    """
+    Issue a report's verification record and get its QR code
+
+    Args:
+        student_data (dict): Enhanced student data
+        issue (bool): Store the record; drafts (e.g. on-screen previews) show
+            the code without making their results verifiable
+
+    Returns:
+        VerificationQR or None: The QR code, None when verification is disabled
+
+    Raises:
+        VerificationError: If verification is enabled without a base_url
+    """
+    if not VERIFY_SETTINGS['enabled']:
+        return None
+    check_verification_settings()
+    record = verification_record(student_data)
+    token = report_token(record)
+    if issue:
+        _issue(token, _canonical(record))
+    return _qr_code(token, VERIFY_SETTINGS['base_url'], VERIFY_SETTINGS['qr_size'])
+
+
+def draw_qr(canvas, qr, pagesize, margin):
+    """Draw a QR code in the top right corner inside the page margins"""
+    qr.drawOn(canvas, pagesize[0] - margin - qr.width, pagesize[1] - margin - qr.height)
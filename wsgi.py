@@ -8,7 +8,11 @@ import os
 # Add the application directory to Python path
 sys.path.insert(0, os.path.dirname(__file__))
 
-from app import app
+from app import app, warm_up
+
+# Render a sample report before accepting requests; with gunicorn_config.py
+# (preload_app) this happens once in the master, before workers are forked
+warm_up()
 
 # WSGI callable
 application = app